@@ -0,0 +1,220 @@
+"""Poll çevrimi ve komut gecikmesi için tekrarlanabilir benchmark.
+
+Poll motorunu (``BusEngine``) GUI olmadan, ``modbus_sim`` ile açılan yerel
+bir pty hattına karşı çalıştırır. Cihaz sayısı, baud, çevrimdışı oranı ve
+komut hızı taranır; her koşu için çevrim süresi, cihaz başına bayatlık,
+``cmd_latency`` yüzdelikleri, bus kullanımı (ölçüm boyunca transport'un
+meşgul süresi / geçen süre) ve çerçeve/s ölçülür. Sonuçlar
+JSON olarak yazılır ve ``--compare`` ile önceki bir sürümün sonucuyla
+karşılaştırılır (gerileme varsa çıkış kodu 1).
+
+    python modbus_bench.py --devices 10,50,100 --baud 9600,115200 --offline 0,0.1 --cmd-rate 0,5 -o bench.json
+    python modbus_bench.py --devices 50 --baud 115200 --compare bench.json
+"""
+import argparse
+import itertools
+import json
+import math
+import platform
+import random
+import subprocess
+import threading
+import time
+
+from modbus_engine import BusEngine, BusLoop
+from modbus_metrics import new_rings
+from modbus_regmap import REG_COMMAND
+from modbus_sim import BusSimulator, SimSlave
+
+WARMUP_S = 2.0          # Ölçüme başlamadan önce (ilk okumalar, back-off'a giriş)
+SAMPLE_S = 0.1          # Bayatlık / kullanım örnekleme aralığı
+REGRESSION = 0.10       # --compare: %10'dan kötüleşme gerileme sayılır
+
+# Karşılaştırılan metrikler: (anahtar, büyük olan mı iyi)
+COMPARED = [
+    ('cycle_p50_ms', False), ('cycle_p99_ms', False),
+    ('stale_p99_ms', False), ('stale_worst_p99_ms', False), ('cmd_p50_ms', False), ('cmd_p99_ms', False),
+    ('frames_per_s', True),
+]
+
+
+def percentile(values, q):
+    """En yakın sıra yöntemiyle yüzdelik (boşsa 0)."""
+    if not values: return 0.0
+    s = sorted(values)
+    return s[max(0, math.ceil(q / 100 * len(s)) - 1)]
+
+
+async def _reset_rings(data_store):
+    """Isınma sonrası halkaları bus thread'inde sıfırla."""
+    for state in data_store.values():
+        state['rings'] = new_rings()
+
+
+def run_once(devices, baud, offline, cmd_rate, duration, delay_ms, jitter_ms, poll_ms=None, seed=1):
+    """Tek koşu: simülatör + motor kur, ``duration`` saniye ölç, sonuç sözlüğü döndür.
+
+    ``seed`` komut üreticisinin (hangi düğüme hangi komut) tohumudur.
+    """
+    ids = list(range(1, devices + 1))
+    dead = set(ids[len(ids) - round(devices * offline):]) if offline else set()
+    sim = BusSimulator([SimSlave(sid, delay_ms=delay_ms, jitter_ms=jitter_ms, dead=sid in dead, travel_s=0.5)
+                        for sid in ids], baud)
+    port = sim.start()
+
+    devs = [{'id': sid, 'name': f"SIM_{sid:03d}"} for sid in ids]
+    if poll_ms:
+        for d in devs: d['poll_idle_ms'] = poll_ms
+
+    data_store, snapshots = {}, {}
+    bus_loop = BusLoop()
+    bus_loop.start()
+    engine = BusEngine(port, baud, devs, data_store, snapshots, bus_loop)
+    stop = threading.Event()
+    try:
+        engine.start()
+        time.sleep(WARMUP_S)
+        bus_loop.run(_reset_rings(data_store), timeout=2)
+        sim_start = dict(sim.stats)
+        m_start = dict(engine.metrics)
+        busy_start = engine.counters.snapshot()['port']['busy_s']
+
+        # Komut üretici: çevrimiçi cihazlara sabit hızda OPEN/CLOSE
+        live = [sid for sid in ids if sid not in dead]
+        def commands():
+            rng = random.Random(seed)
+            while cmd_rate and not stop.wait(1.0 / cmd_rate):
+                engine.submit(rng.choice(live), REG_COMMAND, rng.choice((1, 2)))
+        gen = threading.Thread(target=commands, daemon=True)
+        gen.start()
+
+        stale = {sid: [] for sid in live}
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < duration:
+            time.sleep(SAMPLE_S)
+            now = time.time()
+            for sid in live:
+                snap = snapshots.get(sid)
+                if snap and snap.get('timestamp'):
+                    stale[sid].append((now - snap['timestamp']) * 1000)
+        elapsed = time.monotonic() - t0
+        # Kullanım: ölçüm penceresindeki meşgul süre (motorun 5 s'lik penceresi başta 0'dır)
+        busy = engine.counters.snapshot()['port']['busy_s'] - busy_start
+        stop.set()
+        gen.join(timeout=2)
+    finally:
+        stop.set()
+        engine.stop()
+        bus_loop.stop()
+        sim.stop()
+
+    cycle = [v for sid in live for v in data_store[sid]['rings']['loop_time'].values()]
+    cmd = [v for sid in live for v in data_store[sid]['rings']['cmd_latency'].values()]
+    all_stale = [v for values in stale.values() for v in values]
+    per_device = {sid: {'p50_ms': percentile(v, 50), 'p99_ms': percentile(v, 99), 'max_ms': max(v, default=0.0)}
+                  for sid, v in stale.items()}
+    worst = max(per_device, key=lambda sid: per_device[sid]['p99_ms'], default=None)
+    frames = (sim.stats['rx_frames'] - sim_start['rx_frames']) + (sim.stats['tx_frames'] - sim_start['tx_frames'])
+    return {
+        'cycle_p50_ms': percentile(cycle, 50),
+        'cycle_p99_ms': percentile(cycle, 99),
+        'stale_p50_ms': percentile(all_stale, 50),
+        'stale_p99_ms': percentile(all_stale, 99),
+        'stale_max_ms': max(all_stale, default=0.0),
+        'stale_worst_sid': worst,
+        'stale_worst_p99_ms': per_device[worst]['p99_ms'] if worst is not None else 0.0,
+        'stale_by_device': per_device,
+        'cmd_count': len(cmd),
+        'cmd_p50_ms': percentile(cmd, 50),
+        'cmd_p95_ms': percentile(cmd, 95),
+        'cmd_p99_ms': percentile(cmd, 99),
+        'utilization': busy / elapsed,
+        'load': engine.metrics['load'],
+        'frames_per_s': frames / elapsed,
+        'poll_errors': engine.metrics['poll_errors'] - m_start['poll_errors'],
+        'missed': engine.metrics['missed'] - m_start['missed'],
+        'cmd_missed': engine.metrics['cmd_missed'] - m_start['cmd_missed'],
+    }
+
+
+def run_key(params):
+    return f"dev={params['devices']} baud={params['baud']} off={params['offline']} cmd={params['cmd_rate']}"
+
+
+def compare(results, baseline):
+    """Aynı parametreli koşuları karşılaştır; gerileme satırlarını döndür."""
+    old = {run_key(r['params']): r['results'] for r in baseline['runs']}
+    regressions = []
+    for run in results['runs']:
+        key = run_key(run['params'])
+        if key not in old: continue
+        print(f"\n{key}")
+        for metric, higher_better in COMPARED:
+            a, b = old[key].get(metric, 0.0), run['results'][metric]
+            change = (b - a) / a if a else 0.0
+            worse = -change if higher_better else change
+            flag = "  << REGRESSION" if worse > REGRESSION else ""
+            print(f"  {metric:<14} {a:10.1f} -> {b:10.1f} ({change:+.0%}){flag}")
+            if flag: regressions.append((key, metric, a, b))
+    return regressions
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def _floats(text): return [float(x) for x in text.split(',') if x]
+def _ints(text): return [int(x) for x in text.split(',') if x]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="BusEngine benchmark (simüle hat üzerinde, GUI'siz)")
+    ap.add_argument("--devices", default="10,50", help="Cihaz sayıları, ör. 10,50,100")
+    ap.add_argument("--baud", default="9600,115200")
+    ap.add_argument("--offline", default="0,0.1", help="Ölü düğüm oranları (0..1)")
+    ap.add_argument("--cmd-rate", default="0,5", help="Komut/s")
+    ap.add_argument("--duration", type=float, default=10.0, help="Koşu başına ölçüm süresi (s)")
+    ap.add_argument("--delay", type=float, default=2.0, help="Simüle slave cevap gecikmesi (ms)")
+    ap.add_argument("--jitter", type=float, default=0.5)
+    ap.add_argument("--poll-ms", type=float, help="poll_idle_ms (varsayılan: motorun POLL_IDLE)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("-o", "--output", help="Sonuç JSON dosyası")
+    ap.add_argument("--compare", help="Karşılaştırılacak önceki sonuç JSON'u")
+    args = ap.parse_args()
+
+    # Simülatör ve back-off jitter'ı ortak global RNG'yi thread'lerden çeker: koşular tam tekrarlanmaz
+    random.seed(args.seed)
+    results = {
+        'meta': {'git': _git_rev(), 'python': platform.python_version(), 'platform': platform.platform(),
+                 'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'duration_s': args.duration,
+                 'delay_ms': args.delay, 'jitter_ms': args.jitter, 'poll_ms': args.poll_ms, 'seed': args.seed},
+        'runs': [],
+    }
+    sweep = itertools.product(_ints(args.devices), _ints(args.baud), _floats(args.offline), _floats(args.cmd_rate))
+    for devices, baud, offline, cmd_rate in sweep:
+        params = {'devices': devices, 'baud': baud, 'offline': offline, 'cmd_rate': cmd_rate}
+        res = run_once(devices, baud, offline, cmd_rate, args.duration, args.delay, args.jitter, args.poll_ms,
+                       args.seed)
+        results['runs'].append({'params': params, 'results': res})
+        print(f"{run_key(params):<40} cycle p50/p99 {res['cycle_p50_ms']:.0f}/{res['cycle_p99_ms']:.0f} ms  "
+              f"stale p99 {res['stale_p99_ms']:.0f} ms (worst ID {res['stale_worst_sid']}: {res['stale_worst_p99_ms']:.0f})  cmd p50/p99 {res['cmd_p50_ms']:.0f}/{res['cmd_p99_ms']:.0f} ms  "
+              f"util {res['utilization']:.0%}  {res['frames_per_s']:.0f} frames/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print(f"\n{len(regressions)} gerileme")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1261 @@
+"""Seri port başına bağımsız Modbus RTU poll motoru.
+
+Her RS-485 segmenti (port) kendi ``BusEngine`` örneğine sahiptir: kendi
+transport'u, kilidi, komut kuyruğu, zamanlaması ve metrikleri. Motorlar tek
+bir arka plan event loop'unda (``BusLoop``) ayrı task'lar olarak paralel
+çalışır; toplam çevrim kapasitesi port sayısıyla artar.
+
+Her motorun içinde ``BusScheduler`` (deadline tabanlı) hangi (cihaz, register
+grubu) işinin sıradaki olduğuna karar verir; kullanıcı komutları kısa
+deadline ile arka plan sorgularının önüne geçer.
+
+Cihaz durumu (``data_store``) yalnızca bus loop thread'inde değişir. Her
+değişiklikten sonra cihazın değişmez, sürüm numaralı bir kopyası
+``snapshots[sid]`` içine tek atamayla yayınlanır; UI bunu kilit almadan okur.
+
+``ModbusEngine`` hepsini GUI'siz bir API (start / stop / submit / subscribe)
+arkasında toplar; panel, servisler ve benchmark aynı sınıfı kullanır.
+Her cihazın cevap timeout'u kendi cevap süresi dağılımından öğrenilir (p99 x
+pay, baud'dan türetilen alt sınırla); cevap süresi taban çizgisinin belirgin
+üstüne çıkan cihaz ``slow`` olarak işaretlenir ve ``SLOW`` olayı yayınlanır.
+
+Doğrulamalı yazma modunda (``verify_writes``) yazma ve ilgili register
+grubunun geri okuması FC23 ile tek işlemde yapılır (FC23'ü olmayan slave'de
+yazma + okuma art arda, aynı kilit altında); cache iyimser değil geri okunan
+değerle güncellenir, uyuşmazlık ``WRITE_MISMATCH`` olayıyla bildirilir.
+
+Cihazların ``groups`` alanı isimli grupları tanımlar; ``submit_group`` bir
+yazmayı grubun tüm üyelerine gönderir (mümkünse tek broadcast çerçevesiyle):
+
+    python modbus_engine.py --port /dev/ttyUSB0 --baud 19200
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import struct
+import threading
+import time
+from types import MappingProxyType
+
+from modbus_events import (
+    OFFLINE, ONLINE, SLOW, SLOW_CLEARED, WRITE_MISMATCH, ChangeEvent, EventBus, diff_values,
+)
+from modbus_historian import ONLINE_ADDR, Historian
+from modbus_log import get_logger, setup_logging
+from modbus_metrics import BusCounters, MetricsExporter, new_rings, summaries
+from modbus_regmap import REG_COMMAND, REG_STATUS, ReadSpan, register_map_for
+from modbus_registry import DeviceRegistry
+from modbus_rtu import (
+    EXC_ILLEGAL_FUNCTION, MAX_RW_WRITE_REGS, AsyncRtuClient, BusTiming, ModbusError,
+    ModbusExceptionResponse, ModbusTimeout, write_multiple_pdu, write_single_pdu,
+)
+
+log = get_logger(__name__)
+
+MAX_WRITE_REGS  = 123 # FC16 tek çerçevede en fazla 123 register
+
+# Çerçeve başına slave cevap payı (s); tam çerçeve gelince beklemeden döner.
+# Cihazın timeout'u öğrenilene kadar varsayılan, sonra üst sınırdır.
+READ_TIMEOUT  = 0.5
+WRITE_TIMEOUT = 0.6
+
+# --- ADAPTİF TIMEOUT / SAĞLIK ---
+TIMEOUT_MARGIN  = 2.0    # Okuma timeout'u = p99(cevap gecikmesi) x pay (alt sınır: BusTiming.reply_floor)
+WRITE_MARGIN    = 2.0    # Yazma timeout'u = okuma timeout'u x pay (EEPROM yazan slave'ler yavaş cevaplar)
+TIMEOUT_SAMPLES = 20     # Bu kadar cevaptan önce varsayılan timeout kullanılır
+SLOW_FACTOR     = 2.0    # Pencere p50'si taban çizgisinin bu katını aşarsa cihaz "yavaş"
+SLOW_MIN_MS     = 2.0    # ... ve en az bu kadar (ms) üstündeyse (hızlı slave'de gürültüye karşı)
+BASELINE_ALPHA  = 0.002  # Taban çizgisi (p50 EWMA) — yavaş işaretliyken güncellenmez
+
+# --- ZAMANLAYICI ---
+# Varsayılan periyotlar (s); cihaz bazında poll_fast_ms / poll_idle_ms / poll_config_ms
+POLL_FAST    = 0.1    # Hareket eden kapı (komut sonrası hedef duruma ulaşana kadar)
+POLL_IDLE    = 0.5    # Duran kapı
+POLL_CONFIG  = 300.0  # Parametre register'ları (yalnız yazmayla değişir); 0: yalnız talep üzerine
+PARAMS_TTL   = 30.0   # ``refresh`` bu yaştan genç parametre cache'ini yeniden okumaz
+MOVE_WINDOW  = 15.0   # Komuttan sonra en fazla bu kadar süre "hareket" sayılır
+CMD_DEADLINE = 0.05   # Kullanıcı komutu kuyruğa girdikten sonra en geç bu kadar içinde hatta
+
+PRIO_STATUS, PRIO_CONFIG = 0, 1
+
+# Register grubu -> (öncelik, periyot alanı, varsayılan periyot s, TTL s). Haritadaki
+# diğer gruplar parametre politikasını alır. Periyodu 0 olan grup periyodik
+# okunmaz: ``refresh`` (cache TTL'den yaşlıysa), ``poll_now`` veya yazma sonrası okunur.
+GROUP_POLICY = {
+    'status': (PRIO_STATUS, 'poll_idle_ms', POLL_IDLE, 0.0),
+    'params': (PRIO_CONFIG, 'poll_config_ms', POLL_CONFIG, PARAMS_TTL),
+}
+DEFAULT_GROUP_POLICY = GROUP_POLICY['params']
+
+# --- ÇEVRİMDIŞI CİHAZ YOKLAMA (PROBE) ---
+PROBE_TIMEOUT  = 0.05  # Probe'da tek deneme, kısa slave cevap payı (s)
+BACKOFF_BASE   = 1.0   # İlk probe aralığı (s), her başarısız probe'da ikiye katlanır
+BACKOFF_MAX    = 30.0
+BACKOFF_JITTER = 0.2   # ±%20 — aynı anda düşen cihazların probe'ları dağılsın
+LOAD_WINDOW = 5.0     # Ölçülen bus kullanım oranı penceresi (s)
+
+# --- GRUP KOMUTLARI ---
+GROUP_ALL = 'ALL'     # Örtük grup: tüm cihazlar
+
+
+def new_device_state():
+    """``data_store[sid]`` için boş kayıt."""
+    return {
+        'cache': {}, 'pending': {}, 'online': True, 'errors': 0, 'last_update': '',
+        'latency': 0, 'success_count': 0, 'total_count': 0,
+        'cmd_latency': 0, 'last_cmd_ts': 0,
+        'slave_resp_time': 0, 'loop_time': 0, 'last_poll_ts': 0,
+        'queue_wait': 0,
+        'rings': new_rings(),   # latency / cmd_latency / loop_time / queue_wait yüzdelikleri
+        'missed_deadlines': 0, 'poll_period': 0,
+        'backoff_s': 0, 'probe_failures': 0, 'next_probe_ts': 0,
+        'group_ts': {},         # register grubu -> son başarılı okuma zamanı (cache yaşı)
+        'last_error': '',       # Son başarısız işlemin hatası (timeout / CRC / exception)
+        'reply_timeout_ms': 0,  # Öğrenilmiş cevap timeout'u (0: henüz yeterli örnek yok)
+        'reply_baseline_ms': 0, # Cevap gecikmesi taban çizgisi (p50, yavaş EWMA)
+        'slow': False,          # Sağlık: cevap süresi taban çizgisinin belirgin üstünde
+        'fc23': None,           # FC23 desteği (None: henüz denenmedi)
+        'write_mismatches': 0,  # Doğrulamalı yazmada geri okunan değer yazılandan farklı
+    }
+
+
+def snapshot_of(state, version):
+    """Mutable cihaz durumundan salt okunur kopya (copy-on-publish)."""
+    snap = dict(state)
+    snap['cache'] = MappingProxyType(dict(state['cache']))
+    snap['pending'] = MappingProxyType(dict(state['pending']))
+    snap['group_ts'] = MappingProxyType(dict(state['group_ts']))
+    snap['stats'] = summaries(state['rings'])   # Özetler halka değişene kadar önbellekli
+    del snap['rings']
+    snap['version'] = version
+    return MappingProxyType(snap)
+
+
+def device_groups(devices):
+    """Cihazların ``groups`` alanından {grup adı: [sid, ...]}; ``ALL`` her zaman vardır."""
+    groups = {GROUP_ALL: [d['id'] for d in devices]}
+    for d in devices:
+        for name in d.get('groups') or ():
+            groups.setdefault(name, []).append(d['id'])
+    return groups
+
+
+def group_by_port(devices, default_port, default_baud):
+    """Cihazları ``port`` alanına göre grupla: {port: (baud, [device, ...])}.
+
+    ``port``/``baud`` alanı olmayan cihazlar toolbar'daki varsayılanları
+    kullanır. Bir segmentte tek baud olabileceği için portun baud'u o porttaki
+    ilk açık ``baud`` değeridir.
+    """
+    buses = {}
+    for d in devices:
+        port = d.get('port') or default_port
+        baud, members = buses.setdefault(port, [None, []])
+        members.append(d)
+        if baud is None and d.get('baud'):
+            buses[port][0] = int(d['baud'])
+    return {p: (b or default_baud, m) for p, (b, m) in buses.items()}
+
+
+class PollJob:
+    """Zamanlanmış bir (cihaz, register grubu) okuması."""
+    __slots__ = ('sid', 'group', 'priority', 'period', 'release', 'deadline',
+                 'version', 'exec_avg', 'runs', 'missed')
+
+    def __init__(self, sid, group, priority, period):
+        self.sid = sid
+        self.group = group
+        self.priority = priority
+        self.period = period
+        self.release = 0.0      # En erken çalışma zamanı (monotonic)
+        self.deadline = 0.0     # Bu zamandan sonra başlarsa "kaçırılmış" sayılır
+        self.version = 0
+        self.exec_avg = 0.0     # Ortalama işlem süresi (EWMA, s)
+        self.runs = 0
+        self.missed = 0
+
+    @property
+    def load(self):
+        """Bu işin bus üzerinde talep ettiği zaman oranı."""
+        return self.exec_avg / self.period if self.period > 0 else 0.0
+
+
+class BusScheduler:
+    """Earliest-deadline-first zamanlayıcı.
+
+    Zamanı gelen (release <= şimdi) işler arasından deadline'ı en erken olan
+    seçilir; deadline = release + period. Bir iş deadline'ından sonra
+    başlarsa ``missed`` sayılır — bus'ın taşıyabileceğinden fazla yük var
+    demektir. ``load`` ölçülen işlem sürelerinden talep edilen bus oranıdır.
+    """
+
+    def __init__(self):
+        self.jobs = {}          # (sid, group) -> PollJob
+        self._waiting = []      # (release, seq, job, version)
+        self._ready = []        # (deadline, priority, seq, job, version)
+        self._seq = itertools.count()
+        self.missed = 0
+
+    def add(self, job, release):
+        """İşi kaydet; ``release`` None ise kuyruğa alınmaz (talep üzerine çalışan iş)."""
+        self.jobs[(job.sid, job.group)] = job
+        if release is not None: self.schedule(job, release)
+
+    def remove_device(self, sid):
+        for key in [k for k in self.jobs if k[0] == sid]:
+            self.jobs.pop(key).version += 1   # Kuyruktaki kopyaları geçersiz
+
+    def schedule(self, job, release, period=None):
+        """İşi ``release`` anında hazır olacak şekilde (yeniden) kuyruğa al."""
+        if period is not None: job.period = period
+        job.version += 1
+        job.release = release
+        job.deadline = release + (job.period or POLL_IDLE)  # Talep üzerine işte periyot 0
+        heapq.heappush(self._waiting, (release, next(self._seq), job, job.version))
+
+    def pop_ready(self, now):
+        """Hazır işlerden deadline'ı en erken olanı döndür (yoksa None)."""
+        while self._waiting and self._waiting[0][0] <= now:
+            _, seq, job, ver = heapq.heappop(self._waiting)
+            if ver == job.version:
+                heapq.heappush(self._ready, (job.deadline, job.priority, seq, job, ver))
+        while self._ready:
+            job, ver = self._ready[0][3], self._ready[0][4]
+            heapq.heappop(self._ready)
+            if ver == job.version:
+                if now > job.deadline:
+                    job.missed += 1
+                    self.missed += 1
+                return job
+        return None
+
+    def next_release(self):
+        """Bir sonraki işin hazır olacağı zaman (iş yoksa None)."""
+        while self._waiting and self._waiting[0][3] != self._waiting[0][2].version:
+            heapq.heappop(self._waiting)
+        return self._waiting[0][0] if self._waiting else None
+
+    def done(self, job, exec_time, period):
+        """İş bitti: süresini kaydet ve bir sonraki periyoda kur (geride kaldıysa şimdiye).
+
+        Periyodu 0 olan iş yeniden kurulmaz; bir sonraki talebi bekler.
+        """
+        job.exec_avg = exec_time if job.runs == 0 else 0.8 * job.exec_avg + 0.2 * exec_time
+        job.runs += 1
+        job.period = period
+        if period > 0:
+            self.schedule(job, max(job.release + period, time.monotonic()))
+
+    @property
+    def load(self):
+        return sum(j.load for j in self.jobs.values())
+
+
+class BusLoop:
+    """Tüm portları süren tek asyncio event loop (arka plan thread'i)."""
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True, name="bus-loop")
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro, timeout=None):
+        """Coroutine'i loop'ta çalıştır ve sonucunu (thread'den) bekle."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def spawn(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, fn, *args):
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def stop(self):
+        if self.loop:
+            try: self.run(self._shutdown(), timeout=2)
+            except Exception: pass
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=2)
+            if not self.thread.is_alive(): self.loop.close()
+        self.loop = None
+
+    @staticmethod
+    async def _shutdown():
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks: t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class BusEngine:
+    """Tek seri port için polling döngüsü: öncelikli komut kuyruğu + periyodik sorgu."""
+
+    def __init__(self, port, baud, devices, data_store, snapshots, bus_loop, on_update=None,
+                 historian=None, on_events=None, verify_writes=False):
+        self.port = port
+        self.baud = int(baud)
+        self.devices = list(devices)    # Bu porttaki cihazlar (poll sırası)
+        self._by_id = {d['id']: d for d in self.devices}
+        self.data_store = data_store    # {sid: state}; yalnız bus loop thread'i yazar
+        self.snapshots = snapshots      # {sid: salt okunur kopya}; UI kilitsiz okur
+        self.bus_loop = bus_loop
+        self.on_update = on_update or (lambda sid: None)   # sid yayınlandı -> UI kirli işaretler
+        self.historian = historian      # Değişen değerleri diske yazar (isteğe bağlı)
+        self.on_events = on_events or (lambda events: None)   # Değişim olayları (yayından sonra)
+        self.verify_writes = verify_writes  # Varsayılan; cihazın ``verify_writes`` alanı geçersiz kılar
+
+        self.client = None
+        self.timing = None
+        self.polling = False
+        self.lock = asyncio.Lock()      # Yalnız seri port (tek seferde tek işlem)
+        # Bekleyen yazmalar (sid, reg) -> (val, ts); aynı register'a yeni yazma eskisinin yerini alır
+        self.command_queue = {}
+        self.group_queue = []           # [(sids, reg, vals, ts)] — grup yazmaları tekil yazmalardan önce
+        self.scheduler = BusScheduler()
+        self.task = None
+        self._wakeup = asyncio.Event()  # Komut geldiğinde boşta bekleyen döngüyü uyandırır
+        self._moving = {}               # sid -> (hedef durum, bitiş zamanı)
+        self._backoff = {}              # sid -> (ardışık başarısız probe, güncel aralık s)
+
+        # Bus metrikleri
+        self.metrics = {'polls': 0, 'poll_errors': 0, 'writes': 0, 'write_errors': 0,
+                        'missed': 0, 'cmd_missed': 0, 'load': 0.0, 'utilization': 0.0,
+                        'offline': 0, 'probes': 0, 'coalesced': 0, 'deduped': 0,
+                        'broadcasts': 0, 'group_bursts': 0, 'group_skipped': 0,
+                        'verified_writes': 0, 'write_mismatches': 0}
+        self.counters = BusCounters()   # Port / slave başına çerçeve ve hata sayaçları (transport artırır)
+        self._busy = 0.0
+        self._busy_window_start = time.monotonic()
+
+    # --- Yaşam döngüsü ---
+    def start(self):
+        """Portu aç (hata varsa burada fırlatır) ve poll task'ını başlat."""
+        self.timing = BusTiming(self.baud)
+        self.timing.apply_device_overrides(self.devices)
+        self.client = AsyncRtuClient(self.port, self.baud, self.timing, self.counters)
+        self.bus_loop.run(self.client.open(), timeout=5)
+
+        for d in self.devices:
+            state = self.data_store.setdefault(d['id'], new_device_state())
+            state['online'] = True
+            state['errors'] = 0
+            self._add_jobs(d)
+            self._publish(d['id'])
+
+        self.polling = True
+        self.task = self.bus_loop.spawn(self._polling_worker())
+
+    def stop(self):
+        self.polling = False
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        if self.client and self.bus_loop.loop:
+            self.bus_loop.call(self.client.close)
+        self.client = None
+
+    # --- Cihaz / komut ---
+    def add_device(self, device):
+        if self.timing:
+            self.timing.set_override(device['id'], device.get('t35_ms'), device.get('turnaround_ms'))
+        self.devices.append(device)
+        self._by_id[device['id']] = device
+        if self.polling:
+            self.bus_loop.call(self._add_jobs, device)
+
+    def remove_device(self, sid):
+        """Cihazı poll programından çıkar; durumu bus loop thread'inde silinir."""
+        self.devices = [d for d in self.devices if d['id'] != sid]
+        self._by_id.pop(sid, None)
+        state = self.data_store.get(sid)
+        if self.polling:
+            self.bus_loop.call(self._forget, sid, state)
+        else:
+            self._forget(sid, state)
+
+    def _forget(self, sid, state):
+        """Çıkarılan cihazın işlerini ve durumunu sil.
+
+        Yalnız çıkarma anındaki ``state`` silinir: cihaz bu çağrı bus
+        thread'ine ulaşmadan aynı ID ile yeniden eklendiyse (aynı veya başka
+        port) yeni durum korunur.
+        """
+        self.scheduler.remove_device(sid)
+        self._moving.pop(sid, None)
+        self._backoff.pop(sid, None)
+        if self.data_store.get(sid) is not state: return
+        if self.historian: self.historian.forget(sid)
+        self.data_store.pop(sid, None)
+        self.snapshots.pop(sid, None)
+
+    def owns(self, sid):
+        return sid in self._by_id
+
+    def submit(self, sid, reg, val, ts=0):
+        """Yazma komutunu bu portun kuyruğuna ekle (thread-safe) — poll task'ı anında işler.
+
+        ``ts`` kuyruğa giriş zamanıdır; komutun deadline'ı ``ts + CMD_DEADLINE``.
+        """
+        self.bus_loop.call(self._enqueue, (sid, reg, val, ts or time.time()))
+
+    def submit_many(self, sid, values, ts=0):
+        """``{reg: val}`` yazmalarını tek çağrıda kuyrukla (thread-safe).
+
+        Hepsi bus thread'inde aynı anda kuyruğa girer; worker araya giremez,
+        bitişik register'lar kesin olarak tek FC16 bloğunda gider.
+        """
+        ts = ts or time.time()
+        self.bus_loop.call(self._enqueue_many, [(sid, reg, val, ts) for reg, val in sorted(values.items())])
+
+    def submit_group(self, sids, reg, vals, ts=0):
+        """``sids`` cihazlarının hepsine aynı yazmayı kuyrukla (thread-safe)."""
+        self.bus_loop.call(self._enqueue_group, (tuple(sids), reg, list(vals), ts or time.time()))
+
+    def poll_now(self, sid, group):
+        """(sid, group) işini hemen hazır yap (thread-safe)."""
+        self.bus_loop.call(self._poll_now, sid, group)
+
+    def refresh(self, sid, group):
+        """Grubun cache'i TTL'den yaşlı veya geçersizse hemen oku — ör. ayar penceresi açılınca (thread-safe)."""
+        self.bus_loop.call(self._refresh, sid, group)
+
+    def _enqueue(self, cmd):
+        """Latest-wins: gönderilmemiş aynı (sid, reg) yazması varsa yenisiyle değiştir.
+
+        Sıra ve kuyruk zamanı ilk yazmanınkidir (deadline ilk tıklamadan sayılır).
+        Aynı değerin tekrarı tek yazmaya iner.
+        """
+        sid, reg, val, ts = cmd
+        key = (sid, reg)
+        pending = self.command_queue.get(key)
+        if pending is None:
+            self.command_queue[key] = (val, ts)
+        elif pending[0] == val:
+            self.metrics['deduped'] += 1
+        else:
+            self.command_queue[key] = (val, pending[1])
+            self.metrics['coalesced'] += 1
+        self._wakeup.set()
+
+    def _enqueue_many(self, cmds):
+        for cmd in cmds:
+            self._enqueue(cmd)
+
+    def _enqueue_group(self, cmd):
+        """Grup yazması, üyelerin aynı register'a bekleyen tekil yazmalarını geçersiz kılar."""
+        sids, reg, vals, ts = cmd
+        for sid in sids:
+            for i in range(len(vals)):
+                if self.command_queue.pop((sid, reg + i), None) is not None:
+                    self.metrics['coalesced'] += 1
+        self.group_queue.append(cmd)
+        self._wakeup.set()
+
+    def _poll_now(self, sid, group):
+        job = self.scheduler.jobs.get((sid, group))
+        if job:
+            self.scheduler.schedule(job, time.monotonic(), self._job_period(job))
+            self._wakeup.set()
+
+    def _refresh(self, sid, group):
+        state = self.data_store.get(sid)
+        if state is None: return
+        ttl = GROUP_POLICY.get(group, DEFAULT_GROUP_POLICY)[3]
+        if time.time() - state['group_ts'].get(group, 0) > ttl:
+            self._poll_now(sid, group)
+
+    def _invalidate(self, sid, rmap, reg, count):
+        """Doğrulanmamış yazma: yazılan register'ların gruplarını geçersiz kıl ve tek okumayla tazele."""
+        try:
+            regs = rmap.covering(reg, count)
+        except ValueError:
+            return
+        for group in {r.group for r in regs if r.group}:
+            self.data_store[sid]['group_ts'].pop(group, None)
+            self._poll_now(sid, group)
+
+    def _publish(self, sid):
+        """Cihazın güncel durumunu yeni sürümle yayınla (tek atama, kilitsiz)."""
+        state = self.data_store.get(sid)
+        if state is None: return
+        state['version'] = state.get('version', 0) + 1
+        self.snapshots[sid] = snapshot_of(state, state['version'])
+        self.on_update(sid)
+
+    # --- Zamanlama ---
+    def _add_jobs(self, device):
+        """Haritadaki her okunabilir register grubu için bir iş (durum önce)."""
+        now = time.monotonic()
+        sid = device['id']
+        rmap = register_map_for(device)
+        groups = sorted({r.group for r in rmap.registers if r.group and r.readable}, key=lambda g: g != 'status')
+        for group in groups:
+            priority = GROUP_POLICY.get(group, DEFAULT_GROUP_POLICY)[0]
+            period = self._group_period(device, group)
+            self.scheduler.add(PollJob(sid, group, priority, period), now if period > 0 else None)
+
+    def _device(self, sid):
+        return self._by_id.get(sid)
+
+    @staticmethod
+    def _period(device, key, default):
+        val = device.get(key) if device else None
+        return float(val) / 1000 if val else default
+
+    @staticmethod
+    def _group_period(device, group):
+        """Grubun politikadaki periyodu (s); cihaz alanı 0 verirse yalnız talep üzerine."""
+        _, key, default, _ = GROUP_POLICY.get(group, DEFAULT_GROUP_POLICY)
+        val = device.get(key) if device else None
+        if val is None or (not val and group == 'status'): return default   # Durum hep periyodik
+        return float(val) / 1000
+
+    def _job_period(self, job):
+        """İşin güncel periyodu: hareketli kapı hızlı, duran kapı yavaş, diğer gruplar kendi politikasıyla."""
+        device = self._device(job.sid)
+        if job.group != 'status':
+            return self._group_period(device, job.group)
+        if job.sid in self._backoff:
+            return self._backoff[job.sid][1]
+        if self._is_moving(job.sid):
+            return self._period(device, 'poll_fast_ms', POLL_FAST)
+        return self._period(device, 'poll_idle_ms', POLL_IDLE)
+
+    def _is_moving(self, sid):
+        moving = self._moving.get(sid)
+        if not moving: return False
+        target, until = moving
+        status = self.data_store.get(sid, {}).get('cache', {}).get(REG_STATUS)
+        if status == target or time.monotonic() > until:
+            del self._moving[sid]
+            return False
+        return True
+
+    def _mark_moving(self, sid, target):
+        """AÇ/KAPAT komutu gitti: kapı hedef duruma gelene kadar hızlı izle."""
+        self._moving[sid] = (target, time.monotonic() + MOVE_WINDOW)
+        self._poll_now(sid, 'status')
+
+    def _enter_backoff(self, sid):
+        """Başarısız okuma: probe aralığını üstel artır (jitter'lı)."""
+        failures = self._backoff.get(sid, (0, 0))[0] + 1
+        delay = min(BACKOFF_BASE * 2 ** (failures - 1), BACKOFF_MAX)
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        self._backoff[sid] = (failures, delay)
+        state = self.data_store[sid]
+        state['backoff_s'] = delay
+        state['probe_failures'] = failures
+        state['next_probe_ts'] = time.time() + delay
+        self.metrics['offline'] = len(self._backoff)
+        self._publish(sid)
+
+    def _clear_backoff(self, sid):
+        """İlk iyi cevapta normal programa dön."""
+        if self._backoff.pop(sid, None) is None: return
+        state = self.data_store[sid]
+        state['backoff_s'] = 0
+        state['probe_failures'] = 0
+        state['next_probe_ts'] = 0
+        self.metrics['offline'] = len(self._backoff)
+        self._publish(sid)
+        # Cihaz kesintide yeniden başlamış olabilir: haritasındaki her grup bir kez tazelenir
+        for group in [g for s, g in self.scheduler.jobs if s == sid]:
+            self._poll_now(sid, group)
+
+    async def _idle(self, delay):
+        self._wakeup.clear()
+        try: await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError: pass
+
+    def _account(self, busy):
+        """Bus meşguliyet süresini topla; pencere dolunca kullanım oranını güncelle."""
+        self._busy += busy
+        now = time.monotonic()
+        window = now - self._busy_window_start
+        if window >= LOAD_WINDOW:
+            self.metrics['utilization'] = self._busy / window
+            self._busy = 0.0
+            self._busy_window_start = now
+        self.metrics['load'] = self.scheduler.load
+        self.metrics['missed'] = self.scheduler.missed
+
+    # --- Poll döngüsü ---
+    async def _polling_worker(self):
+        """Polling döngüsü: deadline'lı komut kuyruğu ve zamanlanmış sorgular.
+
+        Bir turdaki beklenmeyen hata loglanır ve döngü sürer — tek cihazın
+        hatası portun tüm segmentini susturmamalı.
+        """
+        while self.polling:
+            try:
+                await self._poll_once()
+            except Exception:
+                log.exception("Beklenmeyen poll döngüsü hatası (%s)", self.port)
+                await asyncio.sleep(0.1)    # Kalıcı hatada döngü CPU'yu yakmasın
+
+    async def _poll_once(self):
+        """Tek tur: önce grup ve tekil komutlar, yoksa zamanı gelen tek sorgu."""
+        # 1. ÖNCELİK: Komut Kuyruğu (arka plan sorgularının önüne geçer)
+        if self.group_queue:
+            groups, self.group_queue = self.group_queue, []
+            for sids, reg, vals, ts in groups:
+                if time.time() > ts + CMD_DEADLINE:
+                    self.metrics['cmd_missed'] += 1
+                t0 = time.monotonic()
+                await self._write_group(sids, reg, vals, ts)
+                self._account(time.monotonic() - t0)
+            return
+
+        cmds = [(sid, reg, val, ts) for (sid, reg), (val, ts) in self.command_queue.items()]
+        self.command_queue.clear()
+
+        if cmds:
+            # Aynı slave'in ardışık register yazmaları tek FC16 çerçevesine birleşir
+            for sid, reg, vals, ts in self._coalesce_writes(cmds):
+                if time.time() > ts + CMD_DEADLINE:
+                    self.metrics['cmd_missed'] += 1
+                t0 = time.monotonic()
+                ok = await self._write_block(sid, reg, vals, ts)
+                self._account(time.monotonic() - t0)
+                if ok and reg == REG_COMMAND and sid in self.data_store:
+                    self._mark_moving(sid, vals[0])
+            return
+
+        # 2. Zamanlanmış Sorgu
+        now = time.monotonic()
+        job = self.scheduler.pop_ready(now)
+        if job is None:
+            release = self.scheduler.next_release()
+            await self._idle(0.5 if release is None else max(0.0, release - now))
+            return
+
+        device = self._device(job.sid)
+        if device is None:
+            return          # Cihaz çıkarılıyor; işleri _forget siler
+        if job.sid not in self.data_store:
+            # Durum henüz yayınlanmadı: işi düşürme, bir sonraki periyoda ertele
+            if job.period > 0: self.scheduler.schedule(job, now + job.period)
+            return
+        sid = job.sid
+
+        # Çevrimdışı cihaz: yalnız durum grubu, tek kısa denemeyle yoklanır (probe)
+        probing = sid in self._backoff
+        if probing and job.group != 'status':
+            if job.period > 0: self.scheduler.schedule(job, time.monotonic() + job.period)
+            return
+
+        if job.group == 'status':
+            # Loop Time Hesabı (ardışık durum okumaları arası)
+            now = time.time()
+            state = self.data_store[sid]
+            last_poll = state.get('last_poll_ts', 0)
+            if last_poll > 0:
+                loop_time = (now - last_poll) * 1000
+                if loop_time < 20000: # Filtre: mantıksız değerleri ele
+                    state['loop_time'] = loop_time
+                    state['rings']['loop_time'].append(loop_time)
+            state['last_poll_ts'] = now
+            state['missed_deadlines'] = job.missed
+
+        # Sorgula
+        t0 = time.monotonic()
+        if probing:
+            self.metrics['probes'] += 1
+            learned = self.data_store[sid]['reply_timeout_ms'] / 1000
+            ok = await self._query_periodic(sid, register_map_for(device), (job.group,),
+                                            attempts=1, timeout=max(PROBE_TIMEOUT, learned))
+        else:
+            ok = await self._query_periodic(sid, register_map_for(device), (job.group,))
+        exec_time = time.monotonic() - t0
+        self._account(exec_time)
+        if self.scheduler.jobs.get((sid, job.group)) is not job:
+            return      # Okurken çıkarıldı (veya yeniden eklendi): eski iş yeniden kurulmaz
+        if job.group == 'status':
+            if ok: self._clear_backoff(sid)
+            else: self._enter_backoff(sid)
+        period = self._job_period(job)
+        self.scheduler.done(job, exec_time, period)
+        if job.group == 'status':
+            self.data_store[sid]['poll_period'] = period * 1000
+            self._publish(sid)
+
+    @staticmethod
+    def _coalesce_writes(cmds):
+        """Kuyruktaki (sid, reg, val, ts) yazmalarını bitişik bloklara birleştir.
+
+        Her slave için sıra korunur; register adresi bir öncekinin devamıysa
+        aynı bloğa eklenir. Tek register'lık bloklar FC6 ile gönderilir.
+        Dönüş: [(sid, start_reg, [val, ...], ts), ...] — ts bloktaki en eski
+        (sıfır olmayan) kuyruk zamanıdır.
+        """
+        by_slave = {}
+        for sid, reg, val, ts in cmds:
+            blocks = by_slave.setdefault(sid, [])
+            last = blocks[-1] if blocks else None
+            if (last and reg == last[1] + len(last[2])
+                    and len(last[2]) < MAX_WRITE_REGS):
+                last[2].append(val)
+                if ts > 0 and (last[3] == 0 or ts < last[3]): last[3] = ts
+            else:
+                blocks.append([sid, reg, [val], ts])
+        return [tuple(b) for blocks in by_slave.values() for b in blocks]
+
+    async def _write_block(self, sid, reg, vals, ts):
+        """Tek blok yazma: 1 register -> FC6, bitişik çoklu register -> FC16.
+
+        Doğrulamalı modda blok geri okumayla birlikte yazılır (``_verified_write``)
+        ve cache'e yazılan değil cihazdan okunan değerler girer.
+        """
+        device = self._device(sid) or {}
+        readback = self._readback_span(sid, reg, len(vals)) if device.get('verify_writes', self.verify_writes) else None
+        timeout = self._reply_timeout(sid, WRITE_TIMEOUT, WRITE_MARGIN)
+        # RETRY LOGIC (3 Deneme)
+        for attempt in range(3):
+            if attempt: self.counters.add(sid, 'retries')
+            try:
+                async with self.lock:
+                    start_time = time.time() # METRICS: Start timer here
+                    if readback:
+                        payload = await self._verified_write(sid, reg, vals, readback[0], timeout)
+                    elif len(vals) == 1:
+                        # Function code 6 (Write Single Register)
+                        await self.client.write_register(sid, reg, vals[0], timeout=timeout)
+                    else:
+                        # Function code 16 (Write Multiple Registers)
+                        await self.client.write_registers(sid, reg, vals, timeout=timeout)
+
+                self._write_done(sid, reg, vals, ts, start_time, time.time(), readback,
+                                 payload if readback else None)
+                return True
+
+            except ModbusError as e:
+                self.metrics['write_errors'] += 1
+                self._set_error(sid, e)
+                log.warning("Komut hatası (ID %s, Reg %s, deneme %d): %s", sid, reg, attempt + 1, e)
+            except Exception:
+                self.metrics['write_errors'] += 1
+                log.exception("Beklenmeyen komut hatası (ID %s, Reg %s)", sid, reg)
+        return False
+
+    def _write_done(self, sid, reg, vals, ts, start_time, end_time, readback=None, payload=None):
+        """Kabul edilen yazmanın ortak sonrası (tekil blok ve grup serisi): metrikler,
+        gecikme halkaları, çevrimiçi durum, cache (iyimser veya geri okunan), historian,
+        olaylar ve back-off'tan çıkış."""
+        self.metrics['writes'] += 1
+        if sid not in self.data_store: return
+        state = self.data_store[sid]
+        state['slave_resp_time'] = (end_time - start_time) * 1000
+
+        if ts > 0:
+            # Gidiş-dönüş: kuyruğa girişten cevaba; bekleme: kuyruğa girişten hatta çıkışa
+            state['cmd_latency'] = (end_time - ts) * 1000
+            state['queue_wait'] = max(0.0, (start_time - ts) * 1000)
+            state['rings']['cmd_latency'].append(state['cmd_latency'])
+            state['rings']['queue_wait'].append(state['queue_wait'])
+        was_online = state['online']
+        state['online'] = True
+        state['errors'] = 0
+
+        # CACHE UPDATE: doğrulamalıda geri okunan aralık, değilse bloktaki her register (iyimser)
+        rmap = register_map_for(self._device(sid) or {})
+        if readback:
+            span, groups = readback
+            written = span.decode(payload)
+            for g in groups: state['group_ts'][g] = end_time
+        else:
+            written = {reg + i: v for i, v in enumerate(vals) if reg + i != REG_COMMAND}
+            self._invalidate(sid, rmap, reg, len(vals))
+        events = diff_values(sid, rmap, state['cache'], written, end_time)
+        if readback:
+            events.extend(self._check_readback(sid, rmap, reg, vals, readback[0], payload, end_time))
+        state['cache'].update(written)
+        if self.historian: self.historian.record(sid, end_time, written)
+        if not was_online: events.append(ChangeEvent(sid, ONLINE, end_time))
+        self._publish(sid)
+        self.on_events(events)
+        self._clear_backoff(sid)
+
+    def _readback_span(self, sid, reg, count):
+        """Doğrulamalı yazmanın (geri okuma aralığı, tazelenen gruplar); geri okunamıyorsa None.
+
+        Yazılan register'ları kapsayan grupların okuma aralığı tercih edilir —
+        grup aynı işlemde tazelenir. Tek aralığa sığmazsa yalnız yazılan
+        register'lar okunur. Salt yazılır register (ör. ``REG_COMMAND``) doğrulanmaz.
+        """
+        rmap = register_map_for(self._device(sid) or {})
+        try:
+            regs = rmap.covering(reg, count)
+        except ValueError:
+            return None
+        if not all(r.readable for r in regs): return None
+        groups = tuple(sorted({r.group for r in regs if r.group}))
+        if groups and all(r.group for r in regs):
+            for span in rmap.plan(groups):
+                if span.start <= reg and reg + count <= span.start + span.count:
+                    return span, groups
+        return ReadSpan(regs[0].address, regs[-1].end - regs[0].address, regs), ()
+
+    async def _verified_write(self, sid, reg, vals, span, timeout):
+        """Yaz ve ``span``'ı geri oku; ham okuma verisini döndür. Kilit altında çağrılır.
+
+        FC23 tek işlemdir (slave önce yazar, sonra okur). Slave FC23'e ILLEGAL
+        FUNCTION dönerse bir daha denenmez; yazma ve okuma art arda, arada
+        başka çerçeve olmadan gönderilir.
+        """
+        state = self.data_store[sid]
+        use_fc23 = state['fc23'] is not False and (self._device(sid) or {}).get('fc23', True)
+        if use_fc23 and len(vals) <= MAX_RW_WRITE_REGS:
+            try:
+                payload = await self.client.read_write_registers(sid, span.start, span.count, reg, vals, timeout)
+                state['fc23'] = True
+                return payload
+            except ModbusExceptionResponse as e:
+                if e.code != EXC_ILLEGAL_FUNCTION: raise
+                state['fc23'] = False
+                log.info("ID %s FC23 desteklemiyor; yazma ve geri okuma ayrı çerçevelerle", sid)
+        if len(vals) == 1:
+            await self.client.write_register(sid, reg, vals[0], timeout=timeout)
+        else:
+            await self.client.write_registers(sid, reg, vals, timeout=timeout)
+        return await self.client.read_registers(sid, span.start, span.count, timeout=timeout)
+
+    def _check_readback(self, sid, rmap, reg, vals, span, payload, ts):
+        """Yazılan kelimeleri geri okunanlarla karşılaştır; uyuşmazlıklar ``WRITE_MISMATCH`` olayları."""
+        words = struct.unpack(f'>{span.count}H', payload)
+        offset = reg - span.start
+        events = []
+        for i, val in enumerate(vals):
+            got = words[offset + i]
+            if got == val & 0xFFFF: continue
+            r = rmap.by_address.get(reg + i)
+            events.append(ChangeEvent(sid, WRITE_MISMATCH, ts, name=r.name if r else None,
+                                      addr=reg + i, old=val, new=got))
+            log.warning("Yazma doğrulanamadı (ID %s, Reg %s): yazılan %s, okunan %s", sid, reg + i, val, got)
+        self.metrics['verified_writes'] += 1
+        if events:
+            state = self.data_store[sid]
+            state['write_mismatches'] += len(events)
+            state['last_error'] = f"Reg {events[0].addr}: yazılan {events[0].old}, okunan {events[0].new}"
+            self.metrics['write_mismatches'] += len(events)
+        return events
+
+    def _reply_timeout(self, sid, default, margin=1.0):
+        """Cihazın öğrenilmiş cevap timeout'u x ``margin`` (üst sınır ``default``); öğrenilmediyse ``default``."""
+        state = self.data_store.get(sid)
+        learned = state['reply_timeout_ms'] / 1000 if state else 0
+        return min(default, learned * margin) if learned else default
+
+    def _observe_reply(self, sid, reply_s, events, censored=False):
+        """Cevap gecikmesini halkaya ekle; timeout'u ve yavaşlama bayrağını güncelle.
+
+        Timeout = p99 x ``TIMEOUT_MARGIN``; alt sınır baud'dan türetilir, üst
+        sınır ``READ_TIMEOUT``. Timeout'a düşen okuma ``censored`` olarak
+        kullanılan timeout süresiyle kaydedilir: payı aşan gecikmeler sık
+        görülürse p99 ve timeout büyür, tek bir kayıp çerçeve etkilemez.
+        """
+        state = self.data_store[sid]
+        ring = state['rings']['reply']
+        ring.append(reply_s * 1000)
+        if len(ring) < TIMEOUT_SAMPLES: return
+        timeout = max(self.timing.reply_floor(), ring.percentile(99) / 1000 * TIMEOUT_MARGIN)
+        state['reply_timeout_ms'] = min(READ_TIMEOUT, timeout) * 1000
+        if censored: return
+
+        p50 = ring.percentile(50)
+        base = state['reply_baseline_ms']
+        if not base:
+            state['reply_baseline_ms'] = p50
+            return
+        slow = p50 > SLOW_FACTOR * base and p50 - base > SLOW_MIN_MS
+        if not slow:
+            state['reply_baseline_ms'] = base + BASELINE_ALPHA * (p50 - base)
+        if slow != state['slow']:
+            state['slow'] = slow
+            events.append(ChangeEvent(sid, SLOW if slow else SLOW_CLEARED, time.time(),
+                                      name='reply_ms', old=round(base, 1), new=round(p50, 1)))
+            if slow: log.warning("ID %s yavaşlıyor: cevap p50 %.1f ms (taban %.1f ms)", sid, p50, base)
+            else: log.info("ID %s cevap süresi normale döndü: p50 %.1f ms", sid, p50)
+
+    def _set_error(self, sid, e):
+        state = self.data_store.get(sid)
+        if state is not None: state['last_error'] = str(e)
+
+    def _can_broadcast(self, members, reg, count):
+        """Broadcast hattaki her slave'e gider: grup portun tamamını kapsamalı,
+        herkes aynı register haritasını kullanmalı ve register yazılabilir olmalı."""
+        if set(members) != {d['id'] for d in self.devices}: return False
+        if any(d.get('no_broadcast') for d in self.devices): return False
+        rmaps = {id(register_map_for(d)) for d in self.devices}
+        if len(rmaps) != 1: return False
+        try:
+            regs = register_map_for(self.devices[0]).covering(reg, count)
+        except ValueError:
+            return False
+        return all(r.writable for r in regs)
+
+    async def _write_group(self, sids, reg, vals, ts):
+        """Grup yazması: tek broadcast çerçevesi veya sıkı paketlenmiş slave başına seri.
+
+        Broadcast cevapsızdır, seride de yalnız yazmanın kabulü görülür; iki
+        durumda da sonuç ilgili register grubunun öne alınmış okumasıyla
+        doğrulanır (kapı komutunda durum, hedefe varana kadar hızlı izlenir).
+        """
+        members = [sid for sid in sids if self.owns(sid)]
+        if not members: return
+        pdu = write_single_pdu(reg, vals[0]) if len(vals) == 1 else write_multiple_pdu(reg, vals)
+        sent = []
+        if self._can_broadcast(members, reg, len(vals)):
+            async with self.lock:
+                await self.client.broadcast(pdu)
+            self.metrics['broadcasts'] += 1
+            sent = [sid for sid in members if sid not in self._backoff]
+        else:
+            # Çevrimdışı (back-off'taki) üyeler atlanır: her biri bir timeout'a mal olur
+            live = [sid for sid in members if sid not in self._backoff]
+            self.metrics['group_skipped'] += len(members) - len(live)
+            async with self.lock:   # Seri tek kilitte: araya poll girmez
+                for sid in live:
+                    try:
+                        start_time = time.time()
+                        await self.client.transact(sid, pdu, self._reply_timeout(sid, WRITE_TIMEOUT, WRITE_MARGIN))
+                        self._write_done(sid, reg, vals, ts, start_time, time.time())
+                        sent.append(sid)
+                    except ModbusError as e:
+                        self.metrics['write_errors'] += 1
+                        self._set_error(sid, e)
+                        log.warning("Grup komut hatası (ID %s, Reg %s): %s", sid, reg, e)
+                    except Exception:
+                        self.metrics['write_errors'] += 1
+                        log.exception("Beklenmeyen grup komut hatası (ID %s, Reg %s)", sid, reg)
+            self.metrics['group_bursts'] += 1
+
+        reg_def = register_map_for(self._device(members[0]) or {}).by_address.get(reg)
+        confirm = reg_def.group if reg_def and reg_def.group else 'status'
+        for sid in sent:
+            if reg == REG_COMMAND: self._mark_moving(sid, vals[0])
+            else: self._poll_now(sid, confirm)
+
+    async def _query_periodic(self, sid, rmap, groups, attempts=2, timeout=None):
+        """Cihazın register haritasından ``groups`` için planlanan aralıkları oku.
+
+        ``timeout`` verilmezse cihazın öğrenilmiş cevap timeout'u kullanılır ve
+        okumanın cevap gecikmeleri bu timeout'u güncellemek için kaydedilir.
+        Cihaz okuma beklerken çıkarılırsa (durumu silinir veya yenisiyle
+        değişir) sonuç işlenmeden False döner.
+        """
+        state = self.data_store.get(sid)
+        if state is None: return False
+        adaptive = timeout is None
+        if adaptive: timeout = self._reply_timeout(sid, READ_TIMEOUT)
+        spans = rmap.plan(groups)
+        success = False
+        events = []
+        was_online = state['online']
+        state['total_count'] += 1
+        self.metrics['polls'] += 1
+
+        for attempt in range(attempts): # Normalde 2 Burst Retry, probe'da tek deneme
+            if attempt: self.counters.add(sid, 'retries')
+            if self.data_store.get(sid) is not state: return False
+            try:
+                t_start = time.time()
+
+                # Read (hat sessizliği ve çerçeve timeout'u transport'ta)
+                values = {}
+                replies = []
+                async with self.lock:
+                    for span in spans:
+                        payload = await self.client.read_registers(sid, span.start, span.count, timeout=timeout)
+                        replies.append(self.client.last_reply)
+                        values.update(span.decode(payload))
+
+                t_end = time.time()
+                if self.data_store.get(sid) is not state: return False   # Okurken çıkarıldı
+                latency = (t_end - t_start) * 1000
+
+                state['latency'] = latency
+                state['rings']['latency'].append(latency)
+                state['timestamp'] = t_end
+                for g in groups: state['group_ts'][g] = t_end
+                state['online'] = True
+                state['errors'] = 0
+                state['success_count'] += 1
+
+                events = diff_values(sid, rmap, state['cache'], values, t_end)
+                state['cache'].update(values)
+                if self.historian: self.historian.record(sid, t_end, values)
+                for reply in replies:
+                    self._observe_reply(sid, reply, events)
+
+                success = True
+                break
+            except ModbusTimeout as e:
+                # Çevrimdışı düğümde olağan: yalnız sayaç (transport) ve debug
+                if self.data_store.get(sid) is not state: return False
+                self._set_error(sid, e)
+                if adaptive and state['online']:
+                    self._observe_reply(sid, timeout, events, censored=True)
+                log.debug("Okuma timeout (ID %s, deneme %d): %s", sid, attempt + 1, e)
+            except ModbusExceptionResponse as e:
+                if self.data_store.get(sid) is not state: return False
+                self._set_error(sid, e)
+                log.warning("Exception cevabı (ID %s, kod %s): %s", sid, e.code, e)
+            except ModbusError as e:
+                if self.data_store.get(sid) is not state: return False
+                self._set_error(sid, e)
+                log.warning("Okuma hatası (ID %s, deneme %d): %s", sid, attempt + 1, e)
+            except Exception:
+                log.exception("Beklenmeyen okuma hatası (ID %s)", sid)
+
+        if self.data_store.get(sid) is not state: return False
+        if not success:
+            state['errors'] += 1
+            self.metrics['poll_errors'] += 1
+
+        if state['errors'] >= 1:
+            state['online'] = False
+        online = state['online']
+        if self.historian:
+            self.historian.record(sid, time.time(), {ONLINE_ADDR: int(online)})
+        if online != was_online:
+            events.append(ChangeEvent(sid, ONLINE if online else OFFLINE, time.time()))
+        self._publish(sid)
+        self.on_events(events)
+        return success
+
+
+class ModbusEngine:
+    """GUI'siz poll motoru: tüm portlar, tek loop, cihaz durumu ve aboneler.
+
+    Servis, test veya başka bir arayüz bu sınıfı doğrudan kullanır; panel de
+    onun tüketicilerinden yalnızca biridir. Abone geri çağrıları bus loop
+    thread'inde ``callback(sid, snapshot)`` olarak çalışır — kısa tutulmalı.
+    """
+
+    def __init__(self, devices=(), historian=None, verify_writes=False):
+        # Panel kendi kaydını (DeviceRegistry) paylaşır; liste verilirse sarılır
+        self.devices = devices if isinstance(devices, DeviceRegistry) else DeviceRegistry(devices)
+        self.historian = historian  # modbus_historian.Historian (isteğe bağlı)
+        self.verify_writes = verify_writes  # Yazmaları geri okumayla doğrula (cihaz alanı geçersiz kılar)
+        self.data_store = {}        # sid -> mutable durum (yalnız bus thread yazar)
+        self.snapshots = {}         # sid -> salt okunur, sürümlü kopya (kilitsiz okunur)
+        self.buses = {}             # port -> BusEngine
+        self.bus_loop = BusLoop()
+        self.running = False
+        self.default_port = None
+        self.default_baud = None
+        self._subscribers = []
+        self.events = EventBus()    # Tipli değişim olayları (modbus_events)
+        for d in self.devices:
+            self._init_state(d['id'])
+
+    def _init_state(self, sid):
+        self.data_store[sid] = new_device_state()
+        self.snapshots[sid] = snapshot_of(self.data_store[sid], 0)
+
+    # --- Yaşam döngüsü ---
+    def start(self, default_port, default_baud):
+        """Her port için bir ``BusEngine`` başlat. Port açılamazsa hepsini durdurup fırlatır."""
+        if self.running: return
+        self.default_port, self.default_baud = default_port, int(default_baud)
+        if self.historian: self.historian.start()
+        self.bus_loop.start()
+        try:
+            for port, (baud, members) in group_by_port(self.devices, self.default_port, self.default_baud).items():
+                self._start_bus(port, baud, members)
+        except Exception:
+            self.stop()
+            raise
+        self.running = True
+
+    def stop(self):
+        for bus in self.buses.values():
+            bus.stop()
+        self.buses = {}
+        self.bus_loop.stop()
+        if self.historian: self.historian.close()   # Kuyrukta kalanlar diske yazılır
+        self.running = False
+
+    def _start_bus(self, port, baud, devices):
+        bus = BusEngine(port, baud, devices, self.data_store, self.snapshots, self.bus_loop,
+                        on_update=self._notify, historian=self.historian,
+                        on_events=self.events.publish, verify_writes=self.verify_writes)
+        bus.start()
+        self.buses[port] = bus
+        return bus
+
+    # --- Cihazlar ---
+    def add_device(self, device):
+        """Cihazı kayda ekle; motor çalışıyorsa portunun motoruna ver (port yeni ise başlat)."""
+        self.devices.add(device)
+        self._init_state(device['id'])
+        if not self.running: return
+        port = device.get('port') or self.default_port
+        bus = self.buses.get(port)
+        if bus:
+            bus.add_device(device)
+        else:
+            self._start_bus(port, device.get('baud') or self.default_baud, [device])
+
+    def remove_device(self, sid):
+        self.devices.remove(sid)
+        bus = self.bus_for(sid)
+        if bus:
+            bus.remove_device(sid)  # Durum bus thread'inde silinir
+        else:
+            self.data_store.pop(sid, None)
+            self.snapshots.pop(sid, None)
+
+    def bus_for(self, sid):
+        """Cihazın bağlı olduğu BusEngine (çalışmıyorsa None)."""
+        for bus in self.buses.values():
+            if bus.owns(sid): return bus
+        return None
+
+    # --- Komut / okuma ---
+    def submit(self, sid, reg, val, ts=0):
+        """Yazmayı cihazın portuna kuyrukla (thread-safe). Cihaz bağlı değilse False."""
+        bus = self.bus_for(sid)
+        if bus is None: return False
+        bus.submit(sid, reg, val, ts)
+        return True
+
+    def submit_many(self, sid, values, ts=0):
+        """Aynı cihaza birden çok yazma ``{reg: val}`` — tek kuyruklama, bitişikler tek FC16."""
+        bus = self.bus_for(sid)
+        if bus is None: return False
+        bus.submit_many(sid, values, ts)
+        return True
+
+    def groups(self):
+        """{grup adı: [sid, ...]} — cihazların ``groups`` alanı + ``ALL``."""
+        return device_groups(self.devices)
+
+    def submit_group(self, group, reg, val, ts=0):
+        """Yazmayı grubun (ad veya sid listesi) tüm üyelerine gönder; kuyruklanan üye sayısı.
+
+        Her port kendi payını ayrı işler: grup portun tüm cihazlarını kapsıyor
+        ve hepsi aynı register haritasındaysa tek broadcast çerçevesi, değilse
+        üye başına sıkı bir yazma serisi gönderilir.
+        """
+        sids = self.groups().get(group, []) if isinstance(group, str) else list(group)
+        vals = list(val) if isinstance(val, (list, tuple)) else [val]
+        by_bus = {}
+        for sid in sids:
+            bus = self.bus_for(sid)
+            if bus: by_bus.setdefault(bus, []).append(sid)
+        for bus, members in by_bus.items():
+            bus.submit_group(members, reg, vals, ts)
+        return sum(len(m) for m in by_bus.values())
+
+    def poll_now(self, sid, group):
+        bus = self.bus_for(sid)
+        if bus: bus.poll_now(sid, group)
+
+    def refresh(self, sid, group):
+        """Grubu yalnız cache'i TTL'den yaşlıysa (veya yazmayla geçersizleştiyse) oku."""
+        bus = self.bus_for(sid)
+        if bus: bus.refresh(sid, group)
+
+    def snapshot(self, sid):
+        return self.snapshots.get(sid)
+
+    def device(self, sid):
+        return self.devices.get(sid)
+
+    @property
+    def metrics(self):
+        """{port: bus metrikleri}."""
+        return {port: bus.metrics for port, bus in self.buses.items()}
+
+    def stats(self):
+        """Dışa aktarım için sayaçlar: port ve slave başına çerçeve/bayt/hata, meşguliyet, motor metrikleri, cihaz sağlığı.
+
+        Herhangi bir thread'den çağrılabilir; JSON'a doğrudan yazılabilir.
+        """
+        ports = {}
+        for port, bus in list(self.buses.items()):
+            ports[port] = bus.counters.snapshot()
+            ports[port]['engine'] = dict(bus.metrics)
+        snaps = list(self.snapshots.items())
+        online = {sid: snap['online'] for sid, snap in snaps}
+        health = {sid: {'timeout_ms': snap['reply_timeout_ms'] or READ_TIMEOUT * 1000,
+                        'baseline_ms': snap['reply_baseline_ms'], 'slow': snap['slow']}
+                  for sid, snap in snaps}
+        return {'time': time.time(), 'ports': ports, 'online': online, 'health': health}
+
+    # --- Abonelik ---
+    def subscribe(self, callback):
+        """Her yayında ``callback(sid, snapshot)`` çağrılır; aboneliği kaldıran fonksiyon döner."""
+        self._subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def subscribe_events(self, callback, kinds=None, sids=None, predicate=None):
+        """Değişim olaylarına geri çağrıyla abone ol (bus loop thread'inde). ``sub.cancel()`` ile bırakılır."""
+        return self.events.subscribe(callback, kinds, sids, predicate)
+
+    def event_queue(self, kinds=None, sids=None, predicate=None, maxsize=1000, loop=None):
+        """Değişim olaylarını ``sub.queue`` (asyncio.Queue) ile al; ``loop`` kuyruğu okuyan loop."""
+        return self.events.subscribe_queue(kinds, sids, predicate, maxsize, loop)
+
+    def _notify(self, sid):
+        snap = self.snapshots.get(sid)
+        for cb in list(self._subscribers):
+            try: cb(sid, snap)
+            except Exception: log.exception("Abone hatası (SID %s)", sid)
+
+
+def main():
+    """GUI'siz çalıştırma: devices.json'daki cihazları poll et, durum değişimlerini yaz."""
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Modbus RTU poll motoru (GUI'siz)")
+    ap.add_argument("--port", required=True, help="Port alanı olmayan cihazlar için varsayılan port")
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--devices", default="devices.json")
+    ap.add_argument("--history", help="Okunan değerleri bu SQLite dosyasına kaydet (ör. history.db)")
+    ap.add_argument("--metrics-prom", help="Prometheus metin dosyası (node_exporter textfile collector)")
+    ap.add_argument("--metrics-json", help="Sayaçların yazılacağı JSON dosyası")
+    ap.add_argument("--metrics-interval", type=float, default=10.0, help="Dışa aktarım aralığı (s)")
+    ap.add_argument("--log-level", default="INFO")
+    args = ap.parse_args()
+    setup_logging(args.log_level)
+
+    historian = None
+    if args.history:
+        historian = Historian(args.history)
+    engine = ModbusEngine(DeviceRegistry.load(args.devices), historian=historian)
+
+    last = {}
+    def on_update(sid, snap):
+        state = (snap['online'], snap['cache'].get(REG_STATUS))
+        if last.get(sid) != state:
+            last[sid] = state
+            print(f"{time.strftime('%H:%M:%S')} SID {sid}: online={state[0]} status={state[1]}")
+
+    engine.subscribe(on_update)
+    engine.start(args.port, args.baud)
+    exporter = MetricsExporter(engine, args.metrics_prom, args.metrics_json, args.metrics_interval)
+    exporter.start()
+    try:
+        while True: time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        exporter.stop()
+        engine.stop()
+
+
+if __name__ == "__main__":
+    main()
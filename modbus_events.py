@@ -0,0 +1,161 @@
+"""Değişim (change-of-value) olayları ve abonelikleri.
+
+Motor her okumayı önceki cache ile karşılaştırır ve yalnız farkları tipli
+olaylar olarak yayınlar; tüketiciler ``data_store``'u taramak yerine ilgilendikleri
+olaylara abone olur. Boşta bekleyen sistemde hiç olay üretilmez.
+
+Abonelik iki türlüdür: geri çağrı (bus loop thread'inde çalışır, kısa
+tutulmalı) veya ``asyncio.Queue`` (abonenin kendi event loop'una thread-safe
+aktarılır). Her abonelik olay tipine, cihaza veya bir predicate'e göre süzülür.
+"""
+import asyncio
+
+from modbus_log import get_logger
+
+log = get_logger(__name__)
+
+# --- OLAY TİPLERİ ---
+STATUS          = 'status'            # Durum register'ı değişti
+ERROR_SET       = 'error_set'         # Hata bit(ler)i set oldu
+ERROR_CLEARED   = 'error_cleared'
+WARNING_SET     = 'warning_set'
+WARNING_CLEARED = 'warning_cleared'
+ONLINE          = 'online'
+OFFLINE         = 'offline'
+PARAM           = 'param'             # Parametre register'ı değişti (okuma veya yazma)
+VALUE           = 'value'             # Diğer register'lar
+SLOW            = 'slow'              # Cevap süresi taban çizgisinin belirgin üstüne çıktı
+SLOW_CLEARED    = 'slow_cleared'
+WRITE_MISMATCH  = 'write_mismatch'    # Doğrulamalı yazma: geri okunan değer yazılandan farklı (old: yazılan)
+
+# bitfield register adı -> (set, cleared) olay tipleri
+BIT_EVENTS = {
+    'errors':   (ERROR_SET, ERROR_CLEARED),
+    'warnings': (WARNING_SET, WARNING_CLEARED),
+}
+
+
+class ChangeEvent:
+    """Tek bir değişim. Bit olaylarında ``bits`` değişen bitlerin indeksleridir."""
+    __slots__ = ('sid', 'kind', 'ts', 'name', 'addr', 'old', 'new', 'bits')
+
+    def __init__(self, sid, kind, ts, name=None, addr=None, old=None, new=None, bits=()):
+        self.sid = sid
+        self.kind = kind
+        self.ts = ts
+        self.name = name
+        self.addr = addr
+        self.old = old
+        self.new = new
+        self.bits = bits
+
+    def __repr__(self):
+        if self.name is None: return f"ChangeEvent({self.sid}, {self.kind!r})"
+        extra = f" bits={list(self.bits)}" if self.bits else ""
+        return f"ChangeEvent({self.sid}, {self.kind!r}, {self.name}: {self.old} -> {self.new}{extra})"
+
+
+def diff_values(sid, rmap, old, new, ts):
+    """Yeni okunan ``{addr: değer}`` ile önceki cache arasındaki olaylar.
+
+    İlk okumada (``old``'da adres yok) önceki değer None kabul edilir; bit
+    olaylarında önceki değer 0 sayılır.
+    """
+    events = []
+    for addr, val in new.items():
+        prev = old.get(addr)
+        if prev == val: continue
+        reg = rmap.by_address.get(addr)
+        name = reg.name if reg else None
+        if reg is not None and reg.type == 'bitfield':
+            set_kind, clr_kind = BIT_EVENTS.get(reg.name, (VALUE, VALUE))
+            p = prev or 0
+            raised = _bits(val & ~p)
+            cleared = _bits(p & ~val)
+            if raised: events.append(ChangeEvent(sid, set_kind, ts, name, addr, prev, val, raised))
+            if cleared: events.append(ChangeEvent(sid, clr_kind, ts, name, addr, prev, val, cleared))
+            continue
+        if reg is not None and reg.group == 'status':
+            kind = STATUS
+        elif reg is not None and reg.group == 'params':
+            kind = PARAM
+        else:
+            kind = VALUE
+        events.append(ChangeEvent(sid, kind, ts, name, addr, prev, val))
+    return events
+
+
+def _bits(mask):
+    return tuple(i for i in range(mask.bit_length()) if mask >> i & 1)
+
+
+class Subscription:
+    """Bir abonenin süzgeci ve teslim hedefi (geri çağrı veya kuyruk)."""
+
+    def __init__(self, bus, kinds=None, sids=None, predicate=None, callback=None, queue=None, loop=None):
+        self.bus = bus
+        self.kinds = frozenset(kinds) if kinds else None
+        self.sids = frozenset(sids) if sids else None
+        self.predicate = predicate
+        self.callback = callback
+        self.queue = queue
+        self.loop = loop
+        self.dropped = 0        # Kuyruk doluyken atılan olaylar
+
+    def matches(self, ev):
+        return ((self.kinds is None or ev.kind in self.kinds)
+                and (self.sids is None or ev.sid in self.sids)
+                and (self.predicate is None or self.predicate(ev)))
+
+    def deliver(self, ev):
+        if self.callback is not None:
+            self.callback(ev)
+            return
+        try: running = asyncio.get_running_loop()
+        except RuntimeError: running = None
+        if running is self.loop:
+            self._put(ev)
+        else:
+            self.loop.call_soon_threadsafe(self._put, ev)
+
+    def _put(self, ev):
+        try: self.queue.put_nowait(ev)
+        except asyncio.QueueFull: self.dropped += 1
+
+    def cancel(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """Olayları süzgeçli abonelere dağıtır."""
+
+    def __init__(self):
+        self._subs = []
+
+    def subscribe(self, callback, kinds=None, sids=None, predicate=None):
+        """``callback(event)`` bus loop thread'inde çağrılır."""
+        sub = Subscription(self, kinds, sids, predicate, callback=callback)
+        self._subs.append(sub)
+        return sub
+
+    def subscribe_queue(self, kinds=None, sids=None, predicate=None, maxsize=1000, loop=None):
+        """Olayları ``sub.queue`` (asyncio.Queue) içine koyan abonelik.
+
+        ``loop`` kuyruğun okunduğu event loop'tur (varsayılan: çağıranın loop'u).
+        """
+        loop = loop or asyncio.get_running_loop()
+        sub = Subscription(self, kinds, sids, predicate, queue=asyncio.Queue(maxsize), loop=loop)
+        self._subs.append(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        if sub in self._subs:
+            self._subs.remove(sub)
+
+    def publish(self, events):
+        if not events or not self._subs: return
+        for sub in list(self._subs):
+            for ev in events:
+                if not sub.matches(ev): continue
+                try: sub.deliver(ev)
+                except Exception: log.exception("Olay abone hatası (%s, SID %s)", ev.kind, ev.sid)
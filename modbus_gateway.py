@@ -0,0 +1,208 @@
+"""Poll cache'inden okuma yapan Modbus TCP gateway.
+
+RS-485 hattı tek master'lıdır ve hattı ``ModbusEngine`` sürer. Gateway, SCADA
+veya logger gibi diğer sistemlerin FC3/FC4 okumalarını motorun yayınladığı
+snapshot'lardan cevaplar; hatta ek çerçeve gönderilmez. Unit ID = slave ID.
+
+İstenen register gruplarının cache yaşı istemcinin ``max_age`` sınırından
+büyükse o gruplar için ``poll_now`` istenir ve taze okuma ``refresh_timeout``
+kadar beklenir; aynı veriyi okuyan istemci sayısı bus yükünü artırmaz.
+FC6/FC16 yazmaları harita üzerinden doğrulanıp motorun öncelikli komut
+kuyruğuna tek seferde (``submit_many``) verilir ve kuyruğa girince onaylanır;
+FC16 bus'a da bölünmeden tek çerçeve olarak gider.
+
+    python modbus_gateway.py --port COM3 --baud 19200 --listen 127.0.0.1:5020 --max-age 1.0
+"""
+import argparse
+import asyncio
+import struct
+import time
+
+from modbus_engine import BusLoop, ModbusEngine
+from modbus_registry import DeviceRegistry
+from modbus_regmap import register_map_for
+from modbus_rtu import (
+    EXC_GATEWAY_TARGET, EXC_ILLEGAL_ADDRESS, EXC_ILLEGAL_FUNCTION, EXC_ILLEGAL_VALUE, FC_READ_HOLDING,
+    FC_READ_INPUT, FC_WRITE_SINGLE, FC_WRITE_MULTIPLE,
+)
+
+GATEWAY_HOST = "127.0.0.1"
+GATEWAY_PORT = 5020         # 502 root yetkisi ister; test için yüksek port
+MAX_AGE = 1.0               # Varsayılan en fazla cache yaşı (s)
+REFRESH_TIMEOUT = 1.0       # Bayat cache için taze okumayı bekleme süresi (s)
+REFRESH_POLL = 0.01
+
+MBAP = struct.Struct('>HHHB')   # transaction, protokol (0), uzunluk, unit
+
+
+class ModbusTcpGateway:
+    """Ayrı bir loop thread'inde çalışan Modbus TCP sunucusu."""
+
+    def __init__(self, engine, host=GATEWAY_HOST, port=GATEWAY_PORT, max_age=MAX_AGE,
+                 client_max_age=None, refresh_timeout=REFRESH_TIMEOUT):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.max_age = max_age
+        self.client_max_age = dict(client_max_age or {})   # istemci IP -> max_age (s)
+        self.refresh_timeout = refresh_timeout
+        self.loop = BusLoop()
+        self.server = None
+        self.stats = {'clients': 0, 'requests': 0, 'cache_hits': 0, 'refreshes': 0,
+                      'writes': 0, 'exceptions': 0}
+
+    def start(self):
+        self.loop.start()
+        try:
+            self.server = self.loop.run(self._serve(), timeout=5)
+        except Exception:
+            self.loop.stop()
+            raise
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _serve(self):
+        return await asyncio.start_server(self._client, self.host, self.port)
+
+    def stop(self):
+        if self.server:
+            self.loop.call(self.server.close)
+            self.server = None
+        self.loop.stop()
+
+    # --- Bağlantı ---
+    async def _client(self, reader, writer):
+        peer = writer.get_extra_info('peername') or ("?",)
+        max_age = self.client_max_age.get(peer[0], self.max_age)
+        self.stats['clients'] += 1
+        try:
+            while True:
+                tid, proto, length, unit = MBAP.unpack(await reader.readexactly(MBAP.size))
+                pdu = await reader.readexactly(length - 1)
+                if proto != 0: continue
+                resp = await self._handle(unit, pdu, max_age)
+                writer.write(MBAP.pack(tid, 0, len(resp) + 1, unit) + resp)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass    # İstemci kapandı veya gateway durduruluyor
+        finally:
+            writer.close()
+
+    # --- İstek ---
+    async def _handle(self, unit, pdu, max_age):
+        self.stats['requests'] += 1
+        fc = pdu[0] if pdu else 0
+        try:
+            if fc in (FC_READ_HOLDING, FC_READ_INPUT):
+                start, count = struct.unpack_from('>HH', pdu, 1)
+                if not 1 <= count <= 125: return self._exception(fc, EXC_ILLEGAL_VALUE)
+                words = await self._read(unit, start, count, max_age)
+                if isinstance(words, int): return self._exception(fc, words)
+                return struct.pack(f'>BB{count}H', fc, 2 * count, *words)
+            if fc == FC_WRITE_SINGLE:
+                reg, val = struct.unpack_from('>HH', pdu, 1)
+                err = self._write(unit, reg, [val])
+                return self._exception(fc, err) if err else pdu[:5]
+            if fc == FC_WRITE_MULTIPLE:
+                start, count, nbytes = struct.unpack_from('>HHB', pdu, 1)
+                if not 1 <= count <= 123 or nbytes != 2 * count: return self._exception(fc, EXC_ILLEGAL_VALUE)
+                err = self._write(unit, start, list(struct.unpack_from(f'>{count}H', pdu, 6)))
+                return self._exception(fc, err) if err else pdu[:5]
+        except struct.error:
+            return self._exception(fc, EXC_ILLEGAL_VALUE)
+        return self._exception(fc, EXC_ILLEGAL_FUNCTION)
+
+    async def _read(self, sid, start, count, max_age):
+        """Ham kelimeler veya exception kodu."""
+        device = self.engine.device(sid)
+        if device is None: return EXC_GATEWAY_TARGET
+        rmap = register_map_for(device)
+        try:
+            groups = {r.group for r in rmap.covering(start, count)}
+        except ValueError:
+            return EXC_ILLEGAL_ADDRESS
+
+        snap = self.engine.snapshot(sid)
+        if not self._fresh(snap, groups, max_age):
+            # Bayat: yalnız bu gruplar için öne alınmış okuma iste, tazelenmesini bekle
+            self.stats['refreshes'] += 1
+            for g in groups:
+                if g: self.engine.poll_now(sid, g)
+            deadline = time.monotonic() + self.refresh_timeout
+            while not self._fresh(snap, groups, max_age) and time.monotonic() < deadline:
+                await asyncio.sleep(REFRESH_POLL)
+                snap = self.engine.snapshot(sid)
+            if not self._fresh(snap, groups, max_age): return EXC_GATEWAY_TARGET
+        else:
+            self.stats['cache_hits'] += 1
+
+        try:
+            words = rmap.encode(snap['cache'], start, count)
+        except ValueError:
+            return EXC_ILLEGAL_ADDRESS
+        return EXC_GATEWAY_TARGET if words is None else words
+
+    @staticmethod
+    def _fresh(snap, groups, max_age):
+        if snap is None or not snap['online']: return False
+        now = time.time()
+        return all(now - snap['group_ts'].get(g, 0) <= max_age for g in groups if g)
+
+    def _write(self, sid, start, vals):
+        """Yazmayı doğrula ve motor kuyruğuna ver; hata varsa exception kodu."""
+        device = self.engine.device(sid)
+        if device is None: return EXC_GATEWAY_TARGET
+        try:
+            regs = register_map_for(device).covering(start, len(vals))
+        except ValueError:
+            return EXC_ILLEGAL_ADDRESS
+        if any(not r.writable for r in regs): return EXC_ILLEGAL_ADDRESS
+        # Tek kuyruklama: FC16 bus'a da tek çerçeve olarak gider, ya hep ya hiç kuyruklanır
+        if not self.engine.submit_many(sid, {start + i: v for i, v in enumerate(vals)}):
+            return EXC_GATEWAY_TARGET
+        self.stats['writes'] += 1
+        return 0
+
+    def _exception(self, fc, code):
+        self.stats['exceptions'] += 1
+        return bytes(((fc | 0x80) & 0xFF, code))
+
+
+def _client_ages(items):
+    """['10.0.0.5=5', ...] -> {'10.0.0.5': 5.0}."""
+    ages = {}
+    for item in items or []:
+        ip, age = item.split('=')
+        ages[ip] = float(age)
+    return ages
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Poll cache'inden cevap veren Modbus TCP gateway")
+    ap.add_argument("--port", required=True, help="Port alanı olmayan cihazlar için varsayılan seri port")
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--devices", default="devices.json")
+    ap.add_argument("--listen", default=f"{GATEWAY_HOST}:{GATEWAY_PORT}", help="host:port")
+    ap.add_argument("--max-age", type=float, default=MAX_AGE, help="Varsayılan en fazla cache yaşı (s)")
+    ap.add_argument("--client-age", action="append", help="İstemci başına cache yaşı: IP=saniye")
+    args = ap.parse_args()
+
+    engine = ModbusEngine(DeviceRegistry.load(args.devices))
+    host, port = args.listen.rsplit(':', 1)
+    gateway = ModbusTcpGateway(engine, host, int(port), args.max_age, _client_ages(args.client_age))
+
+    engine.start(args.port, args.baud)
+    try:
+        gateway.start()
+        print(f"Modbus TCP gateway: {host}:{port} -> {', '.join(engine.buses)}")
+        while True:
+            time.sleep(10)
+            print(gateway.stats)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.stop()
+        engine.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Poll edilen register'lar için diskte zaman serisi kaydı (SQLite, WAL).
+
+Bus thread'i yalnızca ``record`` çağırır: değer bir öncekinden farklıysa
+(veya o register'ın keyframe zamanı geldiyse) örnek bellekteki kuyruğa
+eklenir. Keyframe register başınadır; aynı çevrimde ayrı ``record``
+çağrılarıyla gelen durum, parametre ve çevrimiçi değerlerinin her biri
+periyodik olarak yazılır. Diske yazma, kuyruğu toplu olarak boşaltan ayrı
+bir thread'de yapılır; bus thread'i hiçbir zaman disk I/O beklemez. Kuyruk
+dolarsa en eski örnek atılır; yazma hatası loglanır ve grup bir sonraki
+turda yeniden denenir.
+
+Tablo ``(sid, addr, ts)`` anahtarlı, rowid'siz bir tablodur; bir register'ın zaman
+aralığı sorgusu tek bir indeks taramasıdır. ``addr`` = ``ONLINE_ADDR`` cihazın
+çevrimiçi durumunu (1/0) tutar.
+"""
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import closing
+
+from modbus_log import get_logger
+
+log = get_logger(__name__)
+
+HISTORY_DB   = "history.db"
+KEYFRAME_S   = 60.0      # Değişmese de bu aralıkla tüm değerler yazılır
+FLUSH_S      = 1.0       # Toplu yazma aralığı
+MAX_PENDING  = 100_000   # Bellekte bekleyen en fazla örnek
+ONLINE_ADDR  = -1        # Sözde adres: cihaz çevrimiçi mi
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    sid   INTEGER NOT NULL,
+    addr  INTEGER NOT NULL,
+    ts    REAL    NOT NULL,
+    value REAL    NOT NULL,
+    key   INTEGER NOT NULL DEFAULT 0,   -- 1: keyframe, 0: değişim
+    PRIMARY KEY (sid, addr, ts)
+) WITHOUT ROWID
+"""
+
+
+class Historian:
+    """Değişimde + periyodik keyframe ile kayıt yapan, toplu yazan historian."""
+
+    def __init__(self, path=HISTORY_DB, keyframe_s=KEYFRAME_S, flush_s=FLUSH_S, max_pending=MAX_PENDING):
+        self.path = path
+        self.keyframe_s = keyframe_s
+        self.flush_s = flush_s
+        self.stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'write_errors': 0}
+        self._pending = deque(maxlen=max_pending)   # append/popleft thread-safe
+        self._last = {}         # (sid, addr) -> (son kaydedilen değer, son keyframe zamanı) (yalnız bus thread)
+        self._retry = []        # Yazılamayan grup (yalnız yazıcı thread)
+        self._thread = None
+        self._stop = threading.Event()
+
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            with db: db.execute(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=5)
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # --- Yaşam döngüsü ---
+    def start(self):
+        if self._thread: return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._writer, name="historian", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Yazıcıyı durdur; kuyrukta kalanları diske yaz."""
+        if not self._thread: return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    # --- Bus thread'i ---
+    def record(self, sid, ts, values):
+        """``{addr: değer}`` okumasını kaydet (değişenler ve keyframe zamanı gelen register'lar)."""
+        for addr, val in values.items():
+            k = (sid, addr)
+            last = self._last.get(k)
+            keyframe = last is None or ts - last[1] >= self.keyframe_s
+            if not keyframe and last[0] == val: continue
+            self._last[k] = (val, ts if keyframe else last[1])
+            if len(self._pending) == self._pending.maxlen: self.stats['dropped'] += 1
+            self._pending.append((sid, addr, ts, val, int(keyframe)))
+            self.stats['recorded'] += 1
+
+    def forget(self, sid):
+        """Silinen cihazın değişim takibini bırak (kayıtları diskte kalır)."""
+        for k in [k for k in self._last if k[0] == sid]:
+            del self._last[k]
+
+    # --- Yazıcı thread'i ---
+    def _writer(self):
+        db = self._connect()
+        try:
+            while not self._stop.wait(self.flush_s):
+                self._flush(db)
+            self._flush(db)
+        finally:
+            db.close()
+
+    def _flush(self, db):
+        batch, self._retry = self._retry, []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        if not batch: return
+        try:
+            with db:
+                db.executemany("INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?)", batch)
+        except sqlite3.Error as e:
+            # Thread çalışmaya devam eder; grup sonraki turda yeniden denenir
+            self.stats['write_errors'] += 1
+            excess = len(batch) - self._pending.maxlen
+            if excess > 0:
+                self.stats['dropped'] += excess     # Kuyruk sınırı yeniden denenen grup için de geçerli
+                batch = batch[excess:]
+            self._retry = batch
+            log.error("Historian yazma hatası (%s, %d örnek bekliyor): %s", self.path, len(batch), e)
+            return
+        self.stats['written'] += len(batch)
+        self.stats['flushes'] += 1
+
+    # --- Sorgular (herhangi bir thread; WAL okuyucuyu bloklamaz) ---
+    def query(self, sid, addr, t0, t1=None):
+        """[t0, t1] aralığındaki örnekler [(ts, değer), ...]; t0 anındaki değer ilk satırdır."""
+        t1 = time.time() if t1 is None else t1
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT ts, value FROM samples WHERE sid=? AND addr=? AND ts>=? AND ts<=? ORDER BY ts",
+                (sid, addr, t0, t1)).fetchall()
+            before = db.execute(
+                "SELECT ts, value FROM samples WHERE sid=? AND addr=? AND ts<? ORDER BY ts DESC LIMIT 1",
+                (sid, addr, t0)).fetchone()
+        if before and (not rows or rows[0][0] > t0):
+            rows.insert(0, (t0, before[1]))
+        return rows
+
+    def value_at(self, sid, addr, ts):
+        """``ts`` anında geçerli olan değer (yoksa None)."""
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT value FROM samples WHERE sid=? AND addr=? AND ts<=? ORDER BY ts DESC LIMIT 1",
+                (sid, addr, ts)).fetchone()
+        return row[0] if row else None
+
+    def downsample(self, sid, addr, t0, t1, window_s):
+        """Zaman penceresi başına [(pencere başı, min, max, son, adet), ...].
+
+        Değişimsiz pencereler atlanır; değer bir önceki pencerenin ``son``
+        değeridir (kayıt adım fonksiyonudur).
+        """
+        with closing(self._connect()) as db:
+            return db.execute(
+                """SELECT ? + g.w * ?, g.lo, g.hi, s.value, g.n
+                   FROM (SELECT CAST((ts - ?) / ? AS INTEGER) AS w, MIN(value) AS lo, MAX(value) AS hi,
+                                COUNT(*) AS n, MAX(ts) AS t_last
+                         FROM samples WHERE sid=? AND addr=? AND ts>=? AND ts<? GROUP BY w) AS g
+                   JOIN samples AS s ON s.sid=? AND s.addr=? AND s.ts=g.t_last
+                   ORDER BY g.w""",
+                (t0, window_s, t0, window_s, sid, addr, t0, t1, sid, addr)).fetchall()
@@ -0,0 +1,55 @@
+"""Seviyeli ve hız sınırlı log.
+
+Bus döngüsü ölü bir düğümde saniyede onlarca aynı hatayı üretebilir; sayaçlar
+(``modbus_metrics.BusCounters``) her olayı sayar, log ise yalnız örnek verir.
+``RateLimitFilter`` aynı şablon + konu ikilisini pencere başına ``burst`` kez
+geçirir; bastırılan adet bir sonraki pencerenin ilk kaydına eklenir. Konu,
+mesajın ilk argümanıdır (slave ID, dosya yolu...): ölü bir slave'in timeout
+seli diğer slave'lerin aynı uyarısını bastırmaz. Bu yüzden mesajlar f-string
+değil ``%s`` argümanlarıyla, konu ilk argüman olacak şekilde yazılmalıdır.
+"""
+import logging
+import time
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+LOG_INTERVAL_S = 10.0   # Sınır penceresi (s)
+LOG_BURST = 5           # Pencere başına aynı şablondan en fazla kayıt
+
+
+class RateLimitFilter(logging.Filter):
+    """(logger, seviye, şablon, konu) başına pencere içinde en fazla ``burst`` kayıt."""
+
+    def __init__(self, interval=LOG_INTERVAL_S, burst=LOG_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}      # anahtar -> (pencere başı, geçen, bastırılan)
+
+    def filter(self, record):
+        args = record.args if isinstance(record.args, tuple) else (record.args,)
+        subject = repr(args[0]) if args else None   # dict/liste argümanlar da anahtar olabilsin
+        key = (record.name, record.levelno, record.msg, subject)
+        now = time.monotonic()
+        start, passed, suppressed = self._windows.get(key, (now, 0, 0))
+        if now - start >= self.interval:
+            if suppressed:
+                record.msg = f"{record.msg} (+{suppressed} benzer kayıt bastırıldı)"
+            start, passed, suppressed = now, 0, 0
+        if passed >= self.burst:
+            self._windows[key] = (start, passed, suppressed + 1)
+            return False
+        self._windows[key] = (start, passed + 1, suppressed)
+        return True
+
+
+def get_logger(name):
+    """Hız sınırlı modül logger'ı."""
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, RateLimitFilter) for f in logger.filters):
+        logger.addFilter(RateLimitFilter())
+    return logger
+
+
+def setup_logging(level="INFO"):
+    """Uygulama girişleri (panel, CLI'lar) için kök logger ayarı."""
+    logging.basicConfig(level=getattr(logging, str(level).upper(), logging.INFO), format=LOG_FORMAT)
@@ -0,0 +1,284 @@
+"""Sabit boyutlu gecikme halkaları: O(1) ekleme, yüzdelikler ve log-bucket histogram.
+
+Her metrik (poll gecikmesi, slave cevap gecikmesi, komut gidiş-dönüş, loop
+time, kuyruk bekleme) için
+önceden ayrılmış bir ``array('d')`` halka tutulur. Halkaya eşlik eden
+histogram yalnızca penceredeki örnekleri sayar (üzerine yazılan örnek kendi
+kovasından düşülür); p50/p95/p99 kova sınırlarından okunur, ortalama
+kuyruktaki gecikmeyi gizlemez.
+
+``BusCounters`` port ve slave başına sayaçlardır (çerçeve/bayt, timeout, CRC,
+exception kodu, tekrar, meşgul süre); transport her işlemde birkaç tamsayı
+artırır. ``MetricsExporter`` bunları periyodik olarak Prometheus metin
+dosyasına (node_exporter textfile collector) ve JSON dosyasına yazar.
+"""
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from types import MappingProxyType
+
+RING_SIZE = 256        # Metrik başına pencere (örnek)
+
+# Log kovalar: HIST_MIN_MS * 2^(i / HIST_STEPS) — oktav başına 4 kova (~%19 çözünürlük)
+HIST_MIN_MS = 0.1
+HIST_STEPS  = 4
+HIST_BUCKETS = 80      # 0.1 ms .. ~100 s
+
+PERCENTILES = (50, 95, 99)
+
+EMPTY_SUMMARY = MappingProxyType({'count': 0, 'last': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0,
+                                  'max': 0.0, 'hist': ()})
+
+# Cihaz başına izlenen gecikmeler (ms); 'reply' çerçeve süreleri düşülmüş slave gecikmesidir
+LATENCY_METRICS = ('latency', 'reply', 'cmd_latency', 'loop_time', 'queue_wait')
+
+
+def bucket_of(ms):
+    """Gecikmenin (ms) histogram kovası."""
+    if ms <= HIST_MIN_MS: return 0
+    return min(HIST_BUCKETS - 1, int(math.log2(ms / HIST_MIN_MS) * HIST_STEPS))
+
+
+def bucket_upper(i):
+    """``i`` kovasının üst sınırı (ms)."""
+    return HIST_MIN_MS * 2 ** ((i + 1) / HIST_STEPS)
+
+
+class LatencyRing:
+    """Son ``size`` örneğin halkası ve penceresel log histogramı."""
+    __slots__ = ('size', 'count', 'last', '_buf', '_bkt', '_pos', '_hist', '_summary')
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.count = 0                          # Toplam eklenen (pencere dışı dahil)
+        self.last = 0.0
+        self._buf = array('d', bytes(8 * size))
+        self._bkt = array('B', bytes(size))     # Her yuvadaki örneğin kovası
+        self._pos = 0
+        self._hist = array('I', bytes(4 * HIST_BUCKETS))
+        self._summary = EMPTY_SUMMARY
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, ms):
+        pos = self._pos
+        if self.count >= self.size:
+            self._hist[self._bkt[pos]] -= 1     # Pencereden çıkan örnek
+        b = bucket_of(ms)
+        self._buf[pos] = ms
+        self._bkt[pos] = b
+        self._hist[b] += 1
+        self._pos = (pos + 1) % self.size
+        self.count += 1
+        self.last = ms
+        self._summary = None
+
+    def values(self):
+        """Penceredeki örnekler, eskiden yeniye."""
+        if self.count < self.size:
+            return self._buf[:self._pos].tolist()
+        return (self._buf[self._pos:] + self._buf[:self._pos]).tolist()
+
+    def percentile(self, q):
+        """Penceredeki q. yüzdelik (ms) — kova üst sınırı, pencere maksimumuyla kırpılır."""
+        n = len(self)
+        if n == 0: return 0.0
+        rank = max(1, math.ceil(q / 100 * n))
+        seen = 0
+        for i, c in enumerate(self._hist):
+            seen += c
+            if seen >= rank:
+                return min(bucket_upper(i), self.max())
+        return self.max()
+
+    def max(self):
+        n = len(self)
+        return max(self._buf[:n]) if n else 0.0
+
+    def histogram(self):
+        """Boş olmayan kovalar: [(kova, adet), ...]; sınır için ``bucket_upper``."""
+        return [(i, c) for i, c in enumerate(self._hist) if c]
+
+    def summary(self):
+        """Salt okunur özet; bir sonraki eklemeye kadar önbellekte tutulur."""
+        if self._summary is None:
+            s = {'count': self.count, 'last': self.last, 'max': self.max()}
+            for q in PERCENTILES:
+                s[f'p{q}'] = self.percentile(q)
+            s['hist'] = tuple(self.histogram())
+            self._summary = MappingProxyType(s)
+        return self._summary
+
+
+def new_rings():
+    """``data_store[sid]['rings']`` için metrik başına boş halka."""
+    return {name: LatencyRing() for name in LATENCY_METRICS}
+
+
+def summaries(rings):
+    """Snapshot'a konacak salt okunur özetler {metrik: summary}."""
+    return MappingProxyType({name: r.summary() for name, r in rings.items()})
+
+
+def format_summary(s):
+    """Tek satırlık gösterim: ``p50 / p95 / p99 / max`` (ms)."""
+    if not s or not s['count']: return "-- / -- / -- / --"
+    return f"{s['p50']:.0f} / {s['p95']:.0f} / {s['p99']:.0f} / {s['max']:.0f}"
+
+
+SPARK = " ▁▂▃▄▅▆▇█"
+
+
+def sparkline(hist, width=24):
+    """Log histogramı (``summary()['hist']``) tek satırlık blok karakterlere çevir."""
+    if not hist: return ""
+    counts = dict(hist)
+    lo, hi = hist[0][0], hist[-1][0]
+    cols = [counts.get(i, 0) for i in range(lo, hi + 1)][:width]
+    peak = max(cols)
+    return "".join(SPARK[math.ceil(c / peak * (len(SPARK) - 1))] for c in cols)
+
+
+# ============================================================================
+#  BUS SAYAÇLARI
+# ============================================================================
+COUNTER_KEYS = ('tx_frames', 'tx_bytes', 'rx_frames', 'rx_bytes',
+                'timeouts', 'crc_errors', 'exceptions', 'retries', 'busy_s')
+
+
+def new_counters():
+    c = dict.fromkeys(COUNTER_KEYS, 0)
+    c['exception_codes'] = {}   # Modbus exception kodu -> adet
+    return c
+
+
+class BusCounters:
+    """Tek port için toplam ve slave başına sayaçlar (yalnız bus loop thread'i yazar).
+
+    ``sid`` None ise (ör. broadcast) yalnız port toplamı artar.
+    """
+
+    def __init__(self):
+        self.since = time.time()
+        self.port = new_counters()
+        self.slaves = {}
+
+    def add(self, sid, key, n=1):
+        self.port[key] += n
+        if sid is None: return
+        c = self.slaves.get(sid)
+        if c is None: c = self.slaves[sid] = new_counters()
+        c[key] += n
+
+    def exception(self, sid, code):
+        self.add(sid, 'exceptions')
+        for c in (self.port,) if sid is None else (self.port, self.slaves[sid]):
+            c['exception_codes'][code] = c['exception_codes'].get(code, 0) + 1
+
+    def snapshot(self):
+        """Başka thread'den okunacak kopya (dict kopyası GIL altında atomiktir)."""
+        def copy(c):
+            c = dict(c)
+            c['exception_codes'] = dict(c['exception_codes'])
+            return c
+        elapsed = max(time.time() - self.since, 1e-9)
+        port = copy(self.port)
+        port['utilization'] = port['busy_s'] / elapsed
+        slaves = {}
+        for sid, c in dict(self.slaves).items():
+            slaves[sid] = copy(c)
+            slaves[sid]['utilization'] = c['busy_s'] / elapsed
+        return {'since': self.since, 'port': port, 'slaves': slaves}
+
+
+# Prometheus: sayaç anahtarı -> (metrik adı, tip, açıklama)
+PROM_COUNTERS = {
+    'tx_frames':  ('modbus_tx_frames_total',  'counter', "Frames sent"),
+    'tx_bytes':   ('modbus_tx_bytes_total',   'counter', "Bytes sent"),
+    'rx_frames':  ('modbus_rx_frames_total',  'counter', "Complete frames received"),
+    'rx_bytes':   ('modbus_rx_bytes_total',   'counter', "Bytes received"),
+    'timeouts':   ('modbus_timeouts_total',   'counter', "Requests without a complete reply"),
+    'crc_errors': ('modbus_crc_errors_total', 'counter', "Replies with bad CRC, address or function code"),
+    'retries':    ('modbus_retries_total',    'counter', "Repeated attempts after a failed request"),
+    'busy_s':     ('modbus_busy_seconds_total', 'counter', "Time the bus spent in transactions"),
+    'utilization': ('modbus_utilization_ratio', 'gauge', "busy_seconds / seconds since start"),
+}
+
+
+def prometheus_text(stats):
+    """``collect`` çıktısını Prometheus metin formatına çevir."""
+    lines = []
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for key, (name, kind, help_text) in PROM_COUNTERS.items():
+        family(name, kind, help_text)
+        for port, c in stats['ports'].items():
+            lines.append(f'{name}{{port="{port}"}} {c["port"][key]:g}')
+            for sid, sc in sorted(c['slaves'].items()):
+                lines.append(f'{name}{{port="{port}",slave="{sid}"}} {sc[key]:g}')
+
+    family('modbus_exceptions_total', 'counter', "Modbus exception responses by code")
+    for port, c in stats['ports'].items():
+        for sid, sc in sorted(c['slaves'].items()):
+            for code, n in sorted(sc['exception_codes'].items()):
+                lines.append(f'modbus_exceptions_total{{port="{port}",slave="{sid}",code="{code}"}} {n}')
+
+    family('modbus_window_utilization_ratio', 'gauge', "Bus utilization over the last load window")
+    for port, c in stats['ports'].items():
+        lines.append(f'modbus_window_utilization_ratio{{port="{port}"}} {c["engine"]["utilization"]:g}')
+    family('modbus_online', 'gauge', "1 if the slave answered its last poll")
+    for sid, online in sorted(stats['online'].items()):
+        lines.append(f'modbus_online{{slave="{sid}"}} {int(online)}')
+    family('modbus_reply_timeout_seconds', 'gauge', "Per-slave reply timeout learned from p99 reply time")
+    for sid, h in sorted(stats['health'].items()):
+        lines.append(f'modbus_reply_timeout_seconds{{slave="{sid}"}} {h["timeout_ms"] / 1000:g}')
+    family('modbus_slow', 'gauge', "1 if the slave's reply time rose well above its baseline")
+    for sid, h in sorted(stats['health'].items()):
+        lines.append(f'modbus_slow{{slave="{sid}"}} {int(h["slow"])}')
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class MetricsExporter:
+    """``engine.stats()`` çıktısını aralıkla Prometheus ve/veya JSON dosyasına yazar (atomik)."""
+
+    def __init__(self, engine, prom_path=None, json_path=None, interval=10.0):
+        self.engine = engine
+        self.prom_path = prom_path
+        self.json_path = json_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread or not (self.prom_path or self.json_path): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread: return
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.export()
+
+    def export(self):
+        stats = self.engine.stats()
+        if self.prom_path: _write_atomic(self.prom_path, prometheus_text(stats))
+        if self.json_path: _write_atomic(self.json_path, json.dumps(stats, indent=1))
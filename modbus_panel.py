@@ -1,12 +1,28 @@
 import customtkinter as ctk
-import minimalmodbus
 import serial
 import serial.tools.list_ports
-import threading
 import time
-import json
 import os
-import queue
+from collections import deque
+
+from modbus_engine import GROUP_ALL, ModbusEngine, device_groups
+from modbus_events import (
+    STATUS, ERROR_SET, ERROR_CLEARED, WARNING_SET, WARNING_CLEARED, ONLINE, OFFLINE, PARAM,
+    SLOW, SLOW_CLEARED, WRITE_MISMATCH,
+)
+from modbus_gateway import ModbusTcpGateway
+from modbus_historian import HISTORY_DB, Historian
+from modbus_log import get_logger, setup_logging
+from modbus_metrics import MetricsExporter, format_summary, sparkline
+from modbus_registry import DEVICES_JSON, DeviceRegistry
+from modbus_scan import BusScanner, found_devices
+from modbus_regmap import (
+    REG_COMMAND, REG_STATUS, REG_ERRORS, REG_WARNINGS,
+    REG_OPEN_SPEED, REG_CLOSE_SPEED, REG_DURATION,
+    REG_OPEN_TORQUE, REG_CLOSE_TORQUE, REG_SAMPLE_VAL,
+)
+
+log = get_logger(__name__)
 
 # --- ARAYÜZ AYARLARI ---
 ctk.set_appearance_mode("Dark")
@@ -75,41 +91,45 @@ class CTkToolTip(ctk.CTkToplevel):
     def hide_tip(self, event=None):
         self.withdraw()
 
-# --- REGISTER HARİTASI ---
-REG_COMMAND     = 0   # WO
-REG_STATUS      = 1   # RO
-REG_ERRORS      = 2   # RO
-REG_WARNINGS    = 3   # RO
-REG_OPEN_SPEED  = 4   # RW
-REG_CLOSE_SPEED = 5   # RW
-REG_DURATION    = 6   # RW
-REG_OPEN_TORQUE = 7   # RW
-REG_CLOSE_TORQUE= 8   # RW
-REG_SAMPLE_VAL  = 9   # RW
-REGS_PER_DEVICE = 10
-
 STATUS_TEXT  = {0: "⏸ Duruyor", 1: "● Açık", 2: "● Kapalı"}
 
-# Bitwise Hata/Uyarı Tanımları
-ERR_CODES = {
-    0: "Acil Durum Hatası",
-    1: "Yüksek Gerilim",
-    2: "Düşük Gerilim",
-    3: "Aşırı Akım",
-    4: "Sensör Hatası",
-    5: "Motor Sıkışması",
-    6: "Haberleşme Hatası",
-    7: "EEPROM Hatası"
-}
-
-WARN_CODES = {
-    0: "Yüksek Sıcaklık",
-    1: "Bakım Gerekli",
-    2: "Fan Arızası",
-    3: "Giriş Voltajı Dengesiz",
-    4: "Uyarı 5",
-    5: "Uyarı 6"
-}
+BAUD_RATES   = ["9600", "19200", "38400", "57600", "115200", "230400", "250000"]
+PORT_DEFAULT = "DEFAULT"   # Cihaz toolbar'daki PORT/BAUD'u kullanır
+
+# Kartı yeniden çizdiren olaylar (parametre değişimleri kartta görünmez)
+CARD_EVENTS = (STATUS, ERROR_SET, ERROR_CLEARED, WARNING_SET, WARNING_CLEARED, ONLINE, OFFLINE,
+               SLOW, SLOW_CLEARED)
+
+# Modbus TCP gateway: ör. MODBUS_GATEWAY=127.0.0.1:5020 (boşsa kapalı)
+GATEWAY_LISTEN = os.environ.get("MODBUS_GATEWAY", "")
+
+# Sayaç dışa aktarımı: ör. MODBUS_METRICS_PROM=/var/lib/node_exporter/modbus.prom (boşsa kapalı)
+METRICS_PROM = os.environ.get("MODBUS_METRICS_PROM", "")
+METRICS_JSON = os.environ.get("MODBUS_METRICS_JSON", "")
+
+# Ayar yazmaları geri okumayla doğrulanır (FC23 veya yazma + okuma); MODBUS_VERIFY_WRITES=0 kapatır
+VERIFY_WRITES = os.environ.get("MODBUS_VERIFY_WRITES", "1") != "0"
+
+# Sanal grid: kart boyutu sabit; yalnız görünen satırlar kadar kart kurulur
+CARD_W, CARD_H = 230, 210
+CARD_PAD       = 10
+MAX_COLS       = 6
+ROW_H          = 30     # Tablo görünümü satır yüksekliği
+WHEEL_ROWS     = 3      # Tabloda tekerlek adımı (satır)
+TABLE_VIEW_MIN = 100    # Bu kadar cihazdan fazlası varsa tablo görünümüyle aç
+VIEW_BUTTON_TEXT = {'grid': "[≣ TABLE]", 'table': "[▦ GRID]"}
+
+UI_FPS      = 20     # Kart yenileme üst sınırı (kare/s) — poll hızından bağımsız
+UI_SWEEP_S  = 1.0    # Zamana bağlı göstergeler (LAGGING, PROBE geri sayımı) için tam tarama aralığı
+
+# Ayar penceresindeki gecikme tablosu: (etiket, metrik)
+LATENCY_ROWS = [
+    (":: PING ::",     'latency'),
+    (":: REPLY ::",    'reply'),
+    (":: CMD_RTT ::",  'cmd_latency'),
+    (":: Q_WAIT ::",   'queue_wait'),
+    (":: LOOP ::",     'loop_time'),
+]
 
 PARAM_DEFS = [
     {'reg': REG_OPEN_SPEED,   'label': 'Açılış Hızı',    'min': 0, 'max': 1000, 'unit': ''},
@@ -133,52 +153,68 @@ class HMIApp(ctk.CTk):
         self.configure(fg_color=COLORS['bg_dark'])
 
         # --- Veri Modeli ---
-        self.devices = []           # [{'id':int, 'name':str}, ...]
-        self.data_store = {}        # Veri saklama (Cache, Metrics)
-        self.instrument = None
-        self.polling = False
-        self.poll_lock = threading.Lock()
+        self.devices = DeviceRegistry()     # _load_config'te dosyaya bağlanır; sid -> {'id', 'name', 'port'?, 'baud'?, ...}; motorla paylaşılır
+        self.engine = None          # GUI'siz poll motoru; panel onun abonelerinden biri
+        self.gateway = None         # İsteğe bağlı Modbus TCP gateway (cache'ten okur)
         self.connected = False
-        
-        # Priority Queue
-        self.command_queue = queue.Queue()
 
         # UI Referansları
-        self.device_cards_ui = {}
+        self.device_cards_ui = {}   # Görünen sid -> yuva (kart/satır widget'ları); yalnız ekrandakiler
+        self._pool = []             # Geri dönüştürülen yuvalar (sayısı pencere boyutuna bağlı)
+        self._pool_mode = None
+        self._first_row = 0         # Görünen ilk satır (kaydırma)
+        self._geom = (1, 1, 1, 0)   # (sütun, satır, tam satır, toplam satır)
+        self._layout_pending = False
+        self.view_mode = 'grid'
         self.grid_frame = None
         self.selected_device_id = None
         self.detail_open_for = None 
 
+        # Kirli kartlar: bus thread'i değişen sid'i ekler (deque append thread-safe),
+        # UI thread'i sabit kare hızında boşaltıp yalnız bunları çizer.
+        self._dirty = deque()
+        self._last_sweep = 0.0
+        self._bus_stats_shown = None
+
         self._load_config()
+        if len(self.devices) > TABLE_VIEW_MIN: self.view_mode = 'table'
+        self.engine = ModbusEngine(self.devices, historian=self._open_historian(), verify_writes=VERIFY_WRITES)
+        self.snapshots = self.engine.snapshots   # sid -> salt okunur, sürümlü kopya — UI yalnız bunu okur
+        self.exporter = MetricsExporter(self.engine, METRICS_PROM or None, METRICS_JSON or None)
+        self.engine.subscribe_events(self._mark_dirty, kinds=CARD_EVENTS)
         self._build_toolbar()
         self._build_grid_area()
         self._sync_grid_layout()
+        self.after(1000 // UI_FPS, self._ui_tick)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
-    def _load_config(self):
+    def _open_historian(self):
         try:
-            if os.path.exists("devices.json"):
-                with open("devices.json", "r", encoding="utf-8") as f:
-                    self.devices = json.load(f)
-                
-                # Data store'u başlat
-                for d in self.devices:
-                    sid = d['id']
-                    self.data_store[sid] = {
-                        'cache': {}, 'pending': {}, 'online': True, 'errors': 0, 'last_update': '',
-                        'latency': 0, 'success_count': 0, 'total_count': 0,
-                        'cmd_latency': 0, 'last_cmd_ts': 0,
-                        'slave_resp_time': 0, 'loop_time': 0, 'last_poll_ts': 0,
-                        'slave_resp_history': [], 'loop_time_history': [] # ORTALAMA İÇİN
-                    }
+            return Historian(HISTORY_DB)
         except Exception as e:
-            print(f"Config Yükleme Hatası: {e}")
+            log.error("Historian açılamadı: %s", e)
+            return None
 
-    def _save_config(self):
+    def _on_close(self):
+        # Motoru durdur: historian kuyruğu diske boşaltılır
+        if self.connected:
+            self._stop_gateway()
+            self.exporter.stop()
+            self.engine.stop()
+        self.devices.flush()    # Bekleyen config kaydı
+        self.destroy()
+
+    def _load_config(self):
         try:
-            with open("devices.json", "w", encoding="utf-8") as f:
-                json.dump(self.devices, f, indent=4, ensure_ascii=False)
+            self.devices = DeviceRegistry.load(DEVICES_JSON)
         except Exception as e:
-            print(f"Config Kaydetme Hatası: {e}")
+            # Kayıt yolu bağlanmaz: boş listeyle kullanıcının dosyasının üzerine yazılmasın
+            self.devices = DeviceRegistry()
+            log.error("Config yükleme hatası, değişiklikler kaydedilmeyecek: %s", e)
+
+    def _save_config(self):
+        """Debounce'lu atomik kayıt: art arda değişiklikler tek yazmada diske gider."""
+        self.devices.schedule_save()
 
     # ========================================================================
     #  TOOLBAR
@@ -208,7 +244,7 @@ class HMIApp(ctk.CTk):
         self.combo_port.pack(side="left", padx=(0, 10))
 
         ctk.CTkLabel(inner, text="BAUD:", font=("Consolas", 9, "bold"), text_color=COLORS['text_dim']).pack(side="left", padx=(0, 4))
-        self.combo_baud = ctk.CTkComboBox(inner, values=["9600","19200","38400","57600","115200","230400","250000"],
+        self.combo_baud = ctk.CTkComboBox(inner, values=BAUD_RATES,
                                           width=90, height=30,
                                           font=("Consolas", 11), corner_radius=0,
                                           fg_color=COLORS['bg_dark'], border_color=COLORS['border'],
@@ -234,6 +270,44 @@ class HMIApp(ctk.CTk):
                                      command=self._delete_selected_device)
         self.btn_del.pack(side="left", padx=3)
 
+        self.btn_scan = ctk.CTkButton(inner, text="[⌕ SCAN]", width=80, height=32,
+                                      font=("Consolas", 11, "bold"), corner_radius=0,
+                                      fg_color="transparent", border_width=1, border_color=COLORS['border'],
+                                      hover_color=COLORS['matrix_dark'],
+                                      command=self._open_scan_dialog)
+        self.btn_scan.pack(side="left", padx=3)
+
+        self.btn_view = ctk.CTkButton(inner, text=VIEW_BUTTON_TEXT[self.view_mode], width=80, height=32,
+                                      font=("Consolas", 11, "bold"), corner_radius=0,
+                                      fg_color="transparent", border_width=1, border_color=COLORS['border'],
+                                      hover_color=COLORS['matrix_dark'],
+                                      command=self._toggle_view)
+        self.btn_view.pack(side="left", padx=3)
+
+        # Grup komutu: tüm grup tek broadcast veya sıkı yazma serisiyle
+        sep3 = ctk.CTkFrame(inner, width=1, height=28, fg_color=COLORS['border'])
+        sep3.pack(side="left", padx=(13, 10))
+        ctk.CTkLabel(inner, text="GRP:", font=("Consolas", 9, "bold"), text_color=COLORS['text_dim']).pack(side="left", padx=(0, 4))
+        self.combo_group = ctk.CTkComboBox(inner, values=[GROUP_ALL], width=95, height=30,
+                                           font=("Consolas", 11), corner_radius=0,
+                                           fg_color=COLORS['bg_dark'], border_color=COLORS['border'],
+                                           button_color=COLORS['border'], button_hover_color=COLORS['matrix_dark'],
+                                           dropdown_fg_color=COLORS['bg_dark'], dropdown_text_color=COLORS['text'])
+        self.combo_group.set(GROUP_ALL)
+        self.combo_group.pack(side="left", padx=(0, 4))
+        self._refresh_group_combo()
+
+        ctk.CTkButton(inner, text="[▲]", width=36, height=32,
+                      font=("Consolas", 11, "bold"), corner_radius=0,
+                      fg_color="transparent", border_width=1, border_color=COLORS['border'],
+                      hover_color=COLORS['matrix_dark'],
+                      command=lambda: self._send_group_command(1)).pack(side="left", padx=2)
+        ctk.CTkButton(inner, text="[▼]", width=36, height=32,
+                      font=("Consolas", 11, "bold"), corner_radius=0,
+                      fg_color="transparent", border_width=1, border_color=COLORS['border'],
+                      hover_color=COLORS['matrix_dark'],
+                      command=lambda: self._send_group_command(2)).pack(side="left", padx=2)
+
         # Matrix Connect Button
         self.btn_connect = ctk.CTkButton(inner, text="[ EXEC CONNECT ]", width=140, height=34,
                                          font=("Consolas", 12, "bold"), corner_radius=0,
@@ -246,55 +320,211 @@ class HMIApp(ctk.CTk):
                                                font=("Consolas", 10, "bold"), text_color=COLORS['text_dim'])
         self.lbl_toolbar_status.pack(side="right", padx=8)
 
+        # Bus yükü: zamanlayıcının talep ettiği oran, ölçülen kullanım ve kaçırılan deadline'lar
+        self.lbl_bus_stats = ctk.CTkLabel(inner, text="", font=("Consolas", 9), text_color=COLORS['text_dim'])
+        self.lbl_bus_stats.pack(side="right", padx=8)
+
     # ========================================================================
     #  GRID ALANI
     # ========================================================================
     def _build_grid_area(self):
-        self.grid_container = ctk.CTkScrollableFrame(self, fg_color=COLORS['bg_dark'],
-                                                     corner_radius=0,
-                                                     scrollbar_button_color=COLORS['border'],
-                                                     scrollbar_button_hover_color=COLORS['matrix_dark'])
+        # Sanal grid: yalnız görünen satırlar kadar kart (veya tablo satırı) widget'ı vardır.
+        # Kaydırınca aynı widget'lar başka cihazlara bağlanır; cihaz sayısı widget sayısını değiştirmez.
+        self.grid_container = ctk.CTkFrame(self, fg_color=COLORS['bg_dark'], corner_radius=0)
         self.grid_container.pack(fill="both", expand=True, padx=20, pady=(12, 20))
 
+        self.scrollbar = ctk.CTkScrollbar(self.grid_container, command=self._on_scrollbar,
+                                          button_color=COLORS['border'],
+                                          button_hover_color=COLORS['matrix_dark'])
+        self.scrollbar.pack(side="right", fill="y")
+
         self.grid_frame = ctk.CTkFrame(self.grid_container, fg_color="transparent")
-        self.grid_frame.pack(fill="both", expand=True)
+        self.grid_frame.pack(side="left", fill="both", expand=True)
+        self.grid_frame.grid_propagate(False)
+        self.grid_frame.bind("<Configure>", lambda e: self._schedule_layout())
+        self._bind_wheel(self.grid_frame)
 
         self.lbl_empty = ctk.CTkLabel(self.grid_frame,
                                       text="[ SYSTEM_IDLE: NO_NODES_DETECTED ]\n[ EXECUTE (+ ADD NODE) TO INITIALIZE ]",
                                       font=("Consolas", 14), text_color=COLORS['text_dim'])
-        self.lbl_empty.pack(pady=100)
 
     def _sync_grid_layout(self):
-        existing_ids = list(self.device_cards_ui.keys())
-        target_ids = [d['id'] for d in self.devices]
+        """Cihaz listesi değişti: görünen aralığı yeniden bağla."""
+        self._layout_view()
+
+    def _schedule_layout(self):
+        if self._layout_pending: return
+        self._layout_pending = True
+        self.after_idle(self._layout_view)
+
+    def _view_geometry(self):
+        """(sütun, görünen satır — kısmi dahil, tam görünen satır)."""
+        w = max(self.grid_frame.winfo_width(), 1)
+        h = max(self.grid_frame.winfo_height(), 1)
+        if self.view_mode == 'table':
+            return 1, -(-h // ROW_H), max(1, h // ROW_H)
+        cell_h = CARD_H + 2 * CARD_PAD
+        cols = max(1, min(MAX_COLS, w // (CARD_W + 2 * CARD_PAD)))
+        return cols, -(-h // cell_h), max(1, h // cell_h)
+
+    def _layout_view(self):
+        """Görünen cihaz aralığını widget havuzuna bağla."""
+        self._layout_pending = False
+        cols, rows, full_rows = self._view_geometry()
+        ids = self.devices.ids()
+        total_rows = -(-len(ids) // cols)
+        self._first_row = max(0, min(self._first_row, total_rows - full_rows))
+        self._geom = (cols, rows, full_rows, total_rows)
+        self._ensure_pool(cols * rows)
+        for c in range(MAX_COLS):
+            self.grid_frame.columnconfigure(c, weight=1 if c < cols else 0)
+
+        start = self._first_row * cols
+        visible = ids[start:start + cols * rows]
+        visible_set = set(visible)
+
+        # Görünür kalan cihazın widget'ı aynen kalır; boşalan yuvalar yeni gelenlere bağlanır
+        keep = {sid: ui for sid, ui in self.device_cards_ui.items() if sid in visible_set}
+        free = [ui for ui in self._pool if ui['sid'] not in keep]
+        self.device_cards_ui = {}
+        bound = []
+        for i, sid in enumerate(visible):
+            ui = keep.get(sid)
+            if ui is None:
+                ui = free.pop()
+                self._bind_slot(ui, sid)
+                bound.append(sid)
+            self.device_cards_ui[sid] = ui
+            cell = divmod(i, cols)
+            if ui['cell'] != cell:
+                if ui['kind'] == 'row':
+                    ui['frame'].grid(row=cell[0], column=0, padx=0, pady=1, sticky="ew")
+                else:
+                    ui['frame'].grid(row=cell[0], column=cell[1], padx=CARD_PAD, pady=CARD_PAD, sticky="nsew")
+                ui['cell'] = cell
+        for ui in free:
+            self._release_slot(ui)
+        for sid in bound:
+            self._render_card(sid, force=True)
+
+        if ids:
+            self.lbl_empty.place_forget()
+        else:
+            self.lbl_empty.place(relx=0.5, rely=0.3, anchor="center")
+        total = max(total_rows, 1)
+        self.scrollbar.set(self._first_row / total, min(1.0, (self._first_row + full_rows) / total))
+
+    def _ensure_pool(self, size):
+        """Havuzu görünüm tipine ve pencerenin aldığı yuva sayısına getir."""
+        if self._pool_mode != self.view_mode:
+            for ui in self._pool: ui['frame'].destroy()
+            self._pool, self.device_cards_ui = [], {}
+            self._pool_mode = self.view_mode
+        create = self._create_table_row if self.view_mode == 'table' else self._create_device_card
+        while len(self._pool) < size:
+            self._pool.append(create())
+        while len(self._pool) > size:
+            ui = self._pool.pop()
+            if ui['sid'] is not None: self.device_cards_ui.pop(ui['sid'], None)
+            ui['frame'].destroy()
+
+    def _bind_slot(self, ui, sid):
+        """Yuvayı ``sid`` cihazına bağla: kimlik alanları yazılır, çizim durumu sıfırlanır."""
+        if ui.get('edit_sid') is not None: self._commit_name(ui)
+        name = self.devices.get(sid)['name']
+        ui['sid'] = sid
+        ui['id_tag'].configure(text=f"NODE:{sid:02d}")
+        if ui['kind'] == 'card':
+            ui['name_entry'].delete(0, "end")
+            ui['name_entry'].insert(0, name)
+        else:
+            ui['name_label'].configure(text=name)
+        ui['shown'] = {}
+        ui['version'] = -1
+
+    def _release_slot(self, ui):
+        if ui.get('edit_sid') is not None: self._commit_name(ui)
+        ui['sid'] = None
+        if ui['cell'] is not None:
+            ui['frame'].grid_remove()
+            ui['cell'] = None
+
+    def _commit_name(self, ui):
+        """Düzenlenen ismi, düzenleme başladığında bağlı olan cihaza yaz."""
+        sid, ui['edit_sid'] = ui.get('edit_sid'), None
+        if sid is not None:
+            self._update_device_name(sid, ui['name_entry'].get())
+
+    # --- Kaydırma ---
+    def _scroll_rows(self, n):
+        self._first_row += n
+        self._layout_view()
+
+    def _on_scrollbar(self, *args):
+        total_rows = self._geom[3]
+        if args[0] == 'moveto':
+            self._first_row = round(float(args[1]) * total_rows)
+        elif args[0] == 'scroll':
+            n = int(args[1])
+            self._first_row += n * self._geom[2] if args[2] == 'pages' else n
+        self._layout_view()
+
+    def _bind_wheel(self, w):
+        step = lambda: WHEEL_ROWS if self.view_mode == 'table' else 1
+        w.bind("<MouseWheel>", lambda e: self._scroll_rows(-step() if e.delta > 0 else step()))
+        w.bind("<Button-4>", lambda e: self._scroll_rows(-step()))     # Linux/X11
+        w.bind("<Button-5>", lambda e: self._scroll_rows(step()))
+
+    def _toggle_view(self):
+        """Kart grid'i <-> kompakt tablo; ilk görünen cihaz korunur."""
+        first = self._first_row * self._geom[0]
+        self.view_mode = 'table' if self.view_mode == 'grid' else 'grid'
+        self.btn_view.configure(text=VIEW_BUTTON_TEXT[self.view_mode])
+        cols = self._view_geometry()[0]
+        self._first_row = first // cols
+        self._layout_view()
+
+    def _bind_slot_events(self, ui, root):
+        """Tıklama (seçim), hover ve tekerlek olaylarını yuvanın tüm alt widget'larına bir kez bağla."""
+        def on_enter(e):
+            ui['hover'] = True
+            ui['id_tag'].configure(text_color=COLORS['text'])
+            if ui['sid'] is not None: self._render_card(ui['sid'], force=True)
 
-        for sid in existing_ids:
-            if sid not in target_ids:
-                self.device_cards_ui[sid]['frame'].destroy()
-                del self.device_cards_ui[sid]
+        def on_leave(e):
+            ui['hover'] = False
+            ui['id_tag'].configure(text_color=COLORS['text_dim'])
+            if ui['sid'] is not None: self._render_card(ui['sid'], force=True)
 
-        for sid in target_ids:
-            if sid not in self.device_cards_ui:
-                device = next(d for d in self.devices if d['id'] == sid)
-                self._create_device_card(sid, device['name'])
+        def on_click(e):
+            if ui['sid'] is not None: self._select_device(ui['sid'])
 
-        if not self.devices:
-            self.lbl_empty.pack(pady=80)
-        else:
-            self.lbl_empty.pack_forget()
+        # Hitbox Fix
+        def bind_recursive(w):
+            if isinstance(w, (ctk.CTkButton, ctk.CTkEntry)): return
+            try:
+                w.bind("<Button-1>", on_click)
+                w.bind("<Enter>", on_enter)
+                w.bind("<Leave>", on_leave)
+                self._bind_wheel(w)
+            except Exception: pass
+            for child in w.winfo_children():
+                bind_recursive(child)
+
+        bind_recursive(root)
 
-        cols = max(1, min(6, len(self.devices)))
-        for i, (sid, ui) in enumerate(self.device_cards_ui.items()):
-            r, c = divmod(i, cols)
-            ui['frame'].grid(row=r, column=c, padx=10, pady=10, sticky="nsew")
-            self.grid_frame.columnconfigure(c, weight=1)
+    def _new_slot(self, kind, frame, **widgets):
+        return dict(widgets, kind=kind, frame=frame, sid=None, cell=None, hover=False, edit_sid=None,
+                    shown={},       # widget anahtarı -> son uygulanan değer (değişmeyen configure atlanır)
+                    version=-1)     # Son çizilen snapshot sürümü
 
-    def _create_device_card(self, sid, name):
+    def _create_device_card(self):
+        """Kart yuvası: widget'lar bir kez kurulur, ``_bind_slot`` ile cihaza bağlanır."""
         # Matrix Terminal Frame
         card = ctk.CTkFrame(self.grid_frame, fg_color=COLORS['bg_dark'],
                             corner_radius=0, border_width=1,
                             border_color=COLORS['border'],
-                            width=230, height=210)
+                            width=CARD_W, height=CARD_H)
         card.pack_propagate(False)
 
         # Content Layer
@@ -305,8 +535,7 @@ class HMIApp(ctk.CTk):
         header_frame = ctk.CTkFrame(content, fg_color="transparent")
         header_frame.pack(fill="x")
         
-        id_tag = ctk.CTkLabel(header_frame, text=f"NODE:0{sid}" if sid < 10 else f"NODE:{sid}", 
-                              font=("Consolas", 11, "bold"), text_color=COLORS['text_dim'])
+        id_tag = ctk.CTkLabel(header_frame, text="", font=("Consolas", 11, "bold"), text_color=COLORS['text_dim'])
         id_tag.pack(side="left")
 
         # Online Status Indicator (LED)
@@ -321,10 +550,7 @@ class HMIApp(ctk.CTk):
         name_entry = ctk.CTkEntry(name_frame, font=("Consolas", 12, "bold"), height=25,
                                   fg_color="transparent", border_width=0,
                                   text_color=COLORS['text_white'])
-        name_entry.insert(0, name)
         name_entry.pack(side="left", fill="x", expand=True, padx=5)
-        name_entry.bind("<FocusOut>", lambda e, s=sid, ent=name_entry: self._update_device_name(s, ent.get()))
-        name_entry.bind("<Return>", lambda e, s=sid, ent=name_entry: (self._update_device_name(s, ent.get()), self.focus()))
 
         # Separator (Green Line)
         ctk.CTkFrame(content, height=1, fg_color=COLORS['border']).pack(fill="x", pady=8)
@@ -351,18 +577,14 @@ class HMIApp(ctk.CTk):
                       font=("Consolas", 11, "bold"), height=28,
                       fg_color="transparent", hover_color=COLORS['matrix_dark'],
                       border_width=1, border_color=COLORS['border'],
-                      corner_radius=0,
-                      command=lambda s=sid: self._send_command(s, 1)
-                      )
+                      corner_radius=0)
         btn_on.grid(row=0, column=0, padx=(0, 2), sticky="ew")
 
         btn_off = ctk.CTkButton(btn_frame, text="[ KAPAT ]",
                       font=("Consolas", 11, "bold"), height=28,
                       fg_color="transparent", hover_color=COLORS['matrix_dark'],
                       border_width=1, border_color=COLORS['border'],
-                      corner_radius=0,
-                      command=lambda s=sid: self._send_command(s, 2)
-                      )
+                      corner_radius=0)
         btn_off.grid(row=0, column=1, padx=(2, 0), sticky="ew")
 
         # Footer (Stats & Settings)
@@ -374,90 +596,170 @@ class HMIApp(ctk.CTk):
         
         btn_set = ctk.CTkLabel(footer, text="[SETTINGS]", font=("Consolas", 9), text_color=COLORS['text_dim'], cursor="hand2")
         btn_set.pack(side="right")
-        btn_set.bind("<Button-1>", lambda e, s=sid: self._open_detail_popup(s))
 
-        # --- MATRIX HOVER ---
-        def on_enter(e):
-            card.configure(border_color=COLORS['border_glow'], border_width=2)
-            id_tag.configure(text_color=COLORS['text'])
-        
-        def on_leave(e):
-            card.configure(border_color=COLORS['border'], border_width=1)
-            id_tag.configure(text_color=COLORS['text_dim'])
+        ui = self._new_slot('card', card, icon_err=icon_err, icon_warn=icon_warn,
+                            name_entry=name_entry, led=status_led,
+                            btn_on=btn_on, btn_off=btn_off, lbl_status=lbl_status, id_tag=id_tag)
+
+        # Olaylar yuvaya bağlı; hedef cihaz her seferinde ui['sid']'den okunur
+        btn_on.configure(command=lambda: self._send_command(ui['sid'], 1))
+        btn_off.configure(command=lambda: self._send_command(ui['sid'], 2))
+        name_entry.bind("<FocusIn>", lambda e: ui.update(edit_sid=ui['sid']))
+        name_entry.bind("<FocusOut>", lambda e: self._commit_name(ui))
+        name_entry.bind("<Return>", lambda e: (self._commit_name(ui), self.focus()))
+        self._bind_slot_events(ui, card)
+        btn_set.bind("<Button-1>", lambda e: self._open_detail_popup(ui['sid']))
+        return ui
+
+    def _create_table_row(self):
+        """Kompakt tablo satırı yuvası (büyük sahalar için): kimlik, isim, durum, LED, bayraklar, AÇ/KAPAT."""
+        row = ctk.CTkFrame(self.grid_frame, fg_color=COLORS['bg_dark'], corner_radius=0,
+                           border_width=1, border_color=COLORS['border'], height=ROW_H - 2)
+        row.pack_propagate(False)
+
+        id_tag = ctk.CTkLabel(row, text="", width=80, anchor="w", font=("Consolas", 11, "bold"),
+                              text_color=COLORS['text_dim'])
+        id_tag.pack(side="left", padx=(8, 0))
+        name_label = ctk.CTkLabel(row, text="", width=220, anchor="w", font=("Consolas", 11, "bold"),
+                                  text_color=COLORS['text_white'])
+        name_label.pack(side="left")
+        lbl_status = ctk.CTkLabel(row, text="[ .... ]", width=120, anchor="w", font=("Consolas", 11, "bold"),
+                                  text_color=COLORS['text'])
+        lbl_status.pack(side="left")
+        led = ctk.CTkLabel(row, text="[ONLINE]", width=110, anchor="w", font=("Consolas", 9, "bold"),
+                           text_color=COLORS['dim_icon'])
+        led.pack(side="left")
+        flags = ctk.CTkFrame(row, fg_color="transparent")
+        flags.pack(side="left")
+        icon_err = ctk.CTkLabel(flags, text="[ERR]", font=("Consolas", 9, "bold"), text_color=COLORS['bg_dark'])
+        icon_warn = ctk.CTkLabel(flags, text="[WRN]", font=("Consolas", 9, "bold"), text_color=COLORS['bg_dark'])
+
+        btn_set = ctk.CTkLabel(row, text="[SET]", font=("Consolas", 9), text_color=COLORS['text_dim'], cursor="hand2")
+        btn_set.pack(side="right", padx=8)
+        btn_off = ctk.CTkButton(row, text="[▼]", width=40, height=22, font=("Consolas", 10, "bold"),
+                                fg_color="transparent", hover_color=COLORS['matrix_dark'],
+                                border_width=1, border_color=COLORS['border'], corner_radius=0)
+        btn_off.pack(side="right", padx=2)
+        btn_on = ctk.CTkButton(row, text="[▲]", width=40, height=22, font=("Consolas", 10, "bold"),
+                               fg_color="transparent", hover_color=COLORS['matrix_dark'],
+                               border_width=1, border_color=COLORS['border'], corner_radius=0)
+        btn_on.pack(side="right", padx=2)
+
+        ui = self._new_slot('row', row, icon_err=icon_err, icon_warn=icon_warn, name_label=name_label,
+                            led=led, btn_on=btn_on, btn_off=btn_off, lbl_status=lbl_status, id_tag=id_tag)
+        btn_on.configure(command=lambda: self._send_command(ui['sid'], 1))
+        btn_off.configure(command=lambda: self._send_command(ui['sid'], 2))
+        self._bind_slot_events(ui, row)
+        btn_set.bind("<Button-1>", lambda e: self._open_detail_popup(ui['sid']))
+        return ui
 
-        card.bind("<Enter>", on_enter)
-        card.bind("<Leave>", on_leave)
-        
-        # Hitbox Fix
-        def bind_recursive(w, s):
-            if isinstance(w, (ctk.CTkButton, ctk.CTkEntry)): return
-            try:
-                w.bind("<Button-1>", lambda e, sid=s: self._select_device(sid))
-                w.bind("<Enter>", on_enter)
-                w.bind("<Leave>", on_leave)
-            except: pass
-            for child in w.winfo_children():
-                bind_recursive(child, s)
-        
-        bind_recursive(card, sid)
-
-        self.device_cards_ui[sid] = {
-            'frame': card, 'icon_err': icon_err, 'icon_warn': icon_warn,
-            'name_entry': name_entry, 'led': status_led,
-            'btn_on': btn_on, 'btn_off': btn_off, 'lbl_status': lbl_status,
-            'id_tag': id_tag
-        }
-
-    def _update_ui_data(self):
-        with self.poll_lock:
-            for sid, ui in self.device_cards_ui.items():
-                if sid not in self.data_store: continue
-                
-                try:
-                    data = self.data_store[sid]
-                    online = data['online']
-                    cache = data['cache']
-                    status = cache.get(REG_STATUS, 0)
-                    
-                    # Highlight selection
-                    if sid == self.selected_device_id:
-                        ui['frame'].configure(border_color=COLORS['border_glow'], border_width=2)
-                    else:
-                        ui['frame'].configure(border_color=COLORS['border'], border_width=1)
-                    
-                    # Status Display
-                    status_text = STATUS_TEXT.get(status, "[UNK]")
-                    ui['lbl_status'].configure(text=status_text)
-                    
-                    # Connection status (Card LED)
-                    last_ts = data.get('timestamp', 0)
-                    is_stale = (time.time() - last_ts > 15.0 and self.polling)
-                    
-                    if not online: 
-                        ui['led'].configure(text="[OFFLINE]", text_color=COLORS['red'])
-                    elif is_stale: 
-                        ui['led'].configure(text="[LAGGING]", text_color=COLORS['yellow'])
-                    else: 
-                        ui['led'].configure(text="[ONLINE]", text_color=COLORS['matrix_green'])
-
-                    # Errors & Warnings
-                    err_val = cache.get(REG_ERRORS, 0)
-                    warn_val = cache.get(REG_WARNINGS, 0)
-                    
-                    if err_val > 0:
-                        ui['icon_err'].pack(side="left")
-                        ui['icon_err'].configure(text_color=COLORS['red'])
-                    else:
-                        ui['icon_err'].pack_forget()
-
-                    if online and warn_val > 0:
-                        ui['icon_warn'].pack(side="left", padx=5)
-                        ui['icon_warn'].configure(text_color=COLORS['yellow'])
-                    else:
-                        ui['icon_warn'].pack_forget()
-                    
-                except Exception as e:
-                    print(f"UI Update Error (SID {sid}): {e}") 
+    # ========================================================================
+    #  UI YENİLEME (kirli kart + kare hızı sınırı)
+    # ========================================================================
+    def _mark_dirty(self, ev):
+        """Kartı etkileyen bir değişim olayında çağrılır (bus thread'i) — yalnız işaretler."""
+        self._dirty.append(ev.sid)
+
+    def _ui_tick(self):
+        """Sabit kare hızında yenileme: bir karede her kirli kart en fazla bir kez çizilir."""
+        now = time.time()
+        if now - self._last_sweep >= UI_SWEEP_S:
+            self._last_sweep = now
+            self._update_bus_stats()
+            for sid in self.device_cards_ui:
+                self._render_card(sid, force=True)
+
+        dirty = set()
+        while self._dirty:
+            dirty.add(self._dirty.popleft())
+        for sid in dirty:
+            self._render_card(sid)
+
+        self.after(1000 // UI_FPS, self._ui_tick)
+
+    @staticmethod
+    def _apply(ui, key, widget, **kw):
+        """``configure`` yalnız gösterilen değer değiştiyse çağrılır."""
+        if ui['shown'].get(key) != kw:
+            widget.configure(**kw)
+            ui['shown'][key] = kw
+
+    @staticmethod
+    def _show(ui, key, widget, visible, **pack_kw):
+        """``pack`` / ``pack_forget`` yalnız görünürlük değiştiyse çağrılır."""
+        if ui['shown'].get(key) == visible: return
+        if visible: widget.pack(**pack_kw)
+        else: widget.pack_forget()
+        ui['shown'][key] = visible
+
+    def _render_card(self, sid, force=False):
+        """Kartı son snapshot'tan çiz. Sürüm değişmediyse (``force`` hariç) hiçbir şey yapmaz."""
+        ui = self.device_cards_ui.get(sid)
+        # Kilitsiz okuma: motorun en son yayınladığı değişmez kopya
+        data = self.snapshots.get(sid)
+        if ui is None or data is None: return
+        version = data.get('version', 0)
+        if not force and version == ui['version']: return
+        ui['version'] = version
+
+        try:
+            online = data['online']
+            cache = data['cache']
+            status = cache.get(REG_STATUS, 0)
+
+            # Highlight selection / hover
+            if sid == self.selected_device_id or ui['hover']:
+                self._apply(ui, 'frame', ui['frame'], border_color=COLORS['border_glow'], border_width=2)
+            else:
+                self._apply(ui, 'frame', ui['frame'], border_color=COLORS['border'], border_width=1)
+
+            # Status Display
+            self._apply(ui, 'lbl_status', ui['lbl_status'], text=STATUS_TEXT.get(status, "[UNK]"))
+
+            # Connection status (Card LED)
+            last_ts = data.get('timestamp', 0)
+            is_stale = (time.time() - last_ts > 15.0 and self.connected)
+
+            backoff = data.get('backoff_s', 0)
+            if not online and backoff > 0:
+                # Probe modu: sonraki yoklamaya kalan süre (üstel back-off)
+                wait = max(0, data.get('next_probe_ts', 0) - time.time())
+                self._apply(ui, 'led', ui['led'], text=f"[PROBE {wait:.0f}s]", text_color=COLORS['red'])
+            elif not online:
+                self._apply(ui, 'led', ui['led'], text="[OFFLINE]", text_color=COLORS['red'])
+            elif is_stale:
+                self._apply(ui, 'led', ui['led'], text="[LAGGING]", text_color=COLORS['yellow'])
+            elif data.get('slow'):
+                # Sağlık: cevap süresi kendi taban çizgisinin belirgin üstünde
+                self._apply(ui, 'led', ui['led'], text="[SLOW]", text_color=COLORS['yellow'])
+            else:
+                self._apply(ui, 'led', ui['led'], text="[ONLINE]", text_color=COLORS['matrix_green'])
+
+            # Errors & Warnings (renkler sabit; yalnız görünürlük değişir)
+            err_val = cache.get(REG_ERRORS, 0)
+            warn_val = cache.get(REG_WARNINGS, 0)
+            self._apply(ui, 'icon_err', ui['icon_err'], text_color=COLORS['red'])
+            self._apply(ui, 'icon_warn', ui['icon_warn'], text_color=COLORS['yellow'])
+            self._show(ui, 'err_visible', ui['icon_err'], err_val > 0, side="left")
+            self._show(ui, 'warn_visible', ui['icon_warn'], online and warn_val > 0, side="left", padx=5)
+
+        except Exception:
+            log.exception("Kart çizim hatası (SID %s)", sid)
+
+    def _update_bus_stats(self):
+        parts = []
+        metrics = self.engine.metrics
+        for port, m in metrics.items():
+            c = self.engine.buses[port].counters.port
+            parts.append(f"{port} LOAD:{m['load'] * 100:.0f}% UTIL:{m['utilization'] * 100:.0f}% "
+                         f"MISS:{m['missed']}/{m['cmd_missed']} OFF:{m['offline']} COAL:{m['coalesced'] + m['deduped']} "
+                         f"TO:{c['timeouts']} CRC:{c['crc_errors']} EXC:{c['exceptions']}")
+        text = "  |  ".join(parts)
+        overloaded = any(m['load'] > 1.0 for m in metrics.values())
+        color = COLORS['yellow'] if overloaded else COLORS['text_dim']
+        if (text, color) != self._bus_stats_shown:
+            self.lbl_bus_stats.configure(text=text, text_color=color)
+            self._bus_stats_shown = (text, color)
 
     # ========================================================================
     #  OPERASYONLAR
@@ -465,7 +767,7 @@ class HMIApp(ctk.CTk):
     def _open_add_device_dialog(self):
         dialog = ctk.CTkToplevel(self)
         dialog.title("SYSTEM: ADD NODE")
-        dialog.geometry("380x420")
+        dialog.geometry("380x600")
         dialog.configure(fg_color=COLORS['bg_dark'])
         dialog.transient(self)
         dialog.grab_set()
@@ -486,9 +788,36 @@ class HMIApp(ctk.CTk):
         ent_name = ctk.CTkEntry(dialog, width=240, height=36, corner_radius=0, 
                                 fg_color=COLORS['bg_dark'], border_color=COLORS['border'], 
                                 font=("Consolas", 12), justify="center")
-        ent_name.pack(pady=(4, 20))
+        ent_name.pack(pady=(4, 15))
         ent_name.insert(0, "NODE_NEW")
 
+        # Bus ataması (boş/DEFAULT -> toolbar'daki PORT/BAUD)
+        bus_row = ctk.CTkFrame(dialog, fg_color="transparent")
+        bus_row.pack(pady=(0, 15))
+        ctk.CTkLabel(bus_row, text=":: PORT ::", font=("Consolas", 9, "bold"), text_color=COLORS['text_dim']).grid(row=0, column=0)
+        ctk.CTkLabel(bus_row, text=":: BAUD ::", font=("Consolas", 9, "bold"), text_color=COLORS['text_dim']).grid(row=0, column=1)
+        ports = [PORT_DEFAULT] + [p.device for p in serial.tools.list_ports.comports()]
+        ent_port = ctk.CTkComboBox(bus_row, values=ports, width=140, height=30,
+                                   font=("Consolas", 11), corner_radius=0,
+                                   fg_color=COLORS['bg_dark'], border_color=COLORS['border'],
+                                   button_color=COLORS['border'], button_hover_color=COLORS['matrix_dark'],
+                                   dropdown_fg_color=COLORS['bg_dark'], dropdown_text_color=COLORS['text'])
+        ent_port.set(PORT_DEFAULT)
+        ent_port.grid(row=1, column=0, padx=4, pady=(4, 0))
+        ent_baud = ctk.CTkComboBox(bus_row, values=[PORT_DEFAULT] + BAUD_RATES, width=100, height=30,
+                                   font=("Consolas", 11), corner_radius=0,
+                                   fg_color=COLORS['bg_dark'], border_color=COLORS['border'],
+                                   button_color=COLORS['border'], button_hover_color=COLORS['matrix_dark'],
+                                   dropdown_fg_color=COLORS['bg_dark'], dropdown_text_color=COLORS['text'])
+        ent_baud.set(PORT_DEFAULT)
+        ent_baud.grid(row=1, column=1, padx=4, pady=(4, 0))
+
+        ctk.CTkLabel(dialog, text=":: GROUPS (a,b) ::", font=("Consolas", 9, "bold"), text_color=COLORS['text_dim']).pack()
+        ent_groups = ctk.CTkEntry(dialog, width=240, height=30, corner_radius=0,
+                                  fg_color=COLORS['bg_dark'], border_color=COLORS['border'],
+                                  font=("Consolas", 11), justify="center")
+        ent_groups.pack(pady=(4, 10))
+
         lbl_err = ctk.CTkLabel(dialog, text="", font=("Consolas", 10))
         lbl_err.pack(pady=2)
 
@@ -503,7 +832,7 @@ class HMIApp(ctk.CTk):
                     lbl_err.configure(text="! ID_TYPE_ERROR", text_color=COLORS['red'])
                     return
 
-                if any(d['id'] == sid for d in self.devices):
+                if sid in self.devices:
                     lbl_err.configure(text=f"! NODE_{sid}_EXISTS", text_color=COLORS['red'])
                     return
                 
@@ -512,16 +841,27 @@ class HMIApp(ctk.CTk):
                     lbl_err.configure(text="! NAME_NULL", text_color=COLORS['red'])
                     return
 
-                self.devices.append({'id': sid, 'name': name})
-                self.data_store[sid] = {
-                    'cache': {}, 'pending': {}, 'online': True, 'errors': 0, 'last_update': '',
-                    'latency': 0, 'success_count': 0, 'total_count': 0,
-                    'cmd_latency': 0, 'last_cmd_ts': 0,
-                    'slave_resp_time': 0, 'loop_time': 0, 'last_poll_ts': 0,
-                    'slave_resp_history': [], 'loop_time_history': []
-                }
+                device = {'id': sid, 'name': name}
+                port = ent_port.get().strip()
+                if port and port != PORT_DEFAULT:
+                    device['port'] = port
+                    baud = ent_baud.get().strip()
+                    if baud and baud != PORT_DEFAULT:
+                        try: device['baud'] = int(baud)
+                        except ValueError:
+                            lbl_err.configure(text="! BAUD_TYPE_ERROR", text_color=COLORS['red'])
+                            return
+
+                groups = [g.strip().upper() for g in ent_groups.get().split(',') if g.strip()]
+                if GROUP_ALL in groups:
+                    lbl_err.configure(text=f"! GROUP_{GROUP_ALL}_RESERVED", text_color=COLORS['red'])
+                    return
+                if groups: device['groups'] = groups
+
+                self._attach_to_bus(device)    # Motor cihazı ortak kayda ekler
                 self._save_config()
-                self._update_grid_area()
+                self._refresh_group_combo()
+                self._sync_grid_layout()
                 dialog.destroy()
             except Exception as e:
                 lbl_err.configure(text=f"! FATAL: {e}", text_color=COLORS['red'])
@@ -536,41 +876,146 @@ class HMIApp(ctk.CTk):
                       hover_color="#3D0000", border_width=0,
                       command=dialog.destroy).pack(padx=40, fill="x")
 
+    def _open_scan_dialog(self):
+        """Toolbar portunda ID 1..247 x BAUD listesi tarama; bulunanlar tek tuşla eklenir."""
+        if self.connected:
+            self.lbl_toolbar_status.configure(text="! Tarama için bağlantıyı kesin", text_color=COLORS['red'])
+            return
+        port = self.combo_port.get()
+        bauds = self.combo_baud.cget("values")
+
+        dialog = ctk.CTkToplevel(self)
+        dialog.title("SYSTEM: BUS SCAN")
+        dialog.geometry("420x520")
+        dialog.configure(fg_color=COLORS['bg_dark'])
+        dialog.transient(self)
+        dialog.grab_set()
+
+        ctk.CTkLabel(dialog, text=f"SCAN {port}", font=("Consolas", 14, "bold"), text_color=COLORS['text']).pack(pady=(20, 2))
+        ctk.CTkLabel(dialog, text=f"ID 1..247 @ {', '.join(bauds)}", font=("Consolas", 9),
+                     text_color=COLORS['text_dim']).pack()
+        lbl_progress = ctk.CTkLabel(dialog, text=":: INIT ::", font=("Consolas", 10, "bold"), text_color=COLORS['text_dim'])
+        lbl_progress.pack(pady=8)
+        box = ctk.CTkTextbox(dialog, width=360, height=280, corner_radius=0, font=("Consolas", 11),
+                             fg_color=COLORS['bg_dark'], border_width=1, border_color=COLORS['border'],
+                             text_color=COLORS['text'])
+        box.pack(padx=20)
+        box.configure(state="disabled")
+
+        # Tarama thread'i yalnız deque'ya yazar; UI thread'i aralıkla boşaltır
+        inbox = deque()
+        scanner = BusScanner(port, bauds,
+                             on_found=lambda r: inbox.append(('found', r)),
+                             on_progress=lambda baud, sid, noise: inbox.append(('progress', (baud, sid, noise))),
+                             on_done=lambda found, err: inbox.append(('done', err)))
+
+        def drain():
+            if not dialog.winfo_exists(): return
+            progress = None
+            while inbox:
+                kind, data = inbox.popleft()
+                if kind == 'found':
+                    r = data
+                    extra = f"EXC {r['exception']}" if r['exception'] else STATUS_TEXT.get(r['status'], r['status'])
+                    box.configure(state="normal")
+                    box.insert("end", f"ID {r['id']:3d} @ {r['baud']:6d}  {r['ms']:5.1f} ms  {extra}\n")
+                    box.configure(state="disabled")
+                elif kind == 'progress':
+                    progress = data
+                else:
+                    text = f"!! {data}" if data else f":: DONE :: {len(scanner.found)} NODE"
+                    lbl_progress.configure(text=text, text_color=COLORS['red'] if data else COLORS['matrix_green'])
+                    btn_add.configure(state="normal" if scanner.found else "disabled")
+                    return
+            if progress:
+                baud, sid, noise = progress
+                lbl_progress.configure(text=f":: {baud} BAUD  ID {sid}/247  NOISE {noise} ::")
+            dialog.after(100, drain)
+
+        def add_found():
+            added, skipped = found_devices(scanner.found, self.devices, port, default_baud=int(self.combo_baud.get()))
+            for device in added:
+                self._attach_to_bus(device)
+            if added:
+                self._save_config()
+                self._refresh_group_combo()
+                self._sync_grid_layout()
+            if not skipped:
+                close()
+                return
+            # Segment tek baud'da çalışır: başka baud'da bulunanlar eklenmez, kullanıcı görsün
+            box.configure(state="normal")
+            for r in skipped:
+                box.insert("end", f"ID {r['id']:3d} @ {r['baud']:6d}  SKIPPED: PORT BAUD MISMATCH\n")
+            box.configure(state="disabled")
+            lbl_progress.configure(text=f"! {len(added)} ADDED, {len(skipped)} SKIPPED (OTHER BAUD)",
+                                   text_color=COLORS['red'])
+            btn_add.configure(state="disabled")
+
+        def close():
+            scanner.stop()
+            dialog.destroy()
+
+        btn_add = ctk.CTkButton(dialog, text="[ ADD FOUND ]", font=("Consolas", 12, "bold"),
+                                height=36, corner_radius=0, fg_color="transparent",
+                                border_width=1, border_color=COLORS['border'],
+                                hover_color=COLORS['matrix_dark'], state="disabled", command=add_found)
+        btn_add.pack(pady=(12, 6), padx=40, fill="x")
+        ctk.CTkButton(dialog, text="[ ABORT ]", font=("Consolas", 11),
+                      height=30, corner_radius=0, fg_color="transparent",
+                      hover_color="#3D0000", border_width=0, command=close).pack(padx=40, fill="x")
+        dialog.protocol("WM_DELETE_WINDOW", close)
+
+        scanner.start()
+        dialog.after(100, drain)
+
     def _delete_selected_device(self):
         if self.selected_device_id:
-            self.devices = [d for d in self.devices if d['id'] != self.selected_device_id]
-            self.data_store.pop(self.selected_device_id, None)
+            self.engine.remove_device(self.selected_device_id)   # Ortak kayıttan da çıkar
             self._save_config()
             self.selected_device_id = None
+            self._refresh_group_combo()
             self._sync_grid_layout()
 
     def _select_device(self, sid):
-        self.selected_device_id = sid
-        self._update_ui_data()
+        prev, self.selected_device_id = self.selected_device_id, sid
+        # Yalnız eski ve yeni seçili kartın çerçevesi değişir
+        for s in {prev, sid}:
+            if s is not None: self._render_card(s, force=True)
 
     def _send_command(self, sid, val):
         """Komut kuyruğa ekle — polling thread anında işler (Öncelikli)."""
-        if sid not in self.data_store: return
-        self.command_queue.put((sid, REG_COMMAND, val, time.time()))
+        self.engine.submit(sid, REG_COMMAND, val, time.time())
+
+    def _send_group_command(self, val):
+        """Seçili gruba AÇ/KAPAT — motor portu kapsıyorsa broadcast, değilse seri gönderir."""
+        group = self.combo_group.get()
+        n = self.engine.submit_group(group, REG_COMMAND, val, time.time())
+        if not n:
+            self.lbl_toolbar_status.configure(text=f"! GRP {group}: bağlı cihaz yok", text_color=COLORS['red'])
+
+    def _refresh_group_combo(self):
+        names = sorted(device_groups(self.devices), key=lambda g: (g != GROUP_ALL, g))
+        self.combo_group.configure(values=names)
+        if self.combo_group.get() not in names: self.combo_group.set(GROUP_ALL)
 
     def _update_device_name(self, sid, name):
-        for d in self.devices:
-            if d['id'] == sid: 
-                d['name'] = name
-                self._save_config() # KAYIT ET
-                break
+        device = self.devices.get(sid)
+        if device and device['name'] != name:
+            self.devices.update(sid, name=name)
+            self._save_config()
 
     # ========================================================================
     #  MODBUS POLL MOTOR
     # ========================================================================
     def _toggle_connection(self):
         if self.connected:
-            self.polling = False
             self.connected = False
-            if self.instrument and self.instrument.serial:
-                try: self.instrument.serial.close()
-                except: pass
-            self.instrument = None
+            self._stop_gateway()
+            self.exporter.stop()
+            self.engine.stop()
+            self.lbl_bus_stats.configure(text="")
+            self._bus_stats_shown = None
             self.btn_connect.configure(text="[ EXEC CONNECT ]", fg_color="transparent", border_color=COLORS['matrix_green'])
             self.lbl_toolbar_status.configure(text=":: OFFLINE ::", text_color=COLORS['text_dim'])
         else:
@@ -578,197 +1023,42 @@ class HMIApp(ctk.CTk):
                 self.lbl_toolbar_status.configure(text="Önce cihaz ekleyin!", text_color=COLORS['red'])
                 return
             try:
-                port = self.combo_port.get()
-                baud = int(self.combo_baud.get())
-
-                self.instrument = minimalmodbus.Instrument(port, 1)  # dummy sid
-                self.instrument.serial.baudrate = baud
-                self.instrument.serial.timeout  = 0.5
-                self.instrument.close_port_after_each_call = False
-
+                # Her port için bağımsız motor (tek loop'ta ayrı task; kendi kuyruk, kilit ve metrikleri)
+                self.engine.start(self.combo_port.get(), int(self.combo_baud.get()))
                 self.connected = True
-                self.polling = True
-
-                for sid in self.data_store:
-                    self.data_store[sid]['online'] = True
-                    self.data_store[sid]['errors'] = 0
-
+                self._start_gateway()
+                self.exporter.start()
                 self.btn_connect.configure(text="[ TERMINATE ]", fg_color="transparent", border_color=COLORS['red'])
-                self.lbl_toolbar_status.configure(text=f":: ONLINE :: {port} ::", text_color=COLORS['matrix_green'])
-                threading.Thread(target=self._polling_worker, daemon=True).start()
+                self._show_bus_ports()
             except Exception as e:
                 self.lbl_toolbar_status.configure(text=f"!! ERR_INIT: {e}", text_color=COLORS['red'])
 
-    def _polling_worker(self):
-        """Polling döngüsü: Öncelikli komut kuyruğu ve periyodik sorgu."""
-        device_index = 0
-        
-        while self.polling:
-            # 1. ÖNCELİK: Komut Kuyruğu
-            had_command = False
-            processed_cmds = 0
-            
-            while not self.command_queue.empty() and processed_cmds < 5: # Max 5 komut üst üste
-                try:
-                    cmd = self.command_queue.get_nowait()
-                    sid, reg, val, ts = cmd
-                    had_command = True
-                    processed_cmds += 1
-                    
-                    # RETRY LOGIC (3 Deneme)
-                    cmd_success = False
-                    for attempt in range(3):
-                        with self.poll_lock:
-                            try:
-                                # Buffer Temizliği (Her denemede)
-                                self.instrument.serial.reset_input_buffer()
-                                if attempt > 0: time.sleep(0.1) # Retry ise bekle
-                                
-                                self.instrument.address = sid
-                                
-                                # Timeout Ayarı (Yazma işlemi için)
-                                # Başarı genelde 0.2s sürüyor. 0.4s timeout yeterli.
-                                # Hata olursa hızlıca retry'a düşsün (0.7s bekletmesin).
-                                old_timeout = self.instrument.serial.timeout
-                                self.instrument.serial.timeout = 0.6
-                                
-                                start_time = time.time() # METRICS: Start timer here
-                                try:
-                                    # Öncesinde sessizlik (Bus stabilization)
-                                    # Polling'den hemen sonra geliyorsa cihazın toparlaması için biraz daha süre ver
-                                    time.sleep(0.1)
-                                    
-                                    # Function code 6 (Write Single Register)
-                                    print(f"DEBUG: Cmd {sid} -> Reg:{reg} Val:{val} (Try {attempt+1})")
-                                    self.instrument.write_register(reg, val, 0, functioncode=6)
-                                    print(f"DEBUG: Success! took {time.time() - start_time:.3f}s")
-                                finally:
-                                    self.instrument.serial.timeout = old_timeout
-                                
-                                # Metrics Update
-                                end_time = time.time()
-                                resp_time = (end_time - start_time) * 1000
-                                
-                                if sid in self.data_store:
-                                    self.data_store[sid]['slave_resp_time'] = resp_time
-                                    # History Update
-                                    hist = self.data_store[sid].get('slave_resp_history', [])
-                                    hist.append(resp_time)
-                                    if len(hist) > 20: hist.pop(0)
-                                    self.data_store[sid]['slave_resp_history'] = hist
-
-                                    if ts > 0:
-                                        self.data_store[sid]['cmd_latency'] = (end_time - ts) * 1000
-                                    self.data_store[sid]['online'] = True
-                                    self.data_store[sid]['errors'] = 0
-                                    
-                                    # CACHE UPDATE
-                                    if reg != REG_COMMAND:
-                                        self.data_store[sid]['cache'][reg] = val
-                                
-                                cmd_success = True
-                                break # Başarılı, döngüden çık
-                                
-                            except Exception as e:
-                                err_msg = str(e)
-                                if "No communication" in err_msg:
-                                    print(f"Meşgul, tekrar deneniyor ({attempt+1}/3)...")
-                                else:
-                                    print(f"Komut Hatası (ID {sid}, Try {attempt+1}): {e}")
-                        
-                        # Loop dışında bekleme (Lock serbestken)
-                        if not cmd_success: time.sleep(0.1)
-
-                    time.sleep(0.05) # Komutlar arası minik boşluk
-                except queue.Empty:
-                    pass
-            
-            if had_command:
-                self.after(0, self._update_ui_data)
-                continue
+    def _start_gateway(self):
+        if not GATEWAY_LISTEN: return
+        host, port = GATEWAY_LISTEN.rsplit(':', 1)
+        try:
+            self.gateway = ModbusTcpGateway(self.engine, host, int(port))
+            self.gateway.start()
+        except Exception as e:
+            self.gateway = None
+            log.error("Gateway başlatılamadı: %s", e)
 
-            # 2. Periyodik Sorgu
-            if not self.devices:
-                time.sleep(0.5)
-                continue
-            
-            if device_index >= len(self.devices):
-                device_index = 0
-            
-            device = self.devices[device_index]
-            sid = device['id']
-            
-            # Loop Time Hesabı
-            now = time.time()
-            if sid in self.data_store:
-                last_poll = self.data_store[sid].get('last_poll_ts', 0)
-                if last_poll > 0:
-                    loop_time = (now - last_poll) * 1000
-                    if loop_time < 20000: # Filtre: mantıksız değerleri ele
-                        self.data_store[sid]['loop_time'] = loop_time
-                        # History Update
-                        hist = self.data_store[sid].get('loop_time_history', [])
-                        hist.append(loop_time)
-                        if len(hist) > 20: hist.pop(0)
-                        self.data_store[sid]['loop_time_history'] = hist
-                self.data_store[sid]['last_poll_ts'] = now
-
-            # Sorgula
-            self._query_periodic(sid)
-            
-            device_index += 1
-            # Döngü Hızı
-            time.sleep(0.05)
-            self.after(0, self._update_ui_data)
-
-    def _query_periodic(self, sid):
-        if sid not in self.data_store: return
-        success = False
-        self.data_store[sid]['total_count'] += 1
-
-        for attempt in range(2): # 2 Burst Retry
-            with self.poll_lock:
-                try:
-                    t_start = time.time()
-                    
-                    # Buffer Temizliği
-                    self.instrument.serial.reset_input_buffer()
-                    if attempt > 0: # Retry ise output da temizle
-                         self.instrument.serial.reset_output_buffer()
-                         time.sleep(0.05)
-                    
-                    self.instrument.address = sid
-                    
-                    # Read
-                    count = 9 if self.detail_open_for == sid else 3
-                    vals = self.instrument.read_registers(1, count, 3) # Reg 1..N
-                    
-                    t_end = time.time()
-                    latency = (t_end - t_start) * 1000
-                    
-                    self.data_store[sid]['latency'] = latency
-                    self.data_store[sid]['timestamp'] = t_end
-                    self.data_store[sid]['online'] = True
-                    self.data_store[sid]['errors'] = 0
-                    self.data_store[sid]['success_count'] += 1
-                    
-                    for i, v in enumerate(vals):
-                        self.data_store[sid]['cache'][1 + i] = v
-                    
-                    success = True
-                    break
-                except Exception:
-                    pass
-            
-            if not success: time.sleep(0.1) # Retry arası bekleme artırıldı
-        
-        if not success:
-            self.data_store[sid]['errors'] += 1
-            
-        # Polling bitti, biraz bekle ki sonraki komut veya sorgu için hat rahatlasın
-        time.sleep(0.05)
-        if self.data_store[sid]['errors'] >= 1:
-            self.data_store[sid]['online'] = False
+    def _stop_gateway(self):
+        if self.gateway:
+            self.gateway.stop()
+            self.gateway = None
+
+    def _show_bus_ports(self):
+        tcp = f" TCP {GATEWAY_LISTEN} ::" if self.gateway else ""
+        self.lbl_toolbar_status.configure(text=f":: ONLINE :: {', '.join(self.engine.buses)} ::{tcp}", text_color=COLORS['matrix_green'])
+
+    def _attach_to_bus(self, device):
+        """Cihazı motora ver; bağlıyken port yeni ise o port için motor başlar."""
+        try:
+            self.engine.add_device(device)
+            if self.connected: self._show_bus_ports()
+        except Exception as e:
+            self.lbl_toolbar_status.configure(text=f"!! ERR_INIT: {e}", text_color=COLORS['red'])
 
     # ========================================================================
     #  DETAY POPUP
@@ -777,19 +1067,21 @@ class HMIApp(ctk.CTk):
     #  SETTINGS POPUP (SEXY REDESIGN)
     # ========================================================================
     def _open_detail_popup(self, slave_id):
-        device = next((d for d in self.devices if d['id'] == slave_id), None)
+        device = self.devices.get(slave_id)
         if not device: return
 
         self.detail_open_for = slave_id
+        self.engine.refresh(slave_id, 'params')    # Parametreler bir kez okunur (cache TTL'den yaşlıysa)
         popup = ctk.CTkToplevel(self)
         popup.title(f"SYSTEM: NODE_MGMT [{slave_id}]")
-        popup.geometry("460x640")
+        popup.geometry("460x720")
         popup.configure(fg_color=COLORS['bg_dark'])
         popup.transient(self)
         popup.grab_set()
 
         def on_close():
             self.detail_open_for = None
+            param_sub.cancel()
             popup.destroy()
 
         popup.protocol("WM_DELETE_WINDOW", on_close)
@@ -839,45 +1131,76 @@ class HMIApp(ctk.CTk):
         stats_box = ctk.CTkFrame(bottom, fg_color="transparent")
         stats_box.pack(fill="x", padx=40, pady=15)
         
-        def create_stat(parent, label, key, side="left"):
-            f = ctk.CTkFrame(parent, fg_color="transparent")
-            f.pack(side=side, fill="both", expand=True)
-            ctk.CTkLabel(f, text=label, font=("Consolas", 8, "bold"), text_color=COLORS['text_dim']).pack()
-            l_val = ctk.CTkLabel(f, text="-- ms", font=("Consolas", 11, "bold"), text_color=COLORS['text'])
-            l_val.pack()
-            l_avg = ctk.CTkLabel(f, text="(Avg: --)", font=("Consolas", 9), text_color=COLORS['text_dim'])
-            l_avg.pack()
-            return l_val, l_avg
-
-        lbl_ping, _ = create_stat(stats_box, ":: PING ::", 'latency')
-        lbl_slave, lbl_slave_avg = create_stat(stats_box, ":: SLAVE_RESP ::", 'slave_resp_time', "right")
+        # Gecikme tablosu: son değer, p50 / p95 / p99 / max (ms) ve PING histogramı
+        ctk.CTkLabel(stats_box, text="LAST   P50 / P95 / P99 / MAX (ms)", font=("Consolas", 8, "bold"),
+                     text_color=COLORS['text_dim']).grid(row=0, column=1, columnspan=2, sticky="w")
+        stat_labels = []
+        for i, (label, key) in enumerate(LATENCY_ROWS, start=1):
+            ctk.CTkLabel(stats_box, text=label, font=("Consolas", 8, "bold"),
+                         text_color=COLORS['text_dim']).grid(row=i, column=0, sticky="w", padx=(0, 8))
+            l_last = ctk.CTkLabel(stats_box, text="--", width=40, anchor="e", font=("Consolas", 11, "bold"),
+                                  text_color=COLORS['text'])
+            l_last.grid(row=i, column=1, sticky="e")
+            l_pct = ctk.CTkLabel(stats_box, text=format_summary(None), font=("Consolas", 10),
+                                 text_color=COLORS['text_dim'])
+            l_pct.grid(row=i, column=2, sticky="w", padx=(10, 0))
+            stat_labels.append((key, l_last, l_pct))
+        lbl_hist = ctk.CTkLabel(stats_box, text="", font=("Consolas", 10), text_color=COLORS['accent_dim'])
+        lbl_hist.grid(row=len(LATENCY_ROWS) + 1, column=0, columnspan=3, sticky="w", pady=(4, 0))
 
         lbl_err = ctk.CTkLabel(bottom, text="", font=("Consolas", 10))
         lbl_err.pack(pady=5)
 
+        # Parametre etiketleri yalnız PARAM olaylarıyla güncellenir (bus thread'i -> deque -> UI)
+        labels_by_reg = {p['reg']: (p, lbl) for p, lbl in value_labels}
+        param_events = deque()
+        param_sub = self.engine.subscribe_events(param_events.append, kinds=(PARAM, WRITE_MISMATCH), sids=(slave_id,))
+
+        def show_param(reg, raw):
+            if reg not in labels_by_reg: return
+            p, lbl = labels_by_reg[reg]
+            lbl.configure(text=str(raw - 10 if p.get('offset') else raw))
+
+        cache = self.snapshots.get(slave_id, {}).get('cache', {})
+        for reg in labels_by_reg:
+            if reg in cache: show_param(reg, cache[reg])
+
+        stats_shown = {'version': -1, 'at': 0.0}
+
         def refresh_values():
             if self.detail_open_for != slave_id: return
-            d = self.data_store.get(slave_id, {})
-            cache = d.get('cache', {})
-
-            for p, lbl in value_labels:
-                raw = cache.get(p['reg'], 0)
-                cur = raw - 10 if p.get('offset') else raw
-                lbl.configure(text=str(cur))
-            
-            lbl_ping.configure(text=f"{d.get('latency',0):.0f} ms")
-            lbl_slave.configure(text=f"{d.get('slave_resp_time',0):.0f} ms")
-            
-            hist_s = d.get('slave_resp_history', [])
-            avg_s = sum(hist_s)/len(hist_s) if hist_s else 0
-            lbl_slave_avg.configure(text=f"(Avg: {avg_s:.0f})")
-            
-            popup.after(500, refresh_values)
+            mismatches = []
+            while param_events:
+                ev = param_events.popleft()
+                if ev.kind == WRITE_MISMATCH:
+                    p = labels_by_reg.get(ev.addr, ({'label': ev.name},))[0]
+                    mismatches.append(f"{p['label']}_VERIFY_ERR ({ev.old}->{ev.new})")
+                show_param(ev.addr, ev.new)
+            if mismatches:
+                lbl_err.configure(text=" | ".join(mismatches), text_color=COLORS['red'])
+
+            # Gecikme tablosu: yeni snapshot varsa, en fazla 500 ms'de bir
+            d = self.snapshots.get(slave_id, {})
+            now = time.monotonic()
+            if d.get('version') != stats_shown['version'] and now - stats_shown['at'] >= 0.5:
+                stats_shown.update(version=d.get('version'), at=now)
+                stats = d.get('stats', {})
+                for key, l_last, l_pct in stat_labels:
+                    st = stats.get(key)
+                    l_last.configure(text=f"{st['last']:.0f}" if st and st['count'] else "--")
+                    l_pct.configure(text=format_summary(st))
+                ping = stats.get('latency')
+                tmo = d.get('reply_timeout_ms')
+                tmo_text = f"  TMO {tmo:.0f}ms" if tmo else ""
+                lbl_hist.configure(text=f"PING HIST {sparkline(ping['hist'])}{tmo_text}" if ping and ping['count'] else "")
+
+            popup.after(1000 // UI_FPS, refresh_values)
 
         refresh_values()
 
         def apply():
             errors = []
+            writes = []
             for p, e in entries:
                 val_str = e.get().strip()
                 if not val_str: continue
@@ -886,9 +1209,12 @@ class HMIApp(ctk.CTk):
                     if val < p['min'] or val > p['max']:
                         errors.append(f"{p['label']}_RANGE_ERR")
                         continue
-                    self._send_command_settings(slave_id, p['reg'], val + 10 if p.get('offset') else val)
+                    writes.append((p['reg'], val + 10 if p.get('offset') else val))
                 except ValueError: errors.append(f"{p['label']}_TYPE_ERR")
             
+            # Doğrulanan alanlar tek çağrıyla kuyruğa girer -> bitişikler tek FC16 bloğu
+            if writes: self._send_command_settings(slave_id, dict(writes))
+            
             if errors: lbl_err.configure(text=" | ".join(errors), text_color=COLORS['red'])
             else: 
                 lbl_err.configure(text=":: SET_QUEUE_CONFIRMED ::", text_color=COLORS['accent'])
@@ -909,11 +1235,11 @@ class HMIApp(ctk.CTk):
                                   hover_color="#3D0000", command=on_close)
         btn_close.pack(fill="x")
 
-    def _send_command_settings(self, sid, reg, val):
-        """Ayar değişikliği için genel komut gönderici (aynı kuyruğu kullanır)."""
-        if sid not in self.data_store: return
-        self.command_queue.put((sid, reg, val, 0)) # Settings için TS önemli değil
+    def _send_command_settings(self, sid, values):
+        """Ayar değişiklikleri ``{reg: val}`` — aynı kuyruk, tek seferde (bkz. ``submit_many``)."""
+        self.engine.submit_many(sid, values) # TS kuyruğa girişte damgalanır (deadline + cmd_latency)
 
 if __name__ == "__main__":
+    setup_logging(os.environ.get("MODBUS_LOG", "INFO"))
     app = HMIApp()
     app.mainloop()
@@ -0,0 +1,160 @@
+"""Cihaz kayıt defteri: slave ID ve port indeksli, ``devices.json`` ile kalıcı.
+
+Cihazlar eklenme sırasını koruyan bir sözlükte tutulur (poll sırası
+kararlıdır); ID ile erişim O(1)'dir, port listesi yalnız o portu dolaşır. Kayıt
+değişiklikleri diske hemen yazılmaz: ``schedule_save`` son değişiklikten
+``save_delay`` sonra tek bir yazma yapar. Yazma atomiktir — geçici dosyaya
+yazılır, diske zorlanır ve ``os.replace`` ile yerine konur; kaydetme
+sırasında çökme eski dosyayı bozmaz.
+
+Yüklemede geçersiz (``id``'siz) veya tekrarlanan ID'li kayıtlar uyarıyla
+atlanır ve orijinal dosya ``.bak`` olarak saklanır; okunamayan dosya
+``ValueError`` fırlatır — çağıran kayıt yolu bağlanmamış bir kayıtla devam
+etmeli, yoksa ilk kaydetme kullanıcının dosyasını ezer.
+"""
+import json
+import os
+import shutil
+import threading
+
+from modbus_log import get_logger
+
+log = get_logger(__name__)
+
+DEVICES_JSON = "devices.json"
+SAVE_DELAY_S = 1.0      # Debounce: art arda değişiklikler tek yazmada toplanır
+
+
+class DeviceRegistry:
+    """Sıralı, indeksli cihaz listesi. Kayıtlar ``devices.json`` sözlükleridir."""
+
+    def __init__(self, devices=(), path=None, save_delay=SAVE_DELAY_S):
+        self.path = path
+        self.save_delay = save_delay
+        self._by_id = {}            # sid -> cihaz (eklenme sırası)
+        self._by_port = {}          # port (None: varsayılan) -> {sid: cihaz}
+        self._lock = threading.RLock()
+        self._timer = None
+        for d in devices:
+            self.add(d)
+
+    @classmethod
+    def load(cls, path=DEVICES_JSON, save_delay=SAVE_DELAY_S):
+        """Dosyadan yükle; dosya yoksa boş kayıt (ilk kaydetmede oluşur).
+
+        Dosya okunamaz veya liste değilse ``ValueError``. Atlanan kayıt varsa
+        dosya ``<path>.bak`` olarak kopyalanır (sonraki kaydetme onları yazmaz).
+        """
+        devices = []
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    devices = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                raise ValueError(f"{path} okunamadı: {e}") from e
+            if not isinstance(devices, list):
+                raise ValueError(f"{path}: cihaz listesi bekleniyordu")
+        registry = cls((), path, save_delay)
+        skipped = 0
+        for d in devices:
+            if not isinstance(d, dict) or not isinstance(d.get('id'), int):
+                log.warning("%s: geçersiz cihaz kaydı atlandı: %r", path, d)
+                skipped += 1
+            elif d['id'] in registry:
+                log.warning("%s: slave ID %s tekrar ediyor, sonraki kayıt atlandı", path, d['id'])
+                skipped += 1
+            else:
+                registry.add(d)
+        if skipped:
+            shutil.copyfile(path, f"{path}.bak")
+            log.warning("%s: %d kayıt atlandı; orijinal dosya %s.bak olarak saklandı", path, skipped, path)
+        return registry
+
+    # --- Okuma ---
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, sid):
+        return sid in self._by_id
+
+    def get(self, sid):
+        return self._by_id.get(sid)
+
+    def ids(self):
+        return list(self._by_id)
+
+    def ports(self):
+        """Cihazların açık ``port`` alanları (None: toolbar varsayılanı)."""
+        return [p for p, members in self._by_port.items() if members]
+
+    def on_port(self, port):
+        """``port`` alanı bu olan cihazlar, kayıt sırasıyla."""
+        return list(self._by_port.get(port or None, {}).values())
+
+    # --- Değişiklik ---
+    def add(self, device):
+        sid = device['id']
+        with self._lock:
+            if sid in self._by_id:
+                raise ValueError(f"Slave ID {sid} zaten kayıtlı")
+            self._by_id[sid] = device
+            self._by_port.setdefault(device.get('port') or None, {})[sid] = device
+
+    def remove(self, sid):
+        """Cihazı çıkar; çıkan kaydı (yoksa None) döndür."""
+        with self._lock:
+            device = self._by_id.pop(sid, None)
+            if device is not None:
+                self._by_port.get(device.get('port') or None, {}).pop(sid, None)
+            return device
+
+    def update(self, sid, **fields):
+        """Alanları değiştir (``port`` değişirse port indeksi güncellenir)."""
+        with self._lock:
+            device = self._by_id[sid]
+            old_port = device.get('port') or None
+            device.update(fields)
+            new_port = device.get('port') or None
+            if new_port != old_port:
+                self._by_port.get(old_port, {}).pop(sid, None)
+                self._by_port.setdefault(new_port, {})[sid] = device
+            return device
+
+    # --- Kalıcılık ---
+    def schedule_save(self):
+        """Son çağrıdan ``save_delay`` sonra kaydet (debounce)."""
+        if not self.path: return
+        with self._lock:
+            if self._timer: self._timer.cancel()
+            self._timer = threading.Timer(self.save_delay, self._save_later)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Bekleyen kaydetme varsa hemen yap (ör. kapanışta)."""
+        with self._lock:
+            pending, self._timer = self._timer, None
+        if pending:
+            pending.cancel()
+            self.save()
+
+    def _save_later(self):
+        try:
+            self.save()
+        except Exception as e:
+            log.error("Config kaydetme hatası (%s): %s", self.path, e)
+
+    def save(self):
+        """Atomik yazma: geçici dosya + fsync + ``os.replace``."""
+        if not self.path: return
+        with self._lock:
+            self._timer = None
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(list(self._by_id.values()), f, indent=4, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
@@ -0,0 +1,213 @@
+"""Cihaz tipi başına declaratif register haritası ve okuma aralığı planlayıcı.
+
+Harita; adres, genişlik, tip, ölçek ve erişim modunu tanımlar. Planlayıcı
+okunacak register'ları en az sayıda bitişik FC3 isteğine böler; aradaki küçük
+boşlukları (``max_gap``) okumak yeni bir istek açmaktan ucuzdur. Çözümleme
+her aralık için önceden derlenmiş tek bir ``struct.Struct`` ile yapılır.
+"""
+import struct
+
+# --- REGISTER HARİTASI (Kapı kontrolcüsü) ---
+REG_COMMAND     = 0   # WO
+REG_STATUS      = 1   # RO
+REG_ERRORS      = 2   # RO
+REG_WARNINGS    = 3   # RO
+REG_OPEN_SPEED  = 4   # RW
+REG_CLOSE_SPEED = 5   # RW
+REG_DURATION    = 6   # RW
+REG_OPEN_TORQUE = 7   # RW
+REG_CLOSE_TORQUE= 8   # RW
+REG_SAMPLE_VAL  = 9   # RW
+REGS_PER_DEVICE = 10
+
+# Bitwise Hata/Uyarı Tanımları
+ERR_CODES = {
+    0: "Acil Durum Hatası",
+    1: "Yüksek Gerilim",
+    2: "Düşük Gerilim",
+    3: "Aşırı Akım",
+    4: "Sensör Hatası",
+    5: "Motor Sıkışması",
+    6: "Haberleşme Hatası",
+    7: "EEPROM Hatası"
+}
+
+WARN_CODES = {
+    0: "Yüksek Sıcaklık",
+    1: "Bakım Gerekli",
+    2: "Fan Arızası",
+    3: "Giriş Voltajı Dengesiz",
+    4: "Uyarı 5",
+    5: "Uyarı 6"
+}
+
+MAX_READ_REGS = 125   # FC3 tek istekte en fazla 125 register
+DEFAULT_MAX_GAP = 8   # Bu kadar kullanılmayan register'ı okumak yeni istekten ucuz
+
+# tip -> (register genişliği, struct formatı). 32 bit tipler big-endian kelime sırası (ABCD).
+TYPE_FORMATS = {
+    'int16':    (1, 'h'),
+    'uint16':   (1, 'H'),
+    'bitfield': (1, 'H'),
+    'int32':    (2, 'i'),
+    'uint32':   (2, 'I'),
+    'float32':  (2, 'f'),
+}
+
+
+class Register:
+    """Tek bir alanın tanımı. ``access``: 'r', 'w' veya 'rw'."""
+    __slots__ = ('name', 'address', 'type', 'scale', 'access', 'group', 'bits', 'width', 'fmt')
+
+    def __init__(self, name, address, type='uint16', scale=1, access='r', group=None, bits=None):
+        if type not in TYPE_FORMATS:
+            raise ValueError(f"Bilinmeyen register tipi: {type}")
+        self.name = name
+        self.address = address
+        self.type = type
+        self.scale = scale
+        self.access = access
+        self.group = group
+        self.bits = bits or {}
+        self.width, self.fmt = TYPE_FORMATS[type]
+
+    @property
+    def readable(self): return 'r' in self.access
+
+    @property
+    def writable(self): return 'w' in self.access
+
+    @property
+    def end(self): return self.address + self.width
+
+    def words(self, value):
+        """Ölçekli değeri ham register kelimelerine çevir (``decode``un tersi)."""
+        raw = value / self.scale if self.scale != 1 else value
+        if self.type != 'float32': raw = int(round(raw))
+        return struct.unpack(f'>{self.width}H', struct.pack('>' + self.fmt, raw))
+
+    def __repr__(self):
+        return f"Register({self.name!r}, {self.address}, {self.type!r}, access={self.access!r})"
+
+
+class ReadSpan:
+    """Tek bir FC3 isteğiyle okunacak bitişik aralık ve onun çözücüsü."""
+    __slots__ = ('start', 'count', 'registers', '_struct', '_addrs', '_scales')
+
+    def __init__(self, start, count, registers):
+        self.start = start
+        self.count = count
+        self.registers = tuple(registers)
+
+        fmt, pos = ['>'], start
+        for r in self.registers:
+            if r.address > pos: fmt.append(f"{2 * (r.address - pos)}x")  # okunup atlanan boşluk
+            fmt.append(r.fmt)
+            pos = r.end
+        if start + count > pos: fmt.append(f"{2 * (start + count - pos)}x")
+
+        self._struct = struct.Struct(''.join(fmt))
+        self._addrs = tuple(r.address for r in self.registers)
+        scales = tuple(r.scale for r in self.registers)
+        self._scales = scales if any(s != 1 for s in scales) else None
+
+    def decode(self, payload):
+        """Ham cevap verisini (2*count bayt) {adres: değer} sözlüğüne çevir."""
+        vals = self._struct.unpack(payload)
+        if self._scales:
+            vals = [v * s for v, s in zip(vals, self._scales)]
+        return dict(zip(self._addrs, vals))
+
+    def __repr__(self):
+        return f"ReadSpan({self.start}, {self.count}, {[r.name for r in self.registers]})"
+
+
+class RegisterMap:
+    """Bir cihaz tipinin register düzeni ve önbellekli okuma planları."""
+
+    def __init__(self, name, registers, max_gap=DEFAULT_MAX_GAP):
+        self.name = name
+        self.registers = tuple(sorted(registers, key=lambda r: r.address))
+        self.max_gap = max_gap
+        self.by_name = {r.name: r for r in self.registers}
+        self.by_address = {r.address: r for r in self.registers}
+        self._plans = {}
+
+        for a, b in zip(self.registers, self.registers[1:]):
+            if b.address < a.end:
+                raise ValueError(f"{name}: {a.name} ile {b.name} çakışıyor")
+
+    def group(self, group):
+        return tuple(r for r in self.registers if r.group == group)
+
+    def covering(self, start, count):
+        """[start, start+count) ile kesişen register'lar. Haritada olmayan bir adres varsa ValueError."""
+        regs = [r for r in self.registers if r.end > start and r.address < start + count]
+        covered = sum(min(r.end, start + count) - max(r.address, start) for r in regs)
+        if covered != count:
+            raise ValueError(f"{self.name}: {start}..{start + count - 1} haritada tanımlı değil")
+        return regs
+
+    def encode(self, values, start, count):
+        """``{adres: değer}`` cache'inden [start, start+count) aralığının ham kelimeleri.
+
+        Okunamayan veya haritada olmayan adres -> ValueError; henüz okunmamış
+        register varsa None.
+        """
+        words = []
+        for r in self.covering(start, count):
+            if not r.readable:
+                raise ValueError(f"{self.name}: {r.name} okunamaz")
+            if r.address not in values: return None
+            w = r.words(values[r.address])
+            words.extend(w[max(0, start - r.address):min(r.width, start + count - r.address)])
+        return words
+
+    def plan(self, groups=None, max_gap=None):
+        """Okunabilir register'ları en az sayıda bitişik ``ReadSpan``e böl.
+
+        ``groups`` verilirse yalnızca o gruplardaki register'lar okunur.
+        Sonuç (groups, max_gap) anahtarıyla önbelleğe alınır.
+        """
+        max_gap = self.max_gap if max_gap is None else max_gap
+        key = (tuple(groups) if groups else None, max_gap)
+        spans = self._plans.get(key)
+        if spans is not None: return spans
+
+        regs = [r for r in self.registers
+                if r.readable and (groups is None or r.group in groups)]
+        chunks = []
+        for r in regs:
+            cur = chunks[-1] if chunks else None
+            if (cur and r.address - cur[-1].end <= max_gap
+                    and r.end - cur[0].address <= MAX_READ_REGS):
+                cur.append(r)
+            else:
+                chunks.append([r])
+
+        spans = tuple(ReadSpan(c[0].address, c[-1].end - c[0].address, c) for c in chunks)
+        self._plans[key] = spans
+        return spans
+
+
+# --- CİHAZ TİPLERİ ---
+DOOR_MAP = RegisterMap('door', [
+    Register('command',      REG_COMMAND,      'uint16',   access='w'),
+    Register('status',       REG_STATUS,       'uint16',   group='status'),
+    Register('errors',       REG_ERRORS,       'bitfield', group='status', bits=ERR_CODES),
+    Register('warnings',     REG_WARNINGS,     'bitfield', group='status', bits=WARN_CODES),
+    Register('open_speed',   REG_OPEN_SPEED,   'uint16',   access='rw', group='params'),
+    Register('close_speed',  REG_CLOSE_SPEED,  'uint16',   access='rw', group='params'),
+    Register('duration',     REG_DURATION,     'uint16',   access='rw', group='params'),
+    Register('open_torque',  REG_OPEN_TORQUE,  'uint16',   access='rw', group='params'),
+    Register('close_torque', REG_CLOSE_TORQUE, 'uint16',   access='rw', group='params'),
+    Register('sample_val',   REG_SAMPLE_VAL,   'uint16',   access='rw', group='params'),
+])
+
+DEVICE_TYPES = {'door': DOOR_MAP}
+DEFAULT_DEVICE_TYPE = 'door'
+
+
+def register_map_for(device):
+    """devices.json kaydındaki ``type`` alanına göre haritayı döndür (varsayılan: kapı)."""
+    return DEVICE_TYPES.get(device.get('type', DEFAULT_DEVICE_TYPE), DOOR_MAP)
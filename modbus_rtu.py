@@ -0,0 +1,357 @@
+"""Modbus RTU hat seviyesi: çerçeve zamanlaması, CRC16 ve asyncio transport.
+
+``AsyncRtuClient`` RTU çerçevelerini kendisi kurar; her fonksiyon kodunun
+beklenen cevap uzunluğunu bildiği için tam çerçeve gelir gelmez okumayı
+bitirir, exception cevabını ilk iki baytta tanır ve timeout'u çerçeve
+başına (iptal edilebilir) uygular. Tek event loop birden fazla portu sürebilir.
+"""
+import asyncio
+import struct
+import time
+
+import serial_asyncio
+
+from modbus_metrics import BusCounters
+
+# --- RTU ZAMANLAMA SABİTLERİ ---
+# 1 start + 8 data + 1 parity (veya 2. stop) + 1 stop
+BITS_PER_CHAR = 11
+
+# Modbus over Serial Line V1.02 §2.5.1.1: 19200 baud üstünde
+# karakter süresinden bağımsız sabit aralık önerilir. (t1.5 karakterler arası
+# sınırdır; master çerçeveyi tek yazmada gönderdiği için kullanılmaz.)
+FIXED_BAUD_LIMIT = 19200
+FIXED_T35 = 0.001750
+
+# Broadcast (adres 0) cevapsızdır; slave'ler isteği işlerken hat bu kadar boş
+# tutulur (V1.02 §2.4.1 "turnaround delay", tipik 100..200 ms).
+BROADCAST_ADDRESS = 0
+BROADCAST_TURNAROUND = 0.100
+
+# Adaptif cevap timeout'unun alt sınırı: sabit slave işlem payı + birkaç
+# karakter süresi (yavaş baud'da karakterler arası gecikme payı).
+REPLY_FLOOR_S = 0.020
+REPLY_FLOOR_CHARS = 8
+
+
+class BusTiming:
+    """Baud hızından çerçeveler arası sessizliği (t3.5) türetir.
+
+    Sabit ``time.sleep`` yerine son çerçevenin bitişinden itibaren yalnızca
+    gereken sessizlik kadar beklenir. Unicast'te slave'in işlem süresini
+    cevabın kendisi sınırlar; cevaptan sonra t3.5 yeterlidir, bu yüzden
+    ``turnaround`` varsayılan 0'dır ve yalnız üzerine yazmadır: cevaptan sonra
+    hattı geç bırakan (ör. yavaş RS-485 sürücüsü) slave'ler için cihaz bazında
+    ``turnaround_ms`` (``t35_ms`` de aynı şekilde) verilir. Cevapsız
+    broadcast'te bekleme ``broadcast_turnaround``dır.
+    """
+
+    def __init__(self, baudrate, bits_per_char=BITS_PER_CHAR, turnaround=0.0,
+                 broadcast_turnaround=BROADCAST_TURNAROUND):
+        self.baudrate = int(baudrate)
+        self.char_time = bits_per_char / self.baudrate
+        self.t35 = FIXED_T35 if self.baudrate > FIXED_BAUD_LIMIT else 3.5 * self.char_time
+        self.turnaround = turnaround    # Tüm slave'ler için ek sessizlik (yalnız üzerine yazma)
+        self.broadcast_turnaround = broadcast_turnaround
+        self.overrides = {}             # sid -> {'t35': s, 'turnaround': s}
+        self._last_frame_end = 0.0
+
+    def set_override(self, sid, t35_ms=None, turnaround_ms=None):
+        ovr = {}
+        if t35_ms is not None: ovr['t35'] = float(t35_ms) / 1000
+        if turnaround_ms is not None: ovr['turnaround'] = float(turnaround_ms) / 1000
+        if ovr: self.overrides[sid] = ovr
+        else: self.overrides.pop(sid, None)
+
+    def apply_device_overrides(self, devices):
+        """devices.json kayıtlarındaki isteğe bağlı zamanlama alanlarını uygula."""
+        for d in devices:
+            self.set_override(d['id'], d.get('t35_ms'), d.get('turnaround_ms'))
+
+    def frame_time(self, nbytes):
+        """``nbytes`` uzunluğundaki bir çerçevenin hatta kalma süresi (s)."""
+        return nbytes * self.char_time
+
+    def reply_floor(self):
+        """Cihaz başına öğrenilen cevap timeout'unun alt sınırı (s)."""
+        return REPLY_FLOOR_S + REPLY_FLOOR_CHARS * self.char_time
+
+    def gap(self, sid=None):
+        """``sid`` adresine yeni bir çerçeve göndermeden önce gereken sessizlik."""
+        ovr = self.overrides.get(sid, {})
+        return max(ovr.get('t35', self.t35), ovr.get('turnaround', self.turnaround))
+
+    def mark(self):
+        """Bir işlem (cevap ya da timeout) hatta bittiğinde çağrılır."""
+        self._last_frame_end = time.perf_counter()
+
+    async def wait_async(self, sid=None):
+        """Son çerçeveden bu yana geçen süreyi düşerek kalan boşluk kadar bekle (loop'u bloklamadan)."""
+        remaining = self._last_frame_end + self.gap(sid) - time.perf_counter()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+
+# ============================================================================
+#  ÇERÇEVE / CRC
+# ============================================================================
+FC_READ_HOLDING   = 3
+FC_READ_INPUT     = 4
+FC_WRITE_SINGLE   = 6
+FC_WRITE_MULTIPLE = 16
+FC_READ_WRITE     = 23   # Read/Write Multiple Registers: önce yazma, sonra okuma, tek işlemde
+
+MAX_RW_WRITE_REGS = 121  # FC23 tek çerçevede en fazla 121 register yazar (125 okur)
+
+EXC_ILLEGAL_FUNCTION = 1   # FC desteklenmiyor (ör. FC23'ü olmayan slave)
+EXC_ILLEGAL_ADDRESS  = 2
+EXC_ILLEGAL_VALUE    = 3
+EXC_GATEWAY_TARGET   = 11   # GATEWAY TARGET FAILED TO RESPOND
+
+EXCEPTION_TEXT = {
+    1: "ILLEGAL FUNCTION",
+    2: "ILLEGAL DATA ADDRESS",
+    3: "ILLEGAL DATA VALUE",
+    4: "SLAVE DEVICE FAILURE",
+    5: "ACKNOWLEDGE",
+    6: "SLAVE DEVICE BUSY",
+    8: "MEMORY PARITY ERROR",
+    10: "GATEWAY PATH UNAVAILABLE",
+    11: "GATEWAY TARGET FAILED TO RESPOND",
+}
+
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data):
+    """Modbus CRC16 (poly 0xA001, başlangıç 0xFFFF)."""
+    crc = 0xFFFF
+    for b in data:
+        crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ b) & 0xFF]
+    return crc
+
+
+def frame(slave, pdu):
+    """Adres + PDU + CRC (little-endian) ile tam RTU çerçevesi."""
+    adu = bytes((slave,)) + pdu
+    return adu + struct.pack('<H', crc16(adu))
+
+
+def check_frame(adu):
+    """Son iki bayttaki CRC doğru mu?"""
+    return len(adu) >= 4 and crc16(adu[:-2]) == struct.unpack_from('<H', adu, len(adu) - 2)[0]
+
+
+def read_pdu(start, count, fc=FC_READ_HOLDING):
+    return struct.pack('>BHH', fc, start, count)
+
+
+def write_single_pdu(reg, val):
+    return struct.pack('>BHH', FC_WRITE_SINGLE, reg, val & 0xFFFF)
+
+
+def write_multiple_pdu(start, vals):
+    return struct.pack(f'>BHHB{len(vals)}H', FC_WRITE_MULTIPLE, start, len(vals), 2 * len(vals),
+                       *(v & 0xFFFF for v in vals))
+
+
+def read_write_pdu(read_start, read_count, write_start, vals):
+    return struct.pack(f'>BHHHHB{len(vals)}H', FC_READ_WRITE, read_start, read_count, write_start,
+                       len(vals), 2 * len(vals), *(v & 0xFFFF for v in vals))
+
+
+def response_length(pdu):
+    """İstek PDU'suna göre normal cevabın tam ADU uzunluğu (adres + CRC dahil)."""
+    fc = pdu[0]
+    if fc in (FC_READ_HOLDING, FC_READ_INPUT, FC_READ_WRITE):
+        count = struct.unpack_from('>H', pdu, 3)[0]
+        return 5 + 2 * count
+    if fc in (FC_WRITE_SINGLE, FC_WRITE_MULTIPLE):
+        return 8
+    raise ValueError(f"Desteklenmeyen fonksiyon kodu: {fc}")
+
+EXCEPTION_LENGTH = 5   # adres + (fc | 0x80) + kod + CRC
+
+
+# --- HATALAR ---
+class ModbusError(Exception):
+    """Modbus haberleşme hatalarının tabanı."""
+
+class ModbusTimeout(ModbusError):
+    """Çerçeve süresi içinde tam cevap gelmedi."""
+
+class ModbusCrcError(ModbusError):
+    """Cevap geldi ama CRC / adres / fonksiyon kodu tutmuyor."""
+
+class ModbusExceptionResponse(ModbusError):
+    """Slave exception cevabı döndü (fc | 0x80)."""
+    def __init__(self, slave, fc, code):
+        self.slave, self.fc, self.code = slave, fc, code
+        super().__init__(f"Slave {slave} FC{fc} exception {code}: {EXCEPTION_TEXT.get(code, '?')}")
+
+
+# ============================================================================
+#  ASYNCIO TRANSPORT
+# ============================================================================
+class RtuProtocol(asyncio.Protocol):
+    """Gelen baytları biriktirir; beklenen uzunluk dolunca bekleyen future'ı çözer."""
+
+    def __init__(self):
+        self.transport = None
+        self._buf = bytearray()
+        self._fut = None
+        self._expected = 0
+        self._fc = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        if self._fut and not self._fut.done():
+            self._fut.set_exception(exc or ModbusError("Port kapandı"))
+
+    def expect(self, fc, expected):
+        """Yeni istek için RX tamponunu sıfırla ve cevap future'ı döndür."""
+        self._buf.clear()
+        self._fc = fc
+        self._expected = expected
+        self._fut = asyncio.get_running_loop().create_future()
+        return self._fut
+
+    def cancel_expect(self):
+        if self._fut and not self._fut.done():
+            self._fut.cancel()
+        self._fut = None
+
+    def data_received(self, data):
+        if self._fut is None or self._fut.done():
+            return  # Beklenmeyen / geç gelen bayt: at
+        self._buf += data
+        # Exception cevabı ikinci baytta belli olur -> 5 baytta bitir
+        if len(self._buf) >= 2 and self._buf[1] == (self._fc | 0x80):
+            self._expected = EXCEPTION_LENGTH
+        if len(self._buf) >= self._expected:
+            self._fut.set_result(bytes(self._buf[:self._expected]))
+
+
+class AsyncRtuClient:
+    """Tek seri port üzerinde asyncio Modbus RTU master."""
+
+    def __init__(self, port, baudrate, timing=None, counters=None):
+        self.port = port
+        self.baudrate = int(baudrate)
+        self.timing = timing or BusTiming(baudrate)
+        self.counters = counters or BusCounters()   # Çerçeve/bayt/hata sayaçları
+        self.last_reply = 0.0       # Son cevabın slave gecikmesi (s): toplam süre - çerçeve süreleri
+        self.transport = None
+        self.protocol = None
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self.transport, self.protocol = await serial_asyncio.create_serial_connection(
+            loop, RtuProtocol, self.port, baudrate=self.baudrate)
+
+    def close(self):
+        if self.protocol:
+            self.protocol.cancel_expect()
+        if self.transport:
+            self.transport.close()
+        self.transport = None
+
+    @property
+    def is_open(self):
+        return self.transport is not None and not self.transport.is_closing()
+
+    async def transact(self, slave, pdu, timeout):
+        """İsteği gönder, cevap PDU'sunu döndür.
+
+        ``timeout`` slave'in cevap verme payıdır; istek ve cevabın hatta
+        kalma süresi buna eklenir. Tam çerçeve geldiği anda döner.
+        """
+        if not self.is_open:
+            raise ModbusError(f"{self.port} açık değil")
+        adu = frame(slave, pdu)
+        expected = response_length(pdu)
+        counters = self.counters
+
+        await self.timing.wait_async(slave)
+        fut = self.protocol.expect(pdu[0], expected)
+        t0 = time.perf_counter()
+        try:
+            self.transport.write(adu)
+            counters.add(slave, 'tx_frames')
+            counters.add(slave, 'tx_bytes', len(adu))
+            limit = timeout + self.timing.frame_time(len(adu) + expected)
+            try:
+                resp = await asyncio.wait_for(fut, limit)
+                elapsed = time.perf_counter() - t0
+                self.last_reply = max(0.0, elapsed - self.timing.frame_time(len(adu) + len(resp)))
+            except asyncio.TimeoutError:
+                counters.add(slave, 'timeouts')
+                raise ModbusTimeout(f"Slave {slave} FC{pdu[0]}: {limit * 1000:.0f} ms içinde cevap yok") from None
+        finally:
+            self.protocol.cancel_expect()
+            self.timing.mark()
+            counters.add(slave, 'busy_s', time.perf_counter() - t0)
+
+        counters.add(slave, 'rx_frames')
+        counters.add(slave, 'rx_bytes', len(resp))
+        if not check_frame(resp):
+            counters.add(slave, 'crc_errors')
+            raise ModbusCrcError(f"Slave {slave} FC{pdu[0]}: CRC hatası")
+        if resp[0] != slave:
+            counters.add(slave, 'crc_errors')
+            raise ModbusCrcError(f"Slave {slave} FC{pdu[0]}: cevap adresi {resp[0]}")
+        if resp[1] == (pdu[0] | 0x80):
+            counters.exception(slave, resp[2])
+            raise ModbusExceptionResponse(slave, pdu[0], resp[2])
+        if resp[1] != pdu[0]:
+            counters.add(slave, 'crc_errors')
+            raise ModbusCrcError(f"Slave {slave} FC{pdu[0]}: cevap FC{resp[1]}")
+        return resp[1:-2]
+
+    async def broadcast(self, pdu):
+        """İsteği adres 0'a gönder; cevap beklenmez.
+
+        Çerçeve hatta kaldığı süre + ``broadcast_turnaround`` boyunca hat
+        boş tutulur ki slave'ler isteği işleyip sıradaki çerçeveye hazır olsun.
+        """
+        if not self.is_open:
+            raise ModbusError(f"{self.port} açık değil")
+        adu = frame(BROADCAST_ADDRESS, pdu)
+        await self.timing.wait_async()
+        t0 = time.perf_counter()
+        try:
+            self.transport.write(adu)
+            self.counters.add(None, 'tx_frames')
+            self.counters.add(None, 'tx_bytes', len(adu))
+            await asyncio.sleep(self.timing.frame_time(len(adu)) + self.timing.broadcast_turnaround)
+        finally:
+            self.timing.mark()
+            self.counters.add(None, 'busy_s', time.perf_counter() - t0)
+
+    async def read_registers(self, slave, start, count, fc=FC_READ_HOLDING, timeout=0.5):
+        """Ham register verisi (2*count bayt, big-endian) döndürür."""
+        pdu = await self.transact(slave, read_pdu(start, count, fc), timeout)
+        return pdu[2:]
+
+    async def write_register(self, slave, reg, val, timeout=0.5):
+        await self.transact(slave, write_single_pdu(reg, val), timeout)
+
+    async def write_registers(self, slave, start, vals, timeout=0.5):
+        await self.transact(slave, write_multiple_pdu(start, vals), timeout)
+
+    async def read_write_registers(self, slave, read_start, read_count, write_start, vals, timeout=0.5):
+        """FC23: ``vals``'ı yaz, ardından okunan ham veriyi (2*read_count bayt) döndür."""
+        pdu = await self.transact(slave, read_write_pdu(read_start, read_count, write_start, vals), timeout)
+        return pdu[2:]
@@ -0,0 +1,187 @@
+"""Hat tarama: slave ID ve baud keşfi.
+
+Her baud için 1..247 adreslerine tek register'lık ``REG_STATUS`` okuması
+gönderilir. Timeout baud'dan türetilir: slave işlem payı + birkaç karakter
+süresi (0.5 s'lik poll timeout'u yerine ~10-20 ms). Tam hat 115200 baud'da
+birkaç saniyede, 9600 baud'da ~10 s'de taranır. Exception cevabı veren
+slave de bulunmuş sayılır (adres canlı, yalnız register farklı).
+
+Tarama portu yalnız kullanır; panel bağlıyken çalışmaz.
+
+    python modbus_scan.py --port /dev/ttyUSB0 --baud 9600,19200,115200 --add devices.json
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from modbus_engine import group_by_port
+from modbus_regmap import REG_STATUS
+from modbus_registry import DeviceRegistry
+from modbus_rtu import (
+    BITS_PER_CHAR, AsyncRtuClient, BusTiming, ModbusCrcError, ModbusExceptionResponse, ModbusTimeout,
+)
+
+SCAN_IDS = range(1, 248)
+SCAN_REPLY_S = 0.010      # Slave işlem payı (s)
+SCAN_REPLY_CHARS = 4      # + bu kadar karakter süresi (yavaş baud'da gecikmeli cevap payı)
+
+
+def scan_timeout(baud):
+    """Probe başına slave cevap payı (s); çerçeve süreleri transport'ta eklenir."""
+    return SCAN_REPLY_S + SCAN_REPLY_CHARS * BITS_PER_CHAR / int(baud)
+
+
+async def scan(port, bauds, ids=SCAN_IDS, on_found=None, on_progress=None, stop=None):
+    """``bauds`` x ``ids`` tara; bulunanlar [{'id', 'baud', 'ms', 'status', 'exception'}, ...].
+
+    ``on_found(result)`` her cevapta, ``on_progress(baud, sid, noise)`` her
+    probe'dan sonra çağrılır (``noise``: o baud'daki bozuk cevaplar — yanlış
+    baud'da cevap veren bir slave'in işareti). ``stop`` (threading.Event) set
+    olunca tarama biter.
+    """
+    found = []
+    for baud in bauds:
+        client = AsyncRtuClient(port, baud, BusTiming(baud))
+        await client.open()
+        timeout = scan_timeout(baud)
+        noise = 0
+        try:
+            for sid in ids:
+                if stop is not None and stop.is_set(): return found
+                result = None
+                t0 = time.perf_counter()
+                try:
+                    payload = await client.read_registers(sid, REG_STATUS, 1, timeout=timeout)
+                    result = {'status': int.from_bytes(payload[:2], 'big'), 'exception': None}
+                except ModbusExceptionResponse as e:
+                    result = {'status': None, 'exception': e.code}
+                except ModbusCrcError:
+                    noise += 1
+                except ModbusTimeout:
+                    pass
+                if result is not None:
+                    result.update(id=sid, baud=int(baud), ms=(time.perf_counter() - t0) * 1000)
+                    found.append(result)
+                    if on_found: on_found(result)
+                if on_progress: on_progress(int(baud), sid, noise)
+        finally:
+            client.close()
+            await asyncio.sleep(0)      # transport'un kapanmasına izin ver
+    return found
+
+
+class BusScanner:
+    """``scan``'ı arka plan thread'inde çalıştırır (panel için); ``stop()`` iptal eder."""
+
+    def __init__(self, port, bauds, ids=SCAN_IDS, on_found=None, on_progress=None, on_done=None):
+        self.port = port
+        self.bauds = [int(b) for b in bauds]
+        self.ids = ids
+        self.on_found = on_found
+        self.on_progress = on_progress
+        self.on_done = on_done          # on_done(found, error)
+        self.found = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="modbus-scan", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        error = None
+        try:
+            self.found = asyncio.run(scan(self.port, self.bauds, self.ids, self.on_found,
+                                          self.on_progress, self._stop))
+        except Exception as e:
+            error = e
+        if self.on_done: self.on_done(self.found, error)
+
+
+def found_devices(found, known, port, default_baud=None):
+    """Bulunan düğümlerden ``known``'da (ID kümesi veya ``DeviceRegistry``) olmayanlar: (kayıtlar, atlananlar).
+
+    Bir segment tek baud'da çalışır. Portun baud'u kayıttaki cihazlardan
+    (``group_by_port`` kuralı) gelir; bilinmiyorsa en çok düğümün bulunduğu
+    baud seçilir. Başka baud'da cevap veren düğümler eklenmez, atlananlar
+    listesinde döner — porta ikinci bir baud yazmak bir sonraki bağlantıda tüm
+    segmentin hızını değiştirirdi. Baud ``default_baud``'dan farklıysa kayda
+    ``port`` ile birlikte yazılır.
+    """
+    new, seen = [], set()
+    for r in found:
+        if r['id'] in known or r['id'] in seen: continue
+        new.append(r)
+        seen.add(r['id'])
+    baud = None
+    if isinstance(known, DeviceRegistry):
+        baud = group_by_port(known, port, default_baud).get(port, (None,))[0]
+    if baud is None and new:
+        bauds = [r['baud'] for r in new]
+        baud = max(bauds, key=bauds.count)
+
+    devices, skipped = [], []
+    for r in new:
+        if r['baud'] != baud:
+            skipped.append(r)
+            continue
+        device = {'id': r['id'], 'name': f"NODE_{r['id']:03d}"}
+        if baud != default_baud:
+            device['port'] = port
+            device['baud'] = baud
+        devices.append(device)
+    return devices, skipped
+
+
+def _ids(text):
+    """'1-10,20' -> [1, ..., 10, 20]."""
+    ids = []
+    for part in text.split(','):
+        a, _, b = part.partition('-')
+        ids.extend(range(int(a), int(b or a) + 1))
+    return ids
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Modbus RTU hat tarama (slave ID + baud)")
+    ap.add_argument("--port", required=True)
+    ap.add_argument("--baud", default="9600,19200,38400,57600,115200")
+    ap.add_argument("--ids", default="1-247")
+    ap.add_argument("--add", metavar="DEVICES_JSON", help="Bulunanları bu dosyaya ekle")
+    args = ap.parse_args()
+
+    bauds = [int(b) for b in args.baud.split(',')]
+    t0 = time.monotonic()
+
+    def on_found(r):
+        extra = f" exception {r['exception']}" if r['exception'] else f" status={r['status']}"
+        print(f"  ID {r['id']:3d} @ {r['baud']:6d} baud  {r['ms']:5.1f} ms{extra}")
+
+    found = asyncio.run(scan(args.port, bauds, _ids(args.ids), on_found))
+    print(f"{len(found)} düğüm, {time.monotonic() - t0:.1f} s")
+
+    if args.add and found:
+        registry = DeviceRegistry.load(args.add)
+        added, skipped = found_devices(found, registry, args.port)
+        for device in added:
+            registry.add(device)
+        registry.save()
+        print(f"{args.add}: {len(added)} cihaz eklendi")
+        for r in skipped:
+            print(f"  ID {r['id']:3d} @ {r['baud']} baud eklenmedi: {args.port} başka baud'da çalışıyor")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Pseudo-terminal üzerinde çok slave'li Modbus RTU simülatörü (yalnız Linux/macOS).
+
+Bir pty çifti açar; panel (veya ``BusEngine``) pty'nin slave ucuna herhangi
+bir seri port gibi bağlanır. Her simüle slave cihaz tipinin register
+haritasını (``modbus_regmap``) uygular; kapı OPEN/CLOSE komutundan
+``travel_s`` sonra hedef duruma geçer. Cevap gecikmesi, jitter, CRC bozma,
+çerçeve düşürme ve ölü düğüm slave başına ayarlanır; cevaplar baud hızına
+göre hatta kalma süresi kadar geciktirilir. Adres 0 (broadcast) yazmalarını
+canlı her slave uygular, cevap verilmez. FC23 (oku/yaz) slave başına
+kapatılabilir (``fc23: false``); ``clamp`` verilirse parametre yazmaları bu
+değere kırpılır (doğrulamalı yazmada uyuşmazlık denemesi için).
+
+    python modbus_sim.py --slaves 1-100 --baud 115200 --delay 2 --jitter 1
+    python modbus_sim.py --config sim.json
+
+``--config`` dosyası: {"baud": 115200, "slaves": [{"id": 1, "delay_ms": 3,
+"crc_error_rate": 0.01, "dead": false}, ...]}.
+"""
+import argparse
+import json
+import os
+import random
+import select
+import struct
+import threading
+import time
+import tty
+
+from modbus_regmap import REG_COMMAND, REG_STATUS, REG_ERRORS, REG_WARNINGS, DOOR_MAP
+from modbus_rtu import (
+    BITS_PER_CHAR, BROADCAST_ADDRESS, EXC_ILLEGAL_ADDRESS, EXC_ILLEGAL_FUNCTION, EXC_ILLEGAL_VALUE,
+    FC_READ_HOLDING, FC_READ_INPUT, FC_WRITE_SINGLE, FC_WRITE_MULTIPLE, FC_READ_WRITE, check_frame, frame,
+)
+
+CMD_OPEN, CMD_CLOSE = 1, 2        # REG_COMMAND değerleri -> REG_STATUS hedefi (1: AÇIK, 2: KAPALI)
+TRAVEL_S = 2.0                    # Kapının hedef duruma varma süresi
+RESYNC_S = 0.02                   # Bu kadar sessizlikten sonra yarım çerçeve atılır
+
+
+class SimSlave:
+    """Tek simüle cihaz: register'lar, kapı hareketi ve hata enjeksiyonu."""
+
+    def __init__(self, sid, rmap=DOOR_MAP, delay_ms=2.0, jitter_ms=0.0, crc_error_rate=0.0,
+                 drop_rate=0.0, dead=False, travel_s=TRAVEL_S, errors=0, warnings=0, fc23=True, clamp=None):
+        self.sid = sid
+        self.rmap = rmap
+        self.delay_ms = delay_ms
+        self.jitter_ms = jitter_ms
+        self.crc_error_rate = crc_error_rate
+        self.drop_rate = drop_rate
+        self.dead = dead
+        self.travel_s = travel_s
+        self.fc23 = fc23
+        self.clamp = clamp
+
+        size = max(r.end for r in rmap.registers)
+        self.regs = [0] * size
+        self.regs[REG_STATUS] = CMD_CLOSE
+        self.regs[REG_ERRORS] = errors
+        self.regs[REG_WARNINGS] = warnings
+        self._target = None               # (hedef durum, varış zamanı)
+        self.stats = {'requests': 0, 'replies': 0, 'dropped': 0, 'corrupted': 0, 'exceptions': 0}
+
+    @classmethod
+    def from_config(cls, cfg):
+        keys = ('delay_ms', 'jitter_ms', 'crc_error_rate', 'drop_rate', 'dead', 'travel_s', 'errors', 'warnings',
+                'fc23', 'clamp')
+        return cls(cfg['id'], **{k: cfg[k] for k in keys if k in cfg})
+
+    # --- Register erişimi ---
+    def _tick(self):
+        if self._target and time.monotonic() >= self._target[1]:
+            self.regs[REG_STATUS] = self._target[0]
+            self._target = None
+
+    def _readable(self, start, count):
+        regs = [self.rmap.by_address.get(a) for a in range(start, start + count)]
+        return start + count <= len(self.regs) and not any(r and not r.readable for r in regs)
+
+    def _writable(self, start, count):
+        regs = [self.rmap.by_address.get(a) for a in range(start, start + count)]
+        return all(r is not None and r.writable for r in regs)
+
+    def _write(self, reg, val):
+        if reg == REG_COMMAND:
+            if val in (CMD_OPEN, CMD_CLOSE):
+                self.regs[REG_STATUS] = 0     # Hareket halinde
+                self._target = (val, time.monotonic() + self.travel_s)
+            return
+        self.regs[reg] = val if self.clamp is None else min(val, self.clamp)
+
+    def handle(self, pdu):
+        """İstek PDU'suna cevap PDU'su (exception dahil) döndür."""
+        self._tick()
+        fc = pdu[0]
+        try:
+            if fc in (FC_READ_HOLDING, FC_READ_INPUT):
+                start, count = struct.unpack_from('>HH', pdu, 1)
+                if not 1 <= count <= 125: return self._exception(fc, EXC_ILLEGAL_VALUE)
+                if not self._readable(start, count): return self._exception(fc, EXC_ILLEGAL_ADDRESS)
+                vals = self.regs[start:start + count]
+                return struct.pack(f'>BB{count}H', fc, 2 * count, *vals)
+            if fc == FC_WRITE_SINGLE:
+                reg, val = struct.unpack_from('>HH', pdu, 1)
+                if not self._writable(reg, 1): return self._exception(fc, EXC_ILLEGAL_ADDRESS)
+                self._write(reg, val)
+                return pdu[:5]
+            if fc == FC_WRITE_MULTIPLE:
+                start, count, nbytes = struct.unpack_from('>HHB', pdu, 1)
+                if not 1 <= count <= 123 or nbytes != 2 * count: return self._exception(fc, EXC_ILLEGAL_VALUE)
+                if not self._writable(start, count): return self._exception(fc, EXC_ILLEGAL_ADDRESS)
+                for i, val in enumerate(struct.unpack_from(f'>{count}H', pdu, 6)):
+                    self._write(start + i, val)
+                return pdu[:5]
+            if fc == FC_READ_WRITE and self.fc23:
+                # Önce yazma, sonra okuma (okunan veri yazılanı yansıtır)
+                r_start, r_count, w_start, w_count, nbytes = struct.unpack_from('>HHHHB', pdu, 1)
+                if not (1 <= r_count <= 125 and 1 <= w_count <= 121 and nbytes == 2 * w_count):
+                    return self._exception(fc, EXC_ILLEGAL_VALUE)
+                if not (self._writable(w_start, w_count) and self._readable(r_start, r_count)):
+                    return self._exception(fc, EXC_ILLEGAL_ADDRESS)
+                for i, val in enumerate(struct.unpack_from(f'>{w_count}H', pdu, 10)):
+                    self._write(w_start + i, val)
+                vals = self.regs[r_start:r_start + r_count]
+                return struct.pack(f'>BB{r_count}H', fc, 2 * r_count, *vals)
+        except struct.error:
+            return self._exception(fc, EXC_ILLEGAL_VALUE)
+        return self._exception(fc, EXC_ILLEGAL_FUNCTION)
+
+    def _exception(self, fc, code):
+        self.stats['exceptions'] += 1
+        return bytes((fc | 0x80, code))
+
+
+def request_length(buf):
+    """Tampondaki isteğin tam ADU uzunluğu; henüz belli değilse None."""
+    if len(buf) < 2: return None
+    fc = buf[1]
+    if fc in (FC_READ_HOLDING, FC_READ_INPUT, FC_WRITE_SINGLE):
+        return 8
+    if fc == FC_WRITE_MULTIPLE:
+        return 9 + buf[6] if len(buf) >= 7 else None
+    if fc == FC_READ_WRITE:
+        return 13 + buf[10] if len(buf) >= 11 else None
+    return len(buf)   # Bilinmeyen FC: eldeki her şey (sessizlikte tamamlanır)
+
+
+class BusSimulator:
+    """pty üzerinde tek RS-485 hattı: birden çok ``SimSlave`` aynı hatta."""
+
+    def __init__(self, slaves, baudrate=9600):
+        self.slaves = {s.sid: s for s in slaves}
+        self.baudrate = int(baudrate)
+        self.char_time = BITS_PER_CHAR / self.baudrate
+        self.port = None
+        self.stats = {'rx_frames': 0, 'tx_frames': 0, 'rx_bytes': 0, 'tx_bytes': 0, 'bad_frames': 0,
+                      'broadcasts': 0}
+        self._master = self._slave_fd = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """pty çiftini aç ve hattı dinlemeye başla; bağlanılacak port yolunu döndür."""
+        self._master, self._slave_fd = os.openpty()
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="modbus-sim", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+        for fd in (self._master, self._slave_fd):
+            if fd is not None: os.close(fd)
+        self._master = self._slave_fd = None
+
+    def _run(self):
+        buf = bytearray()
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], RESYNC_S)
+            if not ready:
+                if buf: self.stats['bad_frames'] += 1
+                buf.clear()   # Sessizlik: yarım kalan çerçeveyi at
+                continue
+            try:
+                buf += os.read(self._master, 4096)
+            except OSError:
+                break
+            while True:
+                n = request_length(buf)
+                if n is None or len(buf) < n: break
+                adu, buf = bytes(buf[:n]), buf[n:]
+                self._serve(adu)
+
+    def _serve(self, adu):
+        self.stats['rx_frames'] += 1
+        self.stats['rx_bytes'] += len(adu)
+        if not check_frame(adu):
+            self.stats['bad_frames'] += 1
+            return
+        if adu[0] == BROADCAST_ADDRESS:
+            # Broadcast: canlı her slave yazmayı uygular, kimse cevap vermez
+            self.stats['broadcasts'] += 1
+            for slave in self.slaves.values():
+                if not slave.dead: slave.handle(adu[1:-2])
+            return
+        slave = self.slaves.get(adu[0])
+        if slave is None: return
+        slave.stats['requests'] += 1
+        if slave.dead: return
+        resp_pdu = slave.handle(adu[1:-2])
+        if random.random() < slave.drop_rate:
+            slave.stats['dropped'] += 1
+            return
+
+        resp = bytearray(frame(slave.sid, resp_pdu))
+        if random.random() < slave.crc_error_rate:
+            resp[-1] ^= 0xFF
+            slave.stats['corrupted'] += 1
+
+        # Slave işlem süresi + cevabın hatta kalma süresi (istek zaten gelmiş durumda)
+        delay = slave.delay_ms + random.uniform(-slave.jitter_ms, slave.jitter_ms)
+        time.sleep(max(0.0, delay / 1000) + len(resp) * self.char_time)
+        os.write(self._master, bytes(resp))
+        slave.stats['replies'] += 1
+        self.stats['tx_frames'] += 1
+        self.stats['tx_bytes'] += len(resp)
+
+
+def parse_ids(text):
+    """'1-10,15,20-22' -> [1..10, 15, 20, 21, 22]."""
+    ids = []
+    for part in text.split(','):
+        if '-' in part:
+            a, b = part.split('-')
+            ids.extend(range(int(a), int(b) + 1))
+        elif part.strip():
+            ids.append(int(part))
+    return ids
+
+
+def build_simulator(args):
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        slaves = [SimSlave.from_config(c) for c in cfg['slaves']]
+        return BusSimulator(slaves, cfg.get('baud', args.baud))
+
+    dead = set(parse_ids(args.dead)) if args.dead else set()
+    slaves = [SimSlave(sid, delay_ms=args.delay, jitter_ms=args.jitter, crc_error_rate=args.crc,
+                       drop_rate=args.drop, dead=sid in dead)
+              for sid in parse_ids(args.slaves)]
+    return BusSimulator(slaves, args.baud)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="pty üzerinde Modbus RTU slave simülatörü")
+    ap.add_argument("--slaves", default="1-10", help="Slave ID'leri, ör. 1-100 veya 1,2,5-9")
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--delay", type=float, default=2.0, help="Cevap gecikmesi (ms)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="± gecikme (ms)")
+    ap.add_argument("--crc", type=float, default=0.0, help="CRC bozma oranı (0..1)")
+    ap.add_argument("--drop", type=float, default=0.0, help="Cevap düşürme oranı (0..1)")
+    ap.add_argument("--dead", default="", help="Hiç cevap vermeyen ID'ler")
+    ap.add_argument("--config", help="Slave başına ayar içeren JSON dosyası")
+    ap.add_argument("--devices", help="Bu porta bağlı devices.json yaz (ör. devices.json)")
+    args = ap.parse_args()
+
+    sim = build_simulator(args)
+    port = sim.start()
+    print(f"Simülatör: {len(sim.slaves)} slave @ {sim.baudrate} baud -> {port}")
+    if args.devices:
+        devices = [{'id': sid, 'name': f"SIM_{sid:03d}", 'port': port, 'baud': sim.baudrate}
+                   for sid in sorted(sim.slaves)]
+        with open(args.devices, "w", encoding="utf-8") as f:
+            json.dump(devices, f, indent=4, ensure_ascii=False)
+        print(f"{args.devices} yazıldı ({len(devices)} cihaz)")
+
+    try:
+        while True:
+            time.sleep(5)
+            s = sim.stats
+            print(f"rx:{s['rx_frames']} tx:{s['tx_frames']} bad:{s['bad_frames']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
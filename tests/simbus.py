@@ -0,0 +1,62 @@
+"""Simülatör destekli testler için ortak yardımcılar."""
+import contextlib
+import time
+
+from modbus_engine import ModbusEngine
+from modbus_rtu import FC_WRITE_MULTIPLE, FC_WRITE_SINGLE
+from modbus_sim import BusSimulator, SimSlave
+
+BAUD = 115200
+
+
+def wait_for(cond, timeout=3.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond(): return True
+        time.sleep(0.01)
+    return False
+
+
+class RecordingSlave(SimSlave):
+    """Gelen istek PDU'larını (broadcast dahil) sırasıyla kaydeder."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.pdus = []
+
+    def handle(self, pdu):
+        self.pdus.append(bytes(pdu))
+        return super().handle(pdu)
+
+    @property
+    def writes(self):
+        return [p for p in self.pdus if p[0] in (FC_WRITE_SINGLE, FC_WRITE_MULTIPLE)]
+
+
+@contextlib.contextmanager
+def running(slaves, devices=None, **engine_kw):
+    """Simülatör + motor; ``devices`` verilmezse her slave için ``{'id': sid}``."""
+    sim = BusSimulator(slaves, BAUD)
+    engine = ModbusEngine(devices or [{'id': s.sid} for s in slaves], **engine_kw)
+    engine.start(sim.start(), BAUD)
+    try:
+        yield engine, sim
+    finally:
+        engine.stop()
+        sim.stop()
+
+
+@contextlib.contextmanager
+def bus_held(engine, sid):
+    """Cihazın port kilidini tut: bu sürede kuyruğa girenler birlikte işlenir."""
+    bus = engine.bus_for(sid)
+    bus.bus_loop.run(bus.lock.acquire(), timeout=2)
+    try:
+        yield bus
+    finally:
+        bus.bus_loop.call(bus.lock.release)
+
+
+def polled(engine, sid, group='status'):
+    snap = engine.snapshot(sid)
+    return snap is not None and group in snap['group_ts']
@@ -0,0 +1,44 @@
+import struct
+
+from modbus_regmap import REG_CLOSE_SPEED, REG_COMMAND, REG_OPEN_SPEED
+from modbus_rtu import FC_WRITE_MULTIPLE, FC_WRITE_SINGLE
+from simbus import RecordingSlave, bus_held, polled, running, wait_for
+
+
+def test_latest_write_wins_and_repeats_are_deduped():
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave]) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+        with bus_held(engine, 1) as bus:
+            engine.submit(1, REG_OPEN_SPEED, 10)
+            engine.submit(1, REG_OPEN_SPEED, 20)     # 10'un yerini alır
+            engine.submit(1, REG_OPEN_SPEED, 20)     # aynı değer: tek yazma
+            engine.submit(1, REG_CLOSE_SPEED, 7)
+        assert wait_for(lambda: slave.regs[REG_CLOSE_SPEED] == 7)
+        assert bus.metrics['coalesced'] == 1
+        assert bus.metrics['deduped'] == 1
+        assert slave.writes == [struct.pack('>BHHB2H', FC_WRITE_MULTIPLE, REG_OPEN_SPEED, 2, 4, 20, 7)]
+
+
+def test_latest_door_command_wins():
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave]) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+        with bus_held(engine, 1) as bus:
+            engine.submit(1, REG_COMMAND, 1)
+            engine.submit(1, REG_COMMAND, 2)         # Son tıklama kazanır
+        assert wait_for(lambda: slave.writes)
+        assert slave.writes == [struct.pack('>BHH', FC_WRITE_SINGLE, REG_COMMAND, 2)]
+        assert bus.metrics['coalesced'] == 1
+
+
+def test_group_write_supersedes_pending_single_write():
+    slaves = [RecordingSlave(1, delay_ms=1), RecordingSlave(2, delay_ms=1)]
+    with running(slaves) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1) and polled(engine, 2))
+        with bus_held(engine, 1) as bus:
+            engine.submit(1, REG_OPEN_SPEED, 5)
+            engine.submit_group([1, 2], REG_OPEN_SPEED, 9)
+        assert wait_for(lambda: slaves[0].regs[REG_OPEN_SPEED] == 9 and slaves[1].regs[REG_OPEN_SPEED] == 9)
+        assert bus.metrics['coalesced'] == 1
+        assert all(struct.unpack_from('>H', p, 3)[0] != 5 for p in slaves[0].writes)
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from modbus_engine import ModbusEngine
+from modbus_regmap import REG_OPEN_SPEED, REG_CLOSE_SPEED
+from modbus_sim import BusSimulator, SimSlave
+from simbus import BAUD, wait_for
+
+
+@pytest.fixture
+def bus():
+    slaves = [SimSlave(1, delay_ms=1), SimSlave(2, delay_ms=1)]
+    sim = BusSimulator(slaves, BAUD)
+    port = sim.start()
+    engine = ModbusEngine([{'id': 1}, {'id': 2}])
+    engine.start(port, BAUD)
+    yield engine, {s.sid: s for s in slaves}
+    engine.stop()
+    sim.stop()
+
+
+def polled(engine, sid):
+    snap = engine.snapshot(sid)
+    return snap is not None and snap['version'] > 0 and 'status' in snap['group_ts']
+
+
+def test_devices_are_polled(bus):
+    engine, _ = bus
+    assert wait_for(lambda: polled(engine, 1) and polled(engine, 2))
+
+
+def test_remove_then_re_add_keeps_device_polled(bus):
+    engine, slaves = bus
+    assert wait_for(lambda: polled(engine, 1))
+    engine.remove_device(1)
+    engine.add_device({'id': 1})     # Silme bus thread'inde işlenmeden önce
+    assert wait_for(lambda: polled(engine, 1))
+    before = slaves[1].stats['requests']
+    assert wait_for(lambda: slaves[1].stats['requests'] > before + 3)
+    assert engine.snapshot(1) is not None
+
+
+def test_removed_device_is_dropped(bus):
+    engine, slaves = bus
+    assert wait_for(lambda: polled(engine, 2))
+    engine.remove_device(2)
+    assert wait_for(lambda: engine.snapshot(2) is None)
+    time.sleep(0.1)
+    before = slaves[2].stats['requests']
+    time.sleep(0.3)
+    assert slaves[2].stats['requests'] == before
+
+
+def test_submit_many_writes_and_updates_cache(bus):
+    engine, slaves = bus
+    assert wait_for(lambda: polled(engine, 1))
+    assert engine.submit_many(1, {REG_OPEN_SPEED: 30, REG_CLOSE_SPEED: 40})
+    assert wait_for(lambda: slaves[1].regs[REG_CLOSE_SPEED] == 40)
+    assert slaves[1].regs[REG_OPEN_SPEED] == 30
+    assert wait_for(lambda: engine.snapshot(1)['cache'].get(REG_CLOSE_SPEED) == 40)
+    assert not engine.submit_many(99, {REG_OPEN_SPEED: 1})
+
+
+def test_remove_during_in_flight_read_keeps_bus_polling():
+    slaves = {1: SimSlave(1, delay_ms=1), 2: SimSlave(2, dead=True)}
+    sim = BusSimulator(slaves.values(), BAUD)
+    engine = ModbusEngine([{'id': 1}, {'id': 2}])
+    engine.start(sim.start(), BAUD)
+    try:
+        # Ölü slave'in ilk okuması timeout beklerken cihazı çıkar
+        assert wait_for(lambda: slaves[2].stats['requests'] >= 1)
+        engine.remove_device(2)
+        assert wait_for(lambda: engine.snapshot(2) is None)
+        time.sleep(0.6)     # Bekleyen okuma timeout'la dönsün
+        bus = next(iter(engine.buses.values()))
+        assert not bus.task.done()
+        before = slaves[1].stats['requests']
+        assert wait_for(lambda: slaves[1].stats['requests'] > before + 3)
+    finally:
+        engine.stop()
+        sim.stop()
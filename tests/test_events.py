@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+from modbus_events import (ERROR_CLEARED, ERROR_SET, OFFLINE, ONLINE, PARAM, STATUS, WARNING_SET, EventBus,
+                           ChangeEvent, diff_values)
+from modbus_regmap import DOOR_MAP, REG_ERRORS, REG_OPEN_SPEED, REG_STATUS, REG_WARNINGS
+from simbus import RecordingSlave, polled, running, wait_for
+
+
+def test_diff_values_reports_only_changes():
+    events = diff_values(1, DOOR_MAP, {REG_STATUS: 2, REG_OPEN_SPEED: 10}, {REG_STATUS: 2, REG_OPEN_SPEED: 12}, 0)
+    assert [(e.kind, e.name, e.old, e.new) for e in events] == [(PARAM, 'open_speed', 10, 12)]
+
+
+def test_diff_values_splits_bitfields_into_set_and_cleared():
+    events = diff_values(1, DOOR_MAP, {REG_ERRORS: 0b0011}, {REG_ERRORS: 0b0110}, 0)
+    assert [(e.kind, e.bits) for e in events] == [(ERROR_SET, (2,)), (ERROR_CLEARED, (0,))]
+
+
+def test_first_read_compares_against_nothing():
+    events = diff_values(1, DOOR_MAP, {}, {REG_STATUS: 2, REG_WARNINGS: 0b1}, 0)
+    assert [(e.kind, e.old) for e in events] == [(STATUS, None), (WARNING_SET, None)]
+
+
+def test_filters_by_kind_sid_and_predicate():
+    bus, got = EventBus(), []
+    bus.subscribe(got.append, kinds=[STATUS], sids=[1], predicate=lambda e: e.new == 1)
+    bus.publish([ChangeEvent(1, STATUS, 0, new=1), ChangeEvent(2, STATUS, 0, new=1),
+                 ChangeEvent(1, PARAM, 0, new=1), ChangeEvent(1, STATUS, 0, new=2)])
+    assert [(e.sid, e.kind, e.new) for e in got] == [(1, STATUS, 1)]
+
+
+def test_failing_subscriber_does_not_block_others():
+    bus, got = EventBus(), []
+    bus.subscribe(lambda e: 1 / 0)
+    bus.subscribe(got.append)
+    bus.publish([ChangeEvent(1, STATUS, 0)])
+    assert len(got) == 1
+
+
+def test_engine_publishes_polled_changes_only():
+    slaves = [RecordingSlave(1, delay_ms=1), RecordingSlave(2, delay_ms=1)]
+    with running(slaves) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1) and polled(engine, 2))
+        got, lock = [], threading.Lock()
+        def on_event(ev):
+            with lock: got.append(ev)
+        engine.events.subscribe(on_event, kinds=[ERROR_SET, OFFLINE, ONLINE], sids=[1])
+        time.sleep(0.3)
+        assert got == []                    # Değişim yoksa olay yok
+        slaves[0].regs[REG_ERRORS] = 0b101
+        slaves[1].regs[REG_ERRORS] = 0b1     # Süzgeç dışı cihaz
+        assert wait_for(lambda: got)
+        assert [(e.sid, e.kind, e.bits) for e in got] == [(1, ERROR_SET, (0, 2))]
+        slaves[0].dead = True
+        assert wait_for(lambda: any(e.kind == OFFLINE for e in got))
+        slaves[0].dead = False
+        assert wait_for(lambda: any(e.kind == ONLINE for e in got), timeout=5)
+
+
+def test_queue_subscription_delivers_to_own_loop():
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave]) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+
+        async def consume():
+            sub = engine.events.subscribe_queue(kinds=[STATUS])
+            slave.regs[REG_STATUS] = 1
+            ev = await asyncio.wait_for(sub.queue.get(), 2)
+            sub.cancel()
+            return ev
+
+        ev = asyncio.run(consume())
+        assert (ev.sid, ev.kind, ev.old, ev.new) == (1, STATUS, 2, 1)
@@ -0,0 +1,76 @@
+import socket
+import struct
+import time
+
+import pytest
+
+from modbus_engine import ModbusEngine
+from modbus_gateway import MBAP, ModbusTcpGateway
+from modbus_regmap import REG_OPEN_SPEED, REG_STATUS
+from modbus_rtu import EXC_GATEWAY_TARGET, EXC_ILLEGAL_ADDRESS, FC_WRITE_MULTIPLE, FC_WRITE_SINGLE
+from modbus_sim import BusSimulator
+from simbus import BAUD, RecordingSlave, wait_for
+
+
+@pytest.fixture
+def gateway():
+    slave = RecordingSlave(1, delay_ms=1)
+    slave.regs[REG_OPEN_SPEED] = 40
+    sim = BusSimulator([slave], BAUD)
+    engine = ModbusEngine([{'id': 1}])
+    engine.start(sim.start(), BAUD)
+    gw = ModbusTcpGateway(engine, port=0, max_age=0.2)
+    port = gw.start()
+    conn = socket.create_connection(("127.0.0.1", port), timeout=3)
+    assert wait_for(lambda: 'params' in engine.snapshot(1)['group_ts'])
+    yield conn, gw, slave
+    conn.close()
+    gw.stop()
+    engine.stop()
+    sim.stop()
+
+
+def request(conn, unit, pdu):
+    conn.sendall(MBAP.pack(1, 0, len(pdu) + 1, unit) + pdu)
+    _, _, length, _ = MBAP.unpack(conn.recv(MBAP.size, socket.MSG_WAITALL))
+    return conn.recv(length - 1, socket.MSG_WAITALL)
+
+
+def read(conn, unit, start, count):
+    resp = request(conn, unit, struct.pack('>BHH', 3, start, count))
+    return resp if resp[0] & 0x80 else list(struct.unpack_from(f'>{count}H', resp, 2))
+
+
+def test_read_served_from_cache(gateway):
+    conn, gw, slave = gateway
+    assert read(conn, 1, REG_OPEN_SPEED, 1) == [40]
+    assert gw.stats['cache_hits'] == 1
+
+
+def test_stale_group_is_refreshed_before_answer(gateway):
+    conn, gw, slave = gateway
+    slave.regs[REG_OPEN_SPEED] = 55     # Parametreler talep üzerine okunur; cache hâlâ 40
+    time.sleep(0.3)                     # max_age (0.2 s) aşıldı
+    assert read(conn, 1, REG_OPEN_SPEED, 1) == [55]
+    assert gw.stats['refreshes'] == 1
+
+
+def test_multi_register_write_is_one_bus_frame(gateway):
+    conn, gw, slave = gateway
+    vals = [11, 12, 13, 14, 15, 16]
+    for _ in range(5):
+        slave.pdus.clear()
+        pdu = struct.pack('>BHHB6H', FC_WRITE_MULTIPLE, REG_OPEN_SPEED, 6, 12, *vals)
+        assert request(conn, 1, pdu) == pdu[:5]
+        assert wait_for(lambda: slave.regs[REG_OPEN_SPEED:REG_OPEN_SPEED + 6] == vals)
+        assert [p[0] for p in slave.writes] == [FC_WRITE_MULTIPLE]
+        vals = [v + 1 for v in vals]
+
+
+def test_write_errors(gateway):
+    conn, gw, slave = gateway
+    assert request(conn, 1, struct.pack('>BHH', FC_WRITE_SINGLE, REG_STATUS, 1)) == \
+        bytes((FC_WRITE_SINGLE | 0x80, EXC_ILLEGAL_ADDRESS))
+    assert request(conn, 9, struct.pack('>BHH', FC_WRITE_SINGLE, REG_OPEN_SPEED, 1)) == \
+        bytes((FC_WRITE_SINGLE | 0x80, EXC_GATEWAY_TARGET))
+    assert gw.stats['writes'] == 0
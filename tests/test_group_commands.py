@@ -0,0 +1,56 @@
+from modbus_engine import GROUP_ALL
+from modbus_regmap import REG_OPEN_SPEED
+from modbus_sim import SimSlave
+from simbus import RecordingSlave, polled, running, wait_for
+
+
+def test_group_covering_the_port_is_one_broadcast():
+    slaves = [RecordingSlave(1, delay_ms=1), RecordingSlave(2, delay_ms=1)]
+    with running(slaves) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1) and polled(engine, 2))
+        assert engine.submit_group(GROUP_ALL, REG_OPEN_SPEED, 33) == 2
+        assert wait_for(lambda: all(s.regs[REG_OPEN_SPEED] == 33 for s in slaves))
+        bus = engine.bus_for(1)
+        assert wait_for(lambda: bus.metrics['broadcasts'] == 1)   # Broadcast sonrası bekleme bitince sayılır
+        assert sim.stats['broadcasts'] == 1
+        assert bus.metrics['group_bursts'] == 0
+        assert all(len(s.writes) == 1 for s in slaves)
+        # Cevapsız yazma, parametre grubunun öne alınmış okumasıyla doğrulanır
+        assert wait_for(lambda: all(engine.snapshot(s.sid)['cache'].get(REG_OPEN_SPEED) == 33 for s in slaves))
+
+
+def test_partial_group_is_a_per_node_burst():
+    slaves = [RecordingSlave(sid, delay_ms=1) for sid in (1, 2, 3)]
+    with running(slaves) as (engine, sim):
+        assert wait_for(lambda: all(polled(engine, s.sid) for s in slaves))
+        engine.submit_group([1, 2], REG_OPEN_SPEED, 44)
+        assert wait_for(lambda: slaves[0].regs[REG_OPEN_SPEED] == 44 and slaves[1].regs[REG_OPEN_SPEED] == 44)
+        bus = engine.bus_for(1)
+        assert wait_for(lambda: bus.metrics['group_bursts'] == 1)
+        assert bus.metrics['broadcasts'] == 0
+        assert sim.stats['broadcasts'] == 0
+        assert slaves[2].writes == []
+
+
+def test_no_broadcast_device_forces_a_burst():
+    slaves = [SimSlave(1, delay_ms=1), SimSlave(2, delay_ms=1)]
+    with running(slaves, [{'id': 1}, {'id': 2, 'no_broadcast': True}]) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1) and polled(engine, 2))
+        engine.submit_group(GROUP_ALL, REG_OPEN_SPEED, 55)
+        assert wait_for(lambda: all(s.regs[REG_OPEN_SPEED] == 55 for s in slaves))
+        assert wait_for(lambda: engine.bus_for(1).metrics['group_bursts'] == 1)
+        assert sim.stats['broadcasts'] == 0
+
+
+def test_burst_skips_offline_members():
+    slaves = [SimSlave(1, delay_ms=1), SimSlave(2, delay_ms=1), SimSlave(3, dead=True)]
+    with running(slaves) as (engine, sim):
+        assert wait_for(lambda: engine.snapshot(3)['backoff_s'] > 0)
+        before = slaves[2].stats['requests']
+        engine.submit_group([1, 3], REG_OPEN_SPEED, 66)
+        assert wait_for(lambda: slaves[0].regs[REG_OPEN_SPEED] == 66)
+        bus = engine.bus_for(1)
+        assert wait_for(lambda: bus.metrics['group_bursts'] == 1)
+        assert bus.metrics['group_skipped'] == 1
+        assert bus.metrics['write_errors'] == 0
+        assert slaves[2].stats['requests'] == before
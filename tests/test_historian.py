@@ -0,0 +1,66 @@
+import sqlite3
+from contextlib import closing
+
+from modbus_historian import Historian
+
+
+def rows(h):
+    with closing(h._connect()) as db:
+        return db.execute("SELECT sid, addr, ts, value, key FROM samples ORDER BY ts, addr").fetchall()
+
+
+def test_unchanged_values_skipped_until_keyframe(tmp_path):
+    h = Historian(str(tmp_path / "h.db"), keyframe_s=10)
+    h.record(1, 0.0, {1: 5})
+    h.record(1, 5.0, {1: 5})
+    h.record(1, 6.0, {1: 7})
+    h.record(1, 10.0, {1: 7})
+    with closing(h._connect()) as db: h._flush(db)
+    assert rows(h) == [(1, 1, 0.0, 5, 1), (1, 1, 6.0, 7, 0), (1, 1, 10.0, 7, 1)]
+
+
+def test_keyframe_is_tracked_per_register(tmp_path):
+    # Status sık, params seyrek okunur: birinin keyframe'i diğerininkini sıfırlamamalı
+    h = Historian(str(tmp_path / "h.db"), keyframe_s=10)
+    h.record(1, 0.0, {1: 0})
+    h.record(1, 4.0, {4: 50})
+    for ts in range(1, 12):
+        h.record(1, float(ts), {1: 0})
+    h.record(1, 12.0, {4: 50})
+    h.record(1, 14.0, {4: 50})
+    with closing(h._connect()) as db: h._flush(db)
+    keyframes = [(addr, ts) for sid, addr, ts, val, kf in rows(h) if kf]
+    assert keyframes == [(1, 0.0), (4, 4.0), (1, 10.0), (4, 14.0)]
+
+
+def test_forget_restarts_device_with_keyframe(tmp_path):
+    h = Historian(str(tmp_path / "h.db"), keyframe_s=10)
+    h.record(1, 0.0, {1: 5})
+    h.forget(1)
+    h.record(1, 1.0, {1: 5})
+    with closing(h._connect()) as db: h._flush(db)
+    assert [r[2] for r in rows(h)] == [0.0, 1.0]
+
+
+def test_write_error_keeps_batch_for_retry(tmp_path):
+    h = Historian(str(tmp_path / "h.db"), max_pending=3)
+    for ts in range(5):
+        h.record(1, float(ts), {1: ts})
+    assert h.stats['dropped'] == 2
+    broken = sqlite3.connect(":memory:")
+    broken.close()
+    h._flush(broken)
+    assert h.stats['write_errors'] == 1
+    h.record(1, 5.0, {1: 5})
+    with closing(h._connect()) as db: h._flush(db)
+    # Kuyruk sınırına kırpılmış grup + yeni örnek
+    assert [r[2] for r in rows(h)] == [2.0, 3.0, 4.0, 5.0]
+    assert h.stats['written'] == 4
+
+
+def test_writer_thread_flushes_on_close(tmp_path):
+    h = Historian(str(tmp_path / "h.db"), flush_s=60)
+    h.start()
+    h.record(2, 1.0, {1: 1, 2: 2})
+    h.close()
+    assert h.value_at(2, 2, 1.0) == 2
@@ -0,0 +1,32 @@
+import logging
+
+from modbus_log import RateLimitFilter
+
+
+def record(msg, *args):
+    return logging.LogRecord("t", logging.WARNING, __file__, 1, msg, args, None)
+
+
+def test_template_limited_per_subject():
+    flt = RateLimitFilter(interval=60, burst=2)
+    passed = [flt.filter(record("timeout (ID %s, deneme %d)", 1, i)) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert flt.filter(record("timeout (ID %s, deneme %d)", 2, 0))
+
+
+def test_suppressed_count_reported_in_next_window(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("modbus_log.time.monotonic", lambda: now[0])
+    flt = RateLimitFilter(interval=10, burst=1)
+    assert flt.filter(record("hata %s", 1))
+    assert not flt.filter(record("hata %s", 1))
+    now[0] = 10.0
+    rec = record("hata %s", 1)
+    assert flt.filter(rec)
+    assert "+1" in rec.getMessage()
+
+
+def test_unhashable_and_missing_args():
+    flt = RateLimitFilter()
+    assert flt.filter(logging.LogRecord("t", logging.INFO, __file__, 1, "a %(k)s", ({'k': [1]},), None))
+    assert flt.filter(record("düz mesaj"))
@@ -0,0 +1,64 @@
+import struct
+import time
+
+from modbus_engine import DEFAULT_GROUP_POLICY, GROUP_POLICY
+from modbus_regmap import DOOR_MAP, REG_OPEN_SPEED
+from modbus_rtu import FC_READ_HOLDING
+from simbus import RecordingSlave, polled, running, wait_for
+
+STATUS_START = DOOR_MAP.plan(['status'])[0].start
+PARAMS_START = DOOR_MAP.plan(['params'])[0].start
+
+
+def reads(slave, start):
+    return sum(1 for p in slave.pdus if p[0] == FC_READ_HOLDING and struct.unpack_from('>H', p, 1)[0] == start)
+
+
+def test_params_read_once_while_status_keeps_polling():
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave], [{'id': 1, 'poll_idle_ms': 20}]) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1, 'params'))
+        status_before = reads(slave, STATUS_START)
+        time.sleep(0.5)
+        assert reads(slave, STATUS_START) > status_before + 5
+        assert reads(slave, PARAMS_START) == 1
+
+
+def test_on_demand_group_refresh_respects_ttl(monkeypatch):
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave], [{'id': 1, 'poll_config_ms': 0}]) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+        time.sleep(0.2)
+        assert reads(slave, PARAMS_START) == 0          # Periyot 0: yalnız talep üzerine
+        engine.refresh(1, 'params')
+        assert wait_for(lambda: polled(engine, 1, 'params'))
+        engine.refresh(1, 'params')                     # TTL içinde: cache yeterli
+        time.sleep(0.2)
+        assert reads(slave, PARAMS_START) == 1
+        monkeypatch.setitem(GROUP_POLICY, 'params', DEFAULT_GROUP_POLICY[:3] + (0.1,))
+        engine.refresh(1, 'params')
+        assert wait_for(lambda: reads(slave, PARAMS_START) == 2)
+
+
+def test_unverified_write_invalidates_group_and_rereads_it():
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave]) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1, 'params'))
+        read_at = engine.snapshot(1)['group_ts']['params']
+        engine.submit(1, REG_OPEN_SPEED, 70)
+        assert wait_for(lambda: engine.snapshot(1)['group_ts'].get('params', 0) > read_at)
+        assert reads(slave, PARAMS_START) == 2
+        assert engine.snapshot(1)['cache'][REG_OPEN_SPEED] == 70
+
+
+def test_recovered_device_refreshes_every_group():
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave], [{'id': 1, 'poll_config_ms': 0}]) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+        slave.dead = True
+        assert wait_for(lambda: engine.snapshot(1)['backoff_s'] > 0)
+        slave.dead = False
+        assert wait_for(lambda: engine.snapshot(1)['backoff_s'] == 0, timeout=5)
+        # Kesintide yeniden başlamış olabilir: talep üzerine grup da bir kez okunur
+        assert wait_for(lambda: polled(engine, 1, 'params'))
+        assert reads(slave, PARAMS_START) == 1
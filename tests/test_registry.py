@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from modbus_registry import DeviceRegistry
+
+
+def write(path, data):
+    path.write_text(json.dumps(data) if not isinstance(data, str) else data, encoding="utf-8")
+
+
+def test_missing_file_loads_empty(tmp_path):
+    reg = DeviceRegistry.load(str(tmp_path / "devices.json"))
+    assert len(reg) == 0
+
+
+def test_save_and_reload_round_trip(tmp_path):
+    path = tmp_path / "devices.json"
+    reg = DeviceRegistry.load(str(path))
+    reg.add({'id': 3, 'name': 'Kapı 3', 'port': '/dev/ttyUSB1'})
+    reg.add({'id': 1, 'name': 'Kapı 1'})
+    reg.save()
+    assert not (tmp_path / "devices.json.tmp").exists()
+    again = DeviceRegistry.load(str(path))
+    assert again.ids() == [3, 1]
+    assert [d['id'] for d in again.on_port('/dev/ttyUSB1')] == [3]
+
+
+def test_duplicates_and_invalid_entries_skipped_with_backup(tmp_path):
+    path = tmp_path / "devices.json"
+    data = [{'id': 1, 'name': 'a'}, {'id': 1, 'name': 'b'}, {'name': 'id yok'}, "x", {'id': 2}]
+    write(path, data)
+    reg = DeviceRegistry.load(str(path))
+    assert reg.ids() == [1, 2]
+    assert reg.get(1)['name'] == 'a'
+    assert json.loads((tmp_path / "devices.json.bak").read_text(encoding="utf-8")) == data
+
+
+def test_clean_file_makes_no_backup(tmp_path):
+    path = tmp_path / "devices.json"
+    write(path, [{'id': 1}])
+    DeviceRegistry.load(str(path))
+    assert not (tmp_path / "devices.json.bak").exists()
+
+
+@pytest.mark.parametrize("content", ["[{'id': 1}", '{"id": 1}'])
+def test_unreadable_file_raises_and_is_untouched(tmp_path, content):
+    path = tmp_path / "devices.json"
+    write(path, content)
+    with pytest.raises(ValueError):
+        DeviceRegistry.load(str(path))
+    assert path.read_text(encoding="utf-8") == content
+
+
+def test_registry_without_path_never_saves(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    reg = DeviceRegistry()
+    reg.add({'id': 1})
+    reg.save()
+    reg.flush()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,50 @@
+import struct
+
+import pytest
+
+from modbus_regmap import DOOR_MAP, MAX_READ_REGS, REGS_PER_DEVICE, Register, RegisterMap
+
+
+def test_door_map_is_one_span_per_group():
+    status, = DOOR_MAP.plan(['status'])
+    params, = DOOR_MAP.plan(['params'])
+    assert [r.name for r in status.registers] == ['status', 'errors', 'warnings']
+    assert (params.start, params.count) == (4, REGS_PER_DEVICE - 4)
+
+
+def test_plan_skips_write_only_registers():
+    spans = DOOR_MAP.plan()
+    assert all(r.readable for s in spans for r in s.registers)
+    assert 'command' not in [r.name for s in spans for r in s.registers]
+
+
+def test_plan_bridges_small_gaps_and_splits_large_ones():
+    rmap = RegisterMap('t', [Register('a', 0), Register('b', 5), Register('c', 40)], max_gap=8)
+    spans = rmap.plan()
+    assert [(s.start, s.count) for s in spans] == [(0, 6), (40, 1)]
+    assert [(s.start, s.count) for s in rmap.plan(max_gap=50)] == [(0, 41)]
+
+
+def test_plan_respects_max_read_regs():
+    rmap = RegisterMap('t', [Register(f'r{i}', i * 2) for i in range(100)])
+    spans = rmap.plan()
+    assert len(spans) == 2
+    assert all(s.count <= MAX_READ_REGS for s in spans)
+
+
+def test_plan_is_cached():
+    assert DOOR_MAP.plan(['status']) is DOOR_MAP.plan(['status'])
+
+
+def test_span_decode_skips_gaps_and_scales():
+    rmap = RegisterMap('t', [Register('a', 0, 'int16', scale=0.1), Register('b', 3, 'float32')])
+    span, = rmap.plan()
+    payload = struct.pack('>h4xf', -25, 1.5)
+    vals = span.decode(payload)
+    assert vals[0] == pytest.approx(-2.5)
+    assert vals[3] == 1.5
+
+
+def test_overlapping_registers_rejected():
+    with pytest.raises(ValueError):
+        RegisterMap('t', [Register('a', 0, 'uint32'), Register('b', 1)])
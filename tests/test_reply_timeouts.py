@@ -0,0 +1,47 @@
+import threading
+import time
+
+from modbus_engine import READ_TIMEOUT, TIMEOUT_SAMPLES
+from modbus_events import SLOW, SLOW_CLEARED
+from modbus_rtu import BusTiming
+from modbus_sim import SimSlave
+from simbus import BAUD, running, wait_for
+
+FAST_POLL = [{'id': 1, 'poll_idle_ms': 5}]
+
+
+def test_timeout_is_learned_from_replies():
+    with running([SimSlave(1, delay_ms=1)], FAST_POLL) as (engine, sim):
+        assert wait_for(lambda: engine.snapshot(1)['reply_timeout_ms'] > 0)
+        snap = engine.snapshot(1)
+        assert snap['stats']['reply']['count'] >= TIMEOUT_SAMPLES
+        assert BusTiming(BAUD).reply_floor() * 1000 <= snap['reply_timeout_ms'] < READ_TIMEOUT * 1000
+        assert snap['reply_baseline_ms'] > 0
+
+
+def test_slow_flag_follows_reply_latency():
+    slave = SimSlave(1, delay_ms=1)
+    with running([slave], FAST_POLL) as (engine, sim):
+        got, lock = [], threading.Lock()
+        def on_event(ev):
+            with lock: got.append(ev.kind)
+        engine.events.subscribe(on_event, kinds=[SLOW, SLOW_CLEARED])
+        assert wait_for(lambda: engine.snapshot(1)['reply_baseline_ms'] > 0)
+        slave.delay_ms = 15
+        assert wait_for(lambda: engine.snapshot(1)['slow'], timeout=10)
+        assert engine.snapshot(1)['online']     # Yavaş ama cevap veriyor: timeout'a düşmedi
+        slave.delay_ms = 1
+        assert wait_for(lambda: not engine.snapshot(1)['slow'], timeout=10)
+        assert got == [SLOW, SLOW_CLEARED]
+
+
+def test_dead_node_detected_within_learned_timeout():
+    slave = SimSlave(1, delay_ms=1)
+    with running([slave], FAST_POLL) as (engine, sim):
+        assert wait_for(lambda: engine.snapshot(1)['reply_timeout_ms'] > 0)
+        learned = engine.snapshot(1)['reply_timeout_ms'] / 1000
+        slave.dead = True
+        t0 = time.monotonic()
+        assert wait_for(lambda: not engine.snapshot(1)['online'])
+        # İki deneme öğrenilmiş timeout'la: varsayılan READ_TIMEOUT'tan çok önce
+        assert time.monotonic() - t0 < min(READ_TIMEOUT, 4 * learned + 0.1)
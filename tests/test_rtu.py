@@ -0,0 +1,48 @@
+import pytest
+
+from modbus_rtu import (BusTiming, FIXED_T35, check_frame, crc16, frame, read_pdu, read_write_pdu,
+                        response_length, write_multiple_pdu, write_single_pdu)
+
+
+def test_crc16_known_vector():
+    # 01 03 00 00 00 0A -> CRC C5CD (bayt sırası CD C5)
+    assert crc16(bytes.fromhex("01030000000A")) == 0xCDC5
+
+
+def test_frame_appends_little_endian_crc():
+    adu = frame(1, read_pdu(0, 10))
+    assert adu == bytes.fromhex("01030000000AC5CD")
+    assert check_frame(adu)
+
+
+def test_check_frame_rejects_corruption_and_short_frames():
+    adu = bytearray(frame(7, write_single_pdu(3, 0x1234)))
+    adu[3] ^= 0x01
+    assert not check_frame(bytes(adu))
+    assert not check_frame(b"\x01\x03\x00")
+
+
+def test_write_pdus_mask_values_to_16_bits():
+    assert write_single_pdu(5, -1) == bytes.fromhex("060005FFFF")
+    assert write_multiple_pdu(4, [1, 0x10002]) == bytes.fromhex("1000040002040001" "0002")
+
+
+@pytest.mark.parametrize("pdu, expected", [
+    (read_pdu(0, 10), 25),
+    (read_pdu(2, 1, fc=4), 7),
+    (write_single_pdu(1, 1), 8),
+    (write_multiple_pdu(4, [1, 2, 3]), 8),
+    (read_write_pdu(4, 6, 4, [1, 2]), 17),
+])
+def test_response_length(pdu, expected):
+    assert response_length(pdu) == expected
+
+
+def test_response_length_unknown_fc():
+    with pytest.raises(ValueError):
+        response_length(b"\x2b\x0e\x01\x00")
+
+
+def test_t35_fixed_above_19200():
+    assert BusTiming(115200).t35 == FIXED_T35
+    assert BusTiming(9600).t35 == pytest.approx(3.5 * 11 / 9600)
@@ -0,0 +1,36 @@
+from modbus_engine import group_by_port
+from modbus_registry import DeviceRegistry
+from modbus_scan import found_devices
+
+FOUND = [{'id': 1, 'baud': 9600}, {'id': 2, 'baud': 19200}, {'id': 3, 'baud': 9600}]
+
+
+def test_nodes_at_toolbar_baud_added_without_pinning():
+    added, skipped = found_devices(FOUND, DeviceRegistry([{'id': 7}]), '/dev/ttyUSB0', 9600)
+    assert added == [{'id': 1, 'name': 'NODE_001'}, {'id': 3, 'name': 'NODE_003'}]
+    assert [r['id'] for r in skipped] == [2]
+
+
+def test_other_baud_never_changes_port_baud():
+    # Porttaki mevcut cihazlar 9600'de: 19200'de bulunan düğüm eklenirse segmentin hızı değişirdi
+    registry = DeviceRegistry([{'id': 7}])
+    added, _ = found_devices(FOUND, registry, '/dev/ttyUSB0', 9600)
+    for d in added:
+        registry.add(d)
+    assert group_by_port(registry, '/dev/ttyUSB0', 9600)['/dev/ttyUSB0'][0] == 9600
+
+
+def test_port_baud_from_registry_is_pinned_with_port():
+    registry = DeviceRegistry([{'id': 7, 'port': '/dev/ttyUSB1', 'baud': 19200}])
+    added, skipped = found_devices(FOUND, registry, '/dev/ttyUSB1', 9600)
+    assert added == [{'id': 2, 'name': 'NODE_002', 'port': '/dev/ttyUSB1', 'baud': 19200}]
+    assert [r['id'] for r in skipped] == [1, 3]
+
+
+def test_unknown_port_takes_majority_baud_and_skips_known_ids():
+    found = FOUND + [{'id': 4, 'baud': 19200}, {'id': 5, 'baud': 19200}]
+    added, skipped = found_devices(found, {1}, '/dev/ttyUSB2')
+    assert [(d['id'], d['port'], d['baud']) for d in added] == [(2, '/dev/ttyUSB2', 19200),
+                                                                (4, '/dev/ttyUSB2', 19200),
+                                                                (5, '/dev/ttyUSB2', 19200)]
+    assert [r['id'] for r in skipped] == [3]
@@ -0,0 +1,58 @@
+from modbus_engine import BusScheduler, PollJob
+
+
+def test_ready_jobs_pop_by_earliest_deadline():
+    sched = BusScheduler()
+    slow, fast, mid = PollJob(1, 'params', 2, 5.0), PollJob(2, 'status', 1, 0.1), PollJob(3, 'status', 1, 1.0)
+    for job in (slow, fast, mid):
+        sched.add(job, 10.0)
+    assert [sched.pop_ready(10.0) for _ in range(3)] == [fast, mid, slow]
+    assert sched.pop_ready(10.0) is None
+
+
+def test_job_not_ready_before_release():
+    sched = BusScheduler()
+    job = PollJob(1, 'status', 1, 0.5)
+    sched.add(job, 20.0)
+    assert sched.pop_ready(19.9) is None
+    assert sched.next_release() == 20.0
+    assert sched.pop_ready(20.0) is job
+
+
+def test_late_start_counts_as_missed():
+    sched = BusScheduler()
+    job = PollJob(1, 'status', 1, 0.5)
+    sched.add(job, 0.0)
+    assert sched.pop_ready(1.0) is job
+    assert job.missed == sched.missed == 1
+
+
+def test_reschedule_invalidates_queued_copy():
+    sched = BusScheduler()
+    job = PollJob(1, 'status', 1, 0.5)
+    sched.add(job, 0.0)
+    sched.schedule(job, 5.0)
+    assert sched.pop_ready(1.0) is None
+    assert sched.pop_ready(5.0) is job
+
+
+def test_on_demand_job_waits_for_request():
+    sched = BusScheduler()
+    job = PollJob(1, 'params', 2, 0)
+    sched.add(job, None)
+    assert (1, 'params') in sched.jobs
+    assert sched.pop_ready(100.0) is None
+    sched.schedule(job, 100.0)
+    assert sched.pop_ready(100.0) is job
+    sched.done(job, 0.01, 0)
+    assert sched.next_release() is None
+
+
+def test_removed_device_jobs_never_pop():
+    sched = BusScheduler()
+    sched.add(PollJob(1, 'status', 1, 0.5), 0.0)
+    keep = PollJob(2, 'status', 1, 0.5)
+    sched.add(keep, 0.0)
+    sched.remove_device(1)
+    assert sched.pop_ready(0.0) is keep
+    assert sched.pop_ready(0.0) is None
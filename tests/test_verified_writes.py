@@ -0,0 +1,71 @@
+import threading
+
+from modbus_events import WRITE_MISMATCH
+from modbus_regmap import REG_CLOSE_SPEED, REG_OPEN_SPEED
+from modbus_rtu import FC_READ_HOLDING, FC_READ_WRITE, FC_WRITE_SINGLE
+from simbus import RecordingSlave, polled, running, wait_for
+
+
+def fcs(slave):
+    return [p[0] for p in slave.pdus]
+
+
+def test_verified_write_is_one_fc23_transaction():
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave], verify_writes=True) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+        engine.submit_many(1, {REG_OPEN_SPEED: 50, REG_CLOSE_SPEED: 60})
+        bus = engine.bus_for(1)
+        assert wait_for(lambda: bus.metrics['verified_writes'] == 1)
+        assert slave.writes == []
+        assert fcs(slave).count(FC_READ_WRITE) == 1
+        assert wait_for(lambda: engine.snapshot(1)['cache'].get(REG_CLOSE_SPEED) == 60)
+        snap = engine.snapshot(1)
+        assert snap['fc23'] is True
+        assert snap['cache'][REG_OPEN_SPEED] == 50
+        assert bus.metrics['write_mismatches'] == 0
+
+
+def test_slave_without_fc23_falls_back_once():
+    slave = RecordingSlave(1, delay_ms=1, fc23=False)
+    with running([slave], verify_writes=True) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+        bus = engine.bus_for(1)
+        engine.submit(1, REG_OPEN_SPEED, 51)
+        assert wait_for(lambda: bus.metrics['verified_writes'] == 1)
+        seq = fcs(slave)
+        i = seq.index(FC_READ_WRITE)
+        # ILLEGAL FUNCTION -> aynı kilit altında yazma + geri okuma, arada başka çerçeve yok
+        assert seq[i + 1:i + 3] == [FC_WRITE_SINGLE, FC_READ_HOLDING]
+        assert wait_for(lambda: engine.snapshot(1)['fc23'] is False)
+        engine.submit(1, REG_OPEN_SPEED, 52)
+        assert wait_for(lambda: bus.metrics['verified_writes'] == 2)
+        assert fcs(slave).count(FC_READ_WRITE) == 1      # Bir daha denenmez
+        assert wait_for(lambda: engine.snapshot(1)['cache'][REG_OPEN_SPEED] == 52)
+
+
+def test_clamped_write_raises_mismatch_and_caches_read_back():
+    slave = RecordingSlave(1, delay_ms=1, clamp=30)
+    with running([slave], verify_writes=True) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+        got, lock = [], threading.Lock()
+        def on_event(ev):
+            with lock: got.append(ev)
+        engine.events.subscribe(on_event, kinds=[WRITE_MISMATCH])
+        engine.submit(1, REG_OPEN_SPEED, 50)
+        assert wait_for(lambda: got and engine.snapshot(1)['write_mismatches'])
+        assert [(e.addr, e.old, e.new) for e in got] == [(REG_OPEN_SPEED, 50, 30)]
+        snap = engine.snapshot(1)
+        assert snap['write_mismatches'] == 1
+        assert snap['cache'][REG_OPEN_SPEED] == 30
+        assert engine.bus_for(1).metrics['write_mismatches'] == 1
+
+
+def test_device_can_opt_out_of_verification():
+    slave = RecordingSlave(1, delay_ms=1)
+    with running([slave], [{'id': 1, 'verify_writes': False}], verify_writes=True) as (engine, sim):
+        assert wait_for(lambda: polled(engine, 1))
+        engine.submit(1, REG_OPEN_SPEED, 53)
+        assert wait_for(lambda: slave.regs[REG_OPEN_SPEED] == 53)
+        assert FC_READ_WRITE not in fcs(slave)
+        assert engine.bus_for(1).metrics['verified_writes'] == 0